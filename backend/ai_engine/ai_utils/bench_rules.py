@@ -0,0 +1,89 @@
+# backend/ai_engine/ai_utils/bench_rules.py
+"""
+Micro-benchmark for the categorizer's rule fast path.
+
+Compares the old linear scan (one `in` check per keyword) with the compiled
+RuleMatcher at 20, 2k and 20k rules. Run with:
+    python ai_engine/ai_utils/bench_rules.py
+"""
+import os
+import random
+import string
+import sys
+import time
+
+# Points to D:\finwise\backend
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from ai_engine.ai_utils.rule_engine import RuleMatcher, normalize_text
+
+RULE_COUNTS = [20, 2_000, 20_000]
+N_DESCRIPTIONS = 5_000
+CATEGORIES = ['Transport', 'Travel', 'Food & Beverage', 'Shopping', 'Utilities', 'Housing']
+
+
+def random_word(rng, lo=4, hi=10):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(lo, hi)))
+
+
+def make_rules(rng, n):
+    rules = {}
+    while len(rules) < n:
+        # Mix of one- and two-word merchant names
+        kw = random_word(rng) if rng.random() < 0.7 else f"{random_word(rng)} {random_word(rng)}"
+        rules[kw] = rng.choice(CATEGORIES)
+    return rules
+
+
+def make_descriptions(rng, rules, n):
+    keywords = list(rules)
+    out = []
+    for _ in range(n):
+        words = [random_word(rng, 3, 8) for _ in range(rng.randint(2, 6))]
+        if rng.random() < 0.5:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        out.append(' '.join(words).upper() + ' #' + str(rng.randint(1000, 9999)))
+    return out
+
+
+def linear_scan(rules, descriptions):
+    hits = 0
+    for d in descriptions:
+        d = normalize_text(d)
+        for k in rules:
+            if k in d:
+                hits += 1
+                break
+    return hits
+
+
+def compiled_scan(matcher, descriptions):
+    return sum(1 for d in descriptions if matcher.match(d) is not None)
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'rules':>8} {'compile_s':>10} {'linear/s':>12} {'compiled/s':>12} {'speedup':>8}")
+    for n in RULE_COUNTS:
+        rules = make_rules(rng, n)
+        descriptions = make_descriptions(rng, rules, N_DESCRIPTIONS)
+
+        t0 = time.perf_counter()
+        matcher = RuleMatcher(rules)
+        compile_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        linear_scan(rules, descriptions)
+        linear_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        compiled_scan(matcher, descriptions)
+        compiled_s = time.perf_counter() - t0
+
+        print(f"{n:>8} {compile_s:>10.3f} {N_DESCRIPTIONS / linear_s:>12,.0f} "
+              f"{N_DESCRIPTIONS / compiled_s:>12,.0f} {linear_s / compiled_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# backend/ai_engine/ai_utils/incremental.py
+"""
+Helpers for incremental (nightly) retraining.
+
+FeatureCache keeps every user's monthly series from the previous run together
+with a fingerprint of it, so a run only has to query and rebuild the users
+whose data changed. extend_forest grows an existing RandomForest with a few
+new trees fitted on the new rows instead of refitting from scratch.
+"""
+import hashlib
+import os
+
+import joblib
+import numpy as np
+
+from transactions.models import UserDataVersion
+
+
+def series_fingerprint(series_by_key):
+    """ Hash of a user's monthly series ({key: ndarray}), independent of dict order. """
+    digest = hashlib.sha1()
+    for key in sorted(series_by_key, key=str):
+        digest.update(str(key).encode())
+        digest.update(np.round(series_by_key[key], 2).tobytes())
+    return digest.hexdigest()
+
+
+def current_data_versions():
+    """ {user_id: data version} for every user that has ever written data. """
+    return dict(UserDataVersion.objects.values_list('user_id', 'version'))
+
+
+class FeatureCache:
+    """
+    Per-user monthly series from the last training run, stored with joblib.
+
+    `key` describes the window the series were built for (e.g. months_back
+    and the first month). When it no longer matches (say the month rolled
+    over) the cache starts out empty and the run falls back to a full build.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.users = {}  # user_id -> {'version': int, 'hash': str, 'series': {key: ndarray}}
+        self.valid = False
+        if os.path.exists(path):
+            try:
+                data = joblib.load(path)
+            except Exception as e:
+                print(f"Ignoring unreadable feature cache {path}: {e}")
+                data = None
+            if data and data.get('key') == key:
+                self.users = data['users']
+                self.valid = True
+
+    def stale_user_ids(self, versions):
+        """
+        Users whose data version moved since the cached run (or who are new).
+        Users that no longer exist are dropped from the cache.
+        """
+        for user_id in list(self.users):
+            if user_id not in versions:
+                del self.users[user_id]
+        return [uid for uid, v in versions.items()
+                if uid not in self.users or self.users[uid]['version'] != v]
+
+    def update(self, series_by_user, versions, user_ids):
+        """
+        Stores fresh series for `user_ids` and returns the ids whose series
+        actually changed (a version bump can come from a change outside the
+        window, or one that cancelled out).
+        """
+        changed = []
+        for user_id in user_ids:
+            series = series_by_user.get(user_id, {})
+            fingerprint = series_fingerprint(series)
+            old = self.users.get(user_id)
+            if old is None or old['hash'] != fingerprint:
+                changed.append(user_id)
+            self.users[user_id] = {'version': versions.get(user_id, 0), 'hash': fingerprint, 'series': series}
+        return changed
+
+    def snapshot(self, user_ids):
+        """ The cached series of `user_ids`, to diff against after an update. """
+        return {uid: self.users[uid]['series'] for uid in user_ids if uid in self.users}
+
+    def changed_matrices(self, before, user_ids):
+        """
+        Like matrices(user_ids), but only with the rows that differ from the
+        `before` snapshot, so a user's unchanged keys (e.g. categories they
+        didn't touch) don't count as new data.
+        """
+        rows = {}
+        for user_id in user_ids:
+            old = before.get(user_id, {})
+            for key, row in self.users[user_id]['series'].items():
+                if key in old and np.array_equal(np.round(old[key], 2), np.round(row, 2)):
+                    continue
+                rows.setdefault(key, []).append(row)
+        return {key: np.vstack(r) for key, r in rows.items()}
+
+    def matrices(self, user_ids=None):
+        """ {key: ndarray (n_users, n_months)} stacked from the cached series. """
+        ids = self.users.keys() if user_ids is None else user_ids
+        rows = {}
+        for user_id in ids:
+            for key, row in self.users[user_id]['series'].items():
+                rows.setdefault(key, []).append(row)
+        return {key: np.vstack(r) for key, r in rows.items()}
+
+    def save(self):
+        joblib.dump({'key': self.key, 'users': self.users}, self.path)
+
+
+def extend_forest(model, X_new, y_new, add_estimators=20, max_estimators=300):
+    """
+    Adds `add_estimators` trees fitted on the new rows to a fitted forest.
+    Returns False (and leaves the model alone) when the forest would grow
+    past `max_estimators`; the caller should refit from scratch instead.
+    """
+    if model.n_estimators + add_estimators > max_estimators:
+        return False
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + add_estimators)
+    model.fit(X_new, y_new)
+    model.set_params(warm_start=False)
+    return True
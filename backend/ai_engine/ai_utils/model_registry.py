@@ -0,0 +1,142 @@
+# backend/ai_engine/ai_utils/model_registry.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of unpickled model packages, keyed by file path.
+
+    Each package is loaded from disk once per worker and kept in a bounded
+    LRU. The size of an entry is the size of its pickle on disk, which is a
+    good enough proxy for its in-memory footprint. If the file on disk is
+    replaced (e.g. after retraining), its mtime changes and the next lookup
+    reloads it.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (mtime, size, package)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, path):
+        """
+        Returns the unpickled package stored at `path`, or None if the
+        file does not exist.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._forget(path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stat.st_mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        # Load outside the lock so one slow unpickle doesn't block hits
+        started = time.perf_counter()
+        package = joblib.load(path)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.loads += 1
+            self.load_seconds += elapsed
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[path] = (stat.st_mtime, stat.st_size, package)
+            self._bytes += stat.st_size
+            self._evict()
+        return package
+
+    def _forget(self, path):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone is over budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """ Returns the hit/miss/load counters as a plain dict. """
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_load = (self.load_seconds / self.loads) if self.loads else 0.0
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'load_seconds_total': round(self.load_seconds, 4),
+                'load_seconds_avg': round(avg_load, 4),
+                # Every hit skipped one unpickle of roughly average cost
+                'load_seconds_saved_est': round(self.hits * avg_load, 4),
+            }
+
+
+def directory_version(path, prefix='', suffix='.pkl'):
+    """
+    Short fingerprint of the model files in a directory (names, sizes and
+    mtimes). It changes whenever a model is retrained, added or removed.
+    """
+    digest = hashlib.sha1()
+    try:
+        entries = sorted(
+            (e.name, e.stat().st_size, e.stat().st_mtime_ns)
+            for e in os.scandir(path)
+            if e.is_file() and e.name.startswith(prefix) and e.name.endswith(suffix)
+        )
+    except FileNotFoundError:
+        entries = []
+    for name, size, mtime in entries:
+        digest.update(f"{name}:{size}:{mtime};".encode())
+    return digest.hexdigest()[:16]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Returns the registry shared by everything in this worker process.
+    The size budget comes from settings.MODEL_REGISTRY_MAX_BYTES if set.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from django.conf import settings
+                max_bytes = getattr(settings, 'MODEL_REGISTRY_MAX_BYTES', 256 * 1024 * 1024)
+                _registry = ModelRegistry(max_bytes=max_bytes)
+    return _registry
@@ -0,0 +1,101 @@
+# backend/ai_engine/ai_utils/rule_engine.py
+import csv
+import re
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+
+_PUNCT_RE = re.compile(r'[^a-z0-9\s]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(s: str) -> str:
+    s = s.lower()
+    s = _PUNCT_RE.sub(' ', s) # Remove punctuation
+    s = _SPACE_RE.sub(' ', s).strip() # Remove extra spaces
+    return s
+
+
+def _trie_pattern(node: Dict) -> str:
+    """
+    Turns a character trie into a regex where keywords share their prefixes,
+    e.g. {'uber', 'uber eats', 'udemy'} -> 'u(?:ber(?: eats)?|demy)'.
+    The regex engine then only follows one branch per character instead of
+    trying every keyword at every position.
+    """
+    is_end = '' in node
+    branches = []
+    single_chars = []
+    for ch in sorted(k for k in node if k):
+        sub = _trie_pattern(node[ch])
+        if sub:
+            branches.append(re.escape(ch) + sub)
+        else:
+            single_chars.append(re.escape(ch))
+
+    if single_chars:
+        branches.append(single_chars[0] if len(single_chars) == 1 else '[' + ''.join(single_chars) + ']')
+    if not branches:
+        return ''
+
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if is_end:
+        # Greedy '?' tries the longer keyword first and backs off to this one
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+
+class RuleMatcher:
+    """
+    Keyword -> category rules compiled into a single regex.
+
+    Keywords are normalized the same way as descriptions and must match on
+    word boundaries, so 'rent' matches "house rent" but not "parent" or
+    "current". A description is scanned once no matter how many rules there
+    are; the leftmost keyword wins, and the longest one if several start at
+    the same word.
+    """
+
+    def __init__(self, rules: Union[Mapping[str, str], Iterable[Tuple[str, str]]]):
+        items = rules.items() if isinstance(rules, Mapping) else rules
+        self.categories = {}
+        for keyword, category in items:
+            keyword = normalize_text(str(keyword))
+            if keyword and category:
+                self.categories[keyword] = category
+
+        trie = {}
+        for keyword in self.categories:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = True
+
+        body = _trie_pattern(trie)
+        self._regex = re.compile(r'\b' + body + r'\b') if body else None
+
+    def __len__(self):
+        return len(self.categories)
+
+    def match_normalized(self, text: str) -> Optional[str]:
+        """ Returns the category for already-normalized text, or None. """
+        if self._regex is None:
+            return None
+        m = self._regex.search(text)
+        return self.categories[m.group(0)] if m else None
+
+    def match(self, description: str) -> Optional[str]:
+        """ Returns the category for a raw description, or None. """
+        return self.match_normalized(normalize_text(description))
+
+    @classmethod
+    def from_csv(cls, path: str, keyword_col='keyword', category_col='category', extra=None):
+        """
+        Builds a matcher from a CSV file with keyword/category columns.
+        Rules in `extra` (a dict) are loaded first, so the file can override them.
+        """
+        def rows():
+            if extra:
+                yield from extra.items()
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    yield row.get(keyword_col, ''), row.get(category_col, '')
+        return cls(rows())
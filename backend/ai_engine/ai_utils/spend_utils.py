@@ -1,58 +1,48 @@
 # backend/ai_engine/ai_utils/spend_utils.py
+import numpy as np
 import pandas as pd
 from datetime import date
-from transactions.models import Transaction
+from django.db.models import Sum, Value, CharField
+from django.db.models.functions import Trim, NullIf, Coalesce
+from transactions.models import MonthlyRollup
 
 def build_monthly_category_matrix(user, months_back=36):
     """
-    Returns a pandas DataFrame indexed by month-start (datetime.date) 
+    Returns a pandas DataFrame indexed by month-start (datetime.date)
     with columns for each category, and values = total expense.
     """
     # 1. Define the full date range
     end = pd.Timestamp(date.today()).normalize()
     start = (end - pd.DateOffset(months=months_back - 1)).replace(day=1)
     start_date = start.date()
+    months_index = pd.date_range(start=start, end=end, freq='MS')
 
-    # 2. Get all transactions for the user in that period
-    qs = Transaction.objects.filter(
-        user=user, 
+    # 2. Read the monthly rollups: one row per (month, category)
+    # Blank categories are folded into 'Uncategorized'
+    rows = MonthlyRollup.objects.filter(
+        user=user,
         type='expense', # We only care about expenses
-        date__gte=start_date
-    ).order_by('date')
+        month__gte=start_date
+    ).annotate(
+        cat=Coalesce(NullIf(Trim('category'), Value('')), Value('Uncategorized'), output_field=CharField()),
+    ).values_list('month', 'cat').annotate(total=Sum('total')).order_by()
 
-    if not qs.exists():
+    rows = list(rows)
+    if not rows:
         # Return an empty dataframe if no transactions
-        months_index = pd.date_range(start=start, periods=months_back, freq='MS')
-        return pd.DataFrame(index=months_index)
-
-    # 3. Convert queryset to DataFrame
-    rows = [
-        {
-            'date': pd.to_datetime(t.date),
-            'category': t.category.strip() or 'Uncategorized',
-            'amount': float(t.amount)
-        } for t in qs
-    ]
-    df = pd.DataFrame(rows)
-
-    # Set 'date' as the index for time-series operations
-    df = df.set_index('date')
-
-    # 4. Create the pivot table
-    # This groups by month ('M') and category, summing the amounts
-    pivot = df.pivot_table(
-        index=pd.Grouper(freq='MS'), # 'MS' = Month Start
-        columns='category', 
-        values='amount', 
-        aggfunc='sum'
-    ).fillna(0.0)
-
-    # 5. Ensure all months are present
-    # Create a full date range and re-index the pivot table
-    # This fills in '0' for months with no spending
-    full_month_range = pd.date_range(start=start, end=end, freq='MS')
-    pivot = pivot.reindex(full_month_range, fill_value=0.0)
-
-    # Convert the index from Datetime to Date for consistency
-    pivot.index = pivot.index.date
-    return pivot
\ No newline at end of file
+        return pd.DataFrame(index=pd.date_range(start=start, periods=months_back, freq='MS'))
+
+    # 3. Scatter the aggregated rows straight into a (months x categories) matrix
+    # Months with no spending stay at 0
+    month_pos = {m.date(): i for i, m in enumerate(months_index)}
+    categories = sorted({cat for _, cat, _ in rows})
+    cat_pos = {cat: j for j, cat in enumerate(categories)}
+
+    matrix = np.zeros((len(months_index), len(categories)), dtype=float)
+    for month, cat, total in rows:
+        i = month_pos.get(month)
+        if i is not None: # Ignore future-dated rows beyond the current month
+            matrix[i, cat_pos[cat]] += float(total)
+
+    # Index by date for consistency with the rest of the AI code
+    return pd.DataFrame(matrix, index=months_index.date, columns=categories)
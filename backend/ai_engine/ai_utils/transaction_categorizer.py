@@ -1,6 +1,5 @@
 import os
 import joblib
-import re
 import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -8,7 +7,10 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import make_pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List
+
+from ai_engine.ai_utils.model_registry import get_model_registry
+from ai_engine.ai_utils.rule_engine import RuleMatcher, normalize_text
 
 # --- CORRECTED PATHS ---
 # Points to D:\finwise\backend
@@ -28,6 +30,7 @@ RULES = {
     'airline': 'Travel',
     'starbucks': 'Food & Beverage',
     'mcdonald': 'Food & Beverage',
+    'mcdonalds': 'Food & Beverage',
     'dominos': 'Food & Beverage',
     'netflix': 'Entertainment',
     'amazon': 'Shopping',
@@ -40,21 +43,31 @@ RULES = {
     'water': 'Utilities'
 }
 
-def normalize_text(s: str) -> str:
-    s = s.lower()
-    s = re.sub(r'[^a-z0-9\s]', ' ', s) # Remove punctuation
-    s = re.sub(r'\s+', ' ', s).strip() # Remove extra spaces
-    return s
+_rule_matcher = None
+
+def get_rule_matcher() -> RuleMatcher:
+    """
+    Returns the compiled rule matcher, built on first use from RULES plus
+    the optional keyword,category CSV at settings.CATEGORIZER_RULES_CSV.
+    """
+    global _rule_matcher
+    if _rule_matcher is None:
+        from django.conf import settings
+        rules_csv = getattr(settings, 'CATEGORIZER_RULES_CSV', None)
+        if rules_csv and os.path.exists(rules_csv):
+            _rule_matcher = RuleMatcher.from_csv(rules_csv, extra=RULES)
+        else:
+            _rule_matcher = RuleMatcher(RULES)
+    return _rule_matcher
 
 def apply_rules(description: str) -> Tuple[str, float]:
     """
     Returns (category, confidence) if rule found, else (None, 0.0)
     Confidence is high for rules (0.95)
     """
-    d = normalize_text(description)
-    for k, cat in RULES.items():
-        if k in d:
-            return cat, 0.95
+    cat = get_rule_matcher().match(description)
+    if cat:
+        return cat, 0.95
     return None, 0.0
 
 def train(csv_path: str, text_col='description', label_col='category', test_size=0.2, random_state=42) -> Dict:
@@ -87,12 +100,14 @@ def train(csv_path: str, text_col='description', label_col='category', test_size
 
 def load_model():
     """
-    Loads saved pipeline or returns None if not exists.
+    Returns the saved pipeline, or None if it doesn't exist.
+    The pipeline is unpickled once per worker and then kept resident in the
+    model registry (it is reloaded automatically after retraining).
     """
-    if os.path.exists(MODEL_PATH):
-        pkg = joblib.load(MODEL_PATH)
-        return pkg.get('pipeline') or pkg
-    return None
+    pkg = get_model_registry().get(MODEL_PATH)
+    if pkg is None:
+        return None
+    return pkg.get('pipeline') or pkg
 
 def predict(description: str, top_k=3) -> Dict:
     """
@@ -100,34 +115,59 @@ def predict(description: str, top_k=3) -> Dict:
     1. Tries rules first.
     2. Falls back to the ML model.
     """
+    return predict_batch([description], top_k=top_k)[0]
+
+def predict_batch(descriptions: List[str], top_k=3) -> List[Dict]:
+    """
+    Predicts categories for many descriptions at once.
+    Rules are applied per description; everything the rules don't catch goes
+    through a single vectorized predict_proba call on the whole batch.
+    Returns one result dict per description, in the same order.
+    """
+    results = [None] * len(descriptions)
+
     # 1) Try rules
-    cat, conf = apply_rules(description)
-    if cat:
-        return {'category': cat, 'confidence': conf, 'candidates': [(cat, conf)]}
+    pending = []
+    for i, description in enumerate(descriptions):
+        cat, conf = apply_rules(description)
+        if cat:
+            results[i] = {'category': cat, 'confidence': conf, 'candidates': [(cat, conf)]}
+        else:
+            pending.append(i)
+
+    if not pending:
+        return results
 
     # 2) Try ML model
     pipeline = load_model()
     if pipeline is None:
-        return {'category': None, 'confidence': 0.0, 'candidates': []}
+        for i in pending:
+            results[i] = {'category': None, 'confidence': 0.0, 'candidates': []}
+        return results
 
-    norm_desc = normalize_text(description)
+    norm_descs = [normalize_text(descriptions[i]) for i in pending]
 
     try:
-        # Get probabilities for all classes
-        probs = pipeline.predict_proba([norm_desc])[0]
+        # Get probabilities for all classes, one row per description
+        probs = pipeline.predict_proba(norm_descs)
         classes = pipeline.classes_
 
-        # Build (class, prob) list and sort it
-        candidates = sorted(list(zip(classes, probs)), key=lambda x: x[1], reverse=True)[:top_k]
-        top_cat, top_prob = candidates[0]
-
-        return {
-            'category': top_cat, 
-            'confidence': float(top_prob), 
-            'candidates': [(c, float(p)) for c, p in candidates]
-        }
+        # Indices of the top_k classes per row, best first
+        top_idx = np.argsort(-probs, axis=1)[:, :top_k]
+        top_probs = np.take_along_axis(probs, top_idx, axis=1)
+
+        for row, i in enumerate(pending):
+            candidates = [(classes[c], float(p)) for c, p in zip(top_idx[row], top_probs[row])]
+            top_cat, top_prob = candidates[0]
+            results[i] = {
+                'category': top_cat,
+                'confidence': top_prob,
+                'candidates': candidates
+            }
     except Exception as e:
         # Fallback if predict_proba fails (e.g., model trained on 1 class)
         print(f"Prediction error: {e}")
-        label = pipeline.predict([norm_desc])[0]
-        return {'category': label, 'confidence': 0.5, 'candidates': [(label, 0.5)]}
\ No newline at end of file
+        labels = pipeline.predict(norm_descs)
+        for label, i in zip(labels, pending):
+            results[i] = {'category': label, 'confidence': 0.5, 'candidates': [(label, 0.5)]}
+    return results
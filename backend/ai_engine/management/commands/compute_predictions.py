@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_engine.predictions import compute_predictions
+
+
+class Command(BaseCommand):
+    help = ("Precomputes next-month spend and expense predictions for every user "
+            "whose data or models changed since the last run. Meant to run nightly.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', dest='force',
+                            help="Recompute for every user, not only the changed ones.")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Users per feature matrix / predict call.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = compute_predictions(chunk_size=options['chunk_size'], force=options['force'])
+        for kind, c in counts.items():
+            self.stdout.write(f"{kind}: {c['users']} users refreshed, {c['predictions']} predictions written")
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
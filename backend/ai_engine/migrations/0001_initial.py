@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('kind', models.CharField(choices=[('category', 'Category spend'), ('expense', 'Monthly expense')], max_length=20)),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('model_version', models.CharField(max_length=40)),
+                ('data_version', models.PositiveBigIntegerField()),
+                ('predicted', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('model_type', models.CharField(max_length=20)),
+                ('model_score', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'kind', 'category', 'model_version'), name='uniq_prediction_key')],
+            },
+        ),
+    ]
@@ -1,3 +1,36 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+User = settings.AUTH_USER_MODEL
+
+
+class Prediction(models.Model):
+    """
+    A precomputed next-month prediction for one user.
+    Written in bulk by `manage.py compute_predictions` and served by the
+    prediction views as long as both the model version and the user's data
+    version still match.
+    """
+    KIND_CHOICES = (
+        ('category', 'Category spend'),
+        ('expense', 'Monthly expense'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='predictions')
+    month = models.DateField() # First day of the month being predicted
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    category = models.CharField(max_length=50, blank=True, default='') # Blank for 'expense'
+    model_version = models.CharField(max_length=40)
+    data_version = models.PositiveBigIntegerField()
+    predicted = models.DecimalField(max_digits=14, decimal_places=2)
+    model_type = models.CharField(max_length=20)
+    model_score = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'kind', 'category', 'model_version'], name='uniq_prediction_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.kind} {self.category}: {self.predicted}"
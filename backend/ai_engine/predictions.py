@@ -0,0 +1,249 @@
+# backend/ai_engine/predictions.py
+"""
+Next-month predictions, computed in bulk and stored in the Prediction table.
+
+The batch job (`manage.py compute_predictions`) builds one feature matrix per
+model over many users and calls `predict` once per matrix. The views look up
+the stored row first and only fall back to predicting live when it is missing
+or out of date (different model version or the user's data changed since).
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Value, CharField
+from django.db.models.functions import Trim, NullIf, Coalesce
+
+from ai_engine.ai_utils.model_registry import get_model_registry, directory_version
+from ai_engine.models import Prediction
+from transactions.models import MonthlyRollup, UserDataVersion
+from transactions.rollups import get_data_version
+
+logger = logging.getLogger(__name__)
+
+# Path to the global per-category spend models
+MODELS_DIR = os.path.join(settings.BASE_DIR, 'ai_models', 'spend_models')
+
+SPEND_MONTHS_BACK = 12
+
+
+def safe_name(s: str) -> str:
+    """Cleans a category name to be a safe filename."""
+    return "".join(c if c.isalnum() else "_" for c in s).lower()
+
+
+def load_global_model(category):
+    """
+    Returns the global model package for a specific category.
+    Packages are unpickled once per worker and then served from the registry.
+    """
+    gname = f"global_cat_{safe_name(category)}.pkl"
+    gpath = os.path.join(MODELS_DIR, gname)
+    return get_model_registry().get(gpath) # None if no model exists for this category
+
+
+def spend_model_version():
+    """ Changes whenever any global category model is retrained. """
+    return directory_version(MODELS_DIR, prefix='global_cat_')
+
+
+def next_month(today=None):
+    today = today or date.today()
+    return (pd.Timestamp(today.year, today.month, 1) + pd.DateOffset(months=1)).date()
+
+
+# --- Core prediction (shared by the batch job and the live fallback) ---
+
+def predict_spend(series_by_category):
+    """
+    series_by_category: {category: ndarray (n_users, n_months)} of monthly spend.
+    Returns {category: (predicted ndarray (n_users,), model_type, model_score)}
+    with one model.predict call per category.
+    """
+    out = {}
+    for category, series in series_by_category.items():
+        pkg = load_global_model(category)
+        if pkg:
+            model = pkg.get('model')
+            window = pkg.get('window', 3)
+            score = pkg.get('score', None)
+            if series.shape[1] >= window:
+                try:
+                    preds = np.maximum(0, model.predict(series[:, -window:]))
+                    out[category] = (preds, 'global', score)
+                    continue
+                except Exception:
+                    logger.exception("Spend prediction failed for %s, using the heuristic", category)
+        # Fallback heuristic: average of the last 3 months
+        out[category] = (series[:, -3:].mean(axis=1), 'heuristic', None)
+    return out
+
+
+def expense_features(expenses, window):
+    """
+    expenses: ndarray (n_users, n_months). Returns the insights model features
+    for every row at once: last `window` months, their mean and std.
+    """
+    lags = expenses[:, -window:]
+    return np.hstack([lags, lags.mean(axis=1, keepdims=True), lags.std(axis=1, keepdims=True)])
+
+
+# --- Reading stored predictions ---
+
+def stored_spend_predictions(user, categories):
+    """
+    Returns {category: Prediction} for the user's next month if every
+    requested category has a current stored prediction, else None.
+    """
+    rows = Prediction.objects.filter(
+        user=user, month=next_month(), kind='category',
+        model_version=spend_model_version(), data_version=get_data_version(user.id),
+    )
+    stored = {p.category: p for p in rows}
+    if not stored or any(c not in stored for c in categories):
+        return None
+    return stored
+
+
+def stored_expense_prediction(user):
+    """ Returns the current stored next-month expense Prediction, or None. """
+    from insights.utils import insights_model_version
+    return Prediction.objects.filter(
+        user=user, month=next_month(), kind='expense', category='',
+        model_version=insights_model_version(), data_version=get_data_version(user.id),
+    ).first()
+
+
+# --- Batch job ---
+
+def monthly_series(user_ids, months_back, type_='expense', by_category=True):
+    """
+    One grouped query over the rollups for a chunk of users.
+    Returns (months_index, {key: {user_id: ndarray (n_months,)}}) where key is
+    the category (or None when by_category is False).
+    """
+    today = date.today()
+    start = pd.Timestamp(today.year, today.month, 1) - pd.DateOffset(months=months_back - 1)
+    months_index = pd.date_range(start=start, periods=months_back, freq='MS')
+    month_pos = {m.date(): i for i, m in enumerate(months_index)}
+
+    qs = MonthlyRollup.objects.filter(user_id__in=user_ids, type=type_, month__gte=start.date())
+    if by_category:
+        qs = qs.annotate(
+            cat=Coalesce(NullIf(Trim('category'), Value('')), Value('Uncategorized'), output_field=CharField()),
+        ).values_list('user_id', 'month', 'cat')
+    else:
+        qs = qs.annotate(cat=Value(None, output_field=CharField())).values_list('user_id', 'month', 'cat')
+
+    series = defaultdict(dict)
+    for user_id, month, cat, total in qs.annotate(total=Sum('total')).order_by().iterator():
+        i = month_pos.get(month)
+        if i is None:
+            continue
+        row = series[cat].get(user_id)
+        if row is None:
+            row = series[cat][user_id] = np.zeros(months_back)
+        row[i] += float(total)
+    return months_index, series
+
+
+def _replace_predictions(user_ids, kind, month, rows):
+    with transaction.atomic():
+        Prediction.objects.filter(user_id__in=user_ids, kind=kind, month__lte=month).delete()
+        Prediction.objects.bulk_create(rows, batch_size=5000)
+
+
+def compute_spend_predictions(user_ids, versions, model_version, month):
+    """ Computes and stores next-month category predictions for a chunk of users. """
+    _, series = monthly_series(user_ids, SPEND_MONTHS_BACK)
+    matrices = {cat: np.vstack(list(by_user.values())) for cat, by_user in series.items()}
+    results = predict_spend(matrices)
+
+    rows = []
+    for cat, by_user in series.items():
+        preds, model_type, score = results[cat]
+        for user_id, pred in zip(by_user.keys(), preds):
+            rows.append(Prediction(
+                user_id=user_id, month=month, kind='category', category=cat,
+                model_version=model_version, data_version=versions.get(user_id, 0),
+                predicted=round(float(pred), 2), model_type=model_type, model_score=score,
+            ))
+    _replace_predictions(user_ids, 'category', month, rows)
+    return len(rows)
+
+
+def compute_expense_predictions(user_ids, versions, model_version, month):
+    """ Computes and stores next-month total expense predictions for a chunk of users. """
+    from insights.utils import user_model_path, global_model_path
+
+    registry = get_model_registry()
+    global_pkg = registry.get(global_model_path())
+    # Enough history for any model's window
+    _, series = monthly_series(user_ids, SPEND_MONTHS_BACK, by_category=False)
+    by_user = series.get(None, {})
+
+    # Group users by the model that serves them, so the global model runs once
+    groups = defaultdict(list)
+    for user_id in user_ids:
+        path = user_model_path(user_id)
+        if os.path.exists(path):
+            groups[(path, 'user')].append(user_id)
+        elif global_pkg is not None:
+            groups[(global_model_path(), 'global')].append(user_id)
+
+    rows = []
+    for (path, model_type), ids in groups.items():
+        pkg = registry.get(path)
+        if pkg is None:
+            continue
+        window = pkg.get('window', 3)
+        expenses = np.vstack([by_user.get(uid, np.zeros(SPEND_MONTHS_BACK)) for uid in ids])
+        preds = np.maximum(0, pkg['model'].predict(expense_features(expenses, window)))
+        for user_id, pred in zip(ids, preds):
+            rows.append(Prediction(
+                user_id=user_id, month=month, kind='expense', category='',
+                model_version=model_version, data_version=versions.get(user_id, 0),
+                predicted=round(float(pred), 2), model_type=model_type, model_score=pkg.get('score'),
+            ))
+    _replace_predictions(user_ids, 'expense', month, rows)
+    return len(rows)
+
+
+def users_needing_refresh(kind, model_version, month, force=False):
+    """
+    Returns {user_id: data_version} for users whose stored predictions are
+    missing or stale: their data changed after the last run, the model was
+    retrained, or the target month moved on.
+    """
+    versions = dict(UserDataVersion.objects.values_list('user_id', 'version'))
+    if force:
+        return versions
+    current = set(Prediction.objects.filter(kind=kind, month=month, model_version=model_version)
+                  .values_list('user_id', 'data_version').distinct())
+    return {uid: v for uid, v in versions.items() if (uid, v) not in current}
+
+
+def compute_predictions(chunk_size=5000, force=False):
+    """ Runs the batch job for both prediction kinds. Returns counts per kind. """
+    from insights.utils import insights_model_version
+
+    month = next_month()
+    jobs = [
+        ('category', spend_model_version(), compute_spend_predictions),
+        ('expense', insights_model_version(), compute_expense_predictions),
+    ]
+    counts = {}
+    for kind, model_version, compute in jobs:
+        versions = users_needing_refresh(kind, model_version, month, force=force)
+        user_ids = list(versions)
+        written = 0
+        for i in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[i:i + chunk_size]
+            written += compute(chunk, versions, model_version, month)
+        counts[kind] = {'users': len(user_ids), 'predictions': written}
+    return counts
@@ -8,4 +8,12 @@ class CategorizeResponseSerializer(serializers.Serializer):
     """ Defines the shape of the successful response. """
     category = serializers.CharField(allow_null=True)
     confidence = serializers.FloatField()
-    candidates = serializers.ListField(child=serializers.ListField(), allow_empty=True)
\ No newline at end of file
+    candidates = serializers.ListField(child=serializers.ListField(), allow_empty=True)
+
+class CategorizeBatchRequestSerializer(serializers.Serializer):
+    """ Validates a batch of descriptions for bulk categorization. """
+    descriptions = serializers.ListField(
+        child=serializers.CharField(max_length=500, allow_blank=False),
+        allow_empty=False,
+        max_length=10000,
+    )
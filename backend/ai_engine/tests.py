@@ -1,3 +1,477 @@
-from django.test import TestCase
+import os
+import tempfile
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import RandomForestRegressor
+
+from finwise_backend.testing import QueryBudgetTestCase
+from transactions.models import Transaction
+from users.models import User
+from .ai_utils.incremental import FeatureCache, current_data_versions, extend_forest
+from .ai_utils.model_registry import ModelRegistry, directory_version
+from .ai_utils.rule_engine import RuleMatcher, normalize_text
+from .ai_utils.transaction_categorizer import RULES, apply_rules
+from .models import Prediction
+from .predictions import compute_predictions
+
+
+class RuleMatcherTests(SimpleTestCase):
+
+    def test_whole_words_only(self):
+        matcher = RuleMatcher({'rent': 'Housing', 'ola': 'Transport'})
+        self.assertEqual(matcher.match('House rent for March'), 'Housing')
+        self.assertEqual(matcher.match('RENT'), 'Housing')
+        for description in ['parent teacher meeting', 'current account fee', 'rental car',
+                            'coca cola', 'granola bar']:
+            with self.subTest(description=description):
+                self.assertIsNone(matcher.match(description))
+
+    def test_longest_keyword_wins(self):
+        matcher = RuleMatcher({'uber': 'Transport', 'uber eats': 'Food & Beverage', 'amazon': 'Shopping',
+                               'amazon prime video': 'Entertainment'})
+        self.assertEqual(matcher.match('Uber trip home'), 'Transport')
+        self.assertEqual(matcher.match('Uber Eats order'), 'Food & Beverage')
+        self.assertEqual(matcher.match('amazon prime video subscription'), 'Entertainment')
+        # A prefix of a longer keyword still matches on its own
+        self.assertEqual(matcher.match('amazon prime'), 'Shopping')
+
+    def test_leftmost_keyword_wins(self):
+        matcher = RuleMatcher({'salary': 'Income', 'uber': 'Transport'})
+        self.assertEqual(matcher.match('uber refund with salary'), 'Transport')
+        self.assertEqual(matcher.match('salary minus uber'), 'Income')
+
+    def test_punctuation_and_case(self):
+        matcher = RuleMatcher({"McDonald's": 'Food & Beverage', 'e-bill': 'Utilities'})
+        self.assertEqual(normalize_text("  McDONALD'S #42, Pune "), 'mcdonald s 42 pune')
+        self.assertEqual(matcher.match("MCDONALD'S #42"), 'Food & Beverage')
+        self.assertEqual(matcher.match('Electricity E-Bill (Oct)'), 'Utilities')
+        self.assertIsNone(matcher.match(''))
+
+    def test_from_csv_overrides_extra(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.csv')
+            with open(path, 'w') as f:
+                f.write('keyword,category\nuber,Travel\nswiggy,Food & Beverage\n')
+            matcher = RuleMatcher.from_csv(path, extra=RULES)
+        self.assertEqual(matcher.match('uber to airport'), 'Travel')
+        self.assertEqual(matcher.match('swiggy dinner'), 'Food & Beverage')
+        self.assertEqual(matcher.match('netflix'), 'Entertainment')
+        self.assertEqual(len(matcher), len(RULES) + 1)
+
+    def test_apply_rules(self):
+        self.assertEqual(apply_rules('Monthly rent transfer'), ('Housing', 0.95))
+        self.assertEqual(apply_rules('Gift for parent'), (None, 0.0))
+
+
+class ModelRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def dump(self, name, package, mtime=None):
+        path = os.path.join(self.dir.name, name)
+        joblib.dump(package, path)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_hit_after_first_load(self):
+        path = self.dump('a.pkl', {'model': 'a'})
+        registry = ModelRegistry()
+        first = registry.get(path)
+        self.assertEqual(first, {'model': 'a'})
+        self.assertIs(registry.get(path), first)
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['loads']), (1, 1, 1))
+        self.assertIsNone(registry.get(os.path.join(self.dir.name, 'missing.pkl')))
+
+    def test_evicts_least_recently_used(self):
+        paths = [self.dump(f'{name}.pkl', {'model': name, 'pad': 'x' * 1000}) for name in 'abc']
+        size = os.path.getsize(paths[0])
+        registry = ModelRegistry(max_bytes=2 * size + size // 2)
+        a, b, c = paths
+        registry.get(a)
+        registry.get(b)
+        registry.get(a)  # b is now the least recently used
+        registry.get(c)
+        self.assertEqual(registry.evictions, 1)
+        self.assertLessEqual(registry.stats()['bytes'], registry.max_bytes)
+        loads = registry.loads
+        registry.get(a)
+        registry.get(c)
+        self.assertEqual(registry.loads, loads)
+        registry.get(b)
+        self.assertEqual(registry.loads, loads + 1)
+
+    def test_keeps_single_oversized_entry(self):
+        path = self.dump('big.pkl', {'pad': 'x' * 1000})
+        registry = ModelRegistry(max_bytes=10)
+        registry.get(path)
+        registry.get(path)
+        self.assertEqual(registry.stats()['entries'], 1)
+        self.assertEqual(registry.hits, 1)
+
+    def test_reloads_after_retrain(self):
+        path = self.dump('a.pkl', {'version': 1}, mtime=1_000_000)
+        registry = ModelRegistry()
+        self.assertEqual(registry.get(path), {'version': 1})
+        version = directory_version(self.dir.name)
+        self.dump('a.pkl', {'version': 2}, mtime=1_000_100)
+        self.assertEqual(registry.get(path), {'version': 2})
+        self.assertEqual(registry.loads, 2)
+        self.assertNotEqual(directory_version(self.dir.name), version)
+        # Removing the file drops the cached package too
+        os.remove(path)
+        self.assertIsNone(registry.get(path))
+        self.assertEqual(registry.stats()['entries'], 0)
+
+
+class FakePipeline:
+    """ Scores 'coffee' as Food and everything else as Fun; counts its calls. """
+    classes_ = np.array(['Food', 'Fun', 'Travel'])
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, descriptions):
+        self.calls.append(list(descriptions))
+        return np.array([[0.7, 0.2, 0.1] if 'coffee' in d else [0.1, 0.6, 0.3] for d in descriptions])
+
+
+class BrokenPipeline:
+    """ A model trained on one class: predict_proba fails, predict still works. """
+
+    def predict_proba(self, descriptions):
+        raise ValueError('only one class')
+
+    def predict(self, descriptions):
+        return ['Misc'] * len(descriptions)
+
+
+class CategorizeBatchTests(APITestCase):
+
+    url = '/api/ai/categorize-batch/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='batch', email='batch@example.com')
+        self.client.force_authenticate(self.user)
+
+    def test_results_in_input_order(self):
+        pipeline = FakePipeline()
+        descriptions = ['Morning coffee', 'House rent', 'Concert tickets', 'Uber ride', 'coffee beans']
+        with mock.patch('ai_engine.ai_utils.transaction_categorizer.load_model', return_value=pipeline):
+            response = self.client.post(self.url, {'descriptions': descriptions}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r['category'] for r in results], ['Food', 'Housing', 'Fun', 'Transport', 'Food'])
+        self.assertEqual(results[1]['confidence'], 0.95)
+        self.assertEqual([c for c, _ in results[2]['candidates']], ['Fun', 'Travel', 'Food'])
+        # One vectorized call for everything the rules didn't catch
+        self.assertEqual(pipeline.calls, [['morning coffee', 'concert tickets', 'coffee beans']])
+
+    def test_matches_single_predictions(self):
+        descriptions = ['Morning coffee', 'Salary credit', 'Concert tickets']
+        with mock.patch('ai_engine.ai_utils.transaction_categorizer.load_model', return_value=FakePipeline()):
+            batch = self.client.post(self.url, {'descriptions': descriptions}, format='json').data['results']
+            single = [self.client.post('/api/ai/categorize-transaction/', {'description': d}, format='json').data
+                      for d in descriptions]
+        self.assertEqual(batch, single)
+
+    def test_without_model(self):
+        with mock.patch('ai_engine.ai_utils.transaction_categorizer.load_model', return_value=None):
+            response = self.client.post(self.url, {'descriptions': ['Netflix', 'Concert tickets']}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'category': 'Entertainment', 'confidence': 0.95, 'candidates': [('Entertainment', 0.95)]},
+            {'category': None, 'confidence': 0.0, 'candidates': []},
+        ])
+
+    def test_model_without_probabilities(self):
+        with mock.patch('ai_engine.ai_utils.transaction_categorizer.load_model', return_value=BrokenPipeline()):
+            response = self.client.post(self.url, {'descriptions': ['Concert tickets', 'Flight to Goa', 'Gift']},
+                                        format='json')
+        self.assertEqual([(r['category'], r['confidence']) for r in response.data['results']],
+                         [('Misc', 0.5), ('Travel', 0.95), ('Misc', 0.5)])
+
+    def test_invalid_items_reported_by_index(self):
+        response = self.client.post(self.url, {'descriptions': ['Coffee', '', 'x' * 501]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['descriptions']), {1, 2})
+        for body in [{'descriptions': []}, {}, {'descriptions': 'Coffee'}]:
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post(self.url, body, format='json').status_code, 400)
+
+    def test_requires_login(self):
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.post(self.url, {'descriptions': ['Coffee']}, format='json').status_code, (401, 403))
+
+
+def constant_model(value, window=3, score=0.9):
+    """ A model package that always predicts `value` from `window` lag features. """
+    model = DummyRegressor(strategy='constant', constant=value).fit(np.zeros((1, window)), [value])
+    return {'model': model, 'window': window, 'score': score}
+
+
+def months_ago(n):
+    """ First day of the month `n` months before this one. """
+    month = date.today().replace(day=1)
+    for _ in range(n):
+        month = (month - timedelta(days=1)).replace(day=1)
+    return month
+
+
+class StoredPredictionTests(QueryBudgetTestCase):
+    """ Views serve the nightly predictions while current and predict live otherwise. """
+
+    def setUp(self):
+        super().setUp()
+        spend_dir = tempfile.TemporaryDirectory()
+        insights_dir = tempfile.TemporaryDirectory()
+        for d in (spend_dir, insights_dir):
+            self.addCleanup(d.cleanup)
+        for patcher in [mock.patch('ai_engine.predictions.MODELS_DIR', spend_dir.name),
+                        mock.patch('insights.utils.MODELS_DIR', insights_dir.name)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.spend_dir, self.insights_dir = spend_dir.name, insights_dir.name
+
+        # Food has a global spend model, Fun falls back to the 3-month average
+        self.dump(self.spend_dir, 'global_cat_food.pkl', constant_model(50))
+        self.dump(self.insights_dir, 'global_rf.pkl', constant_model(321))
+
+        self.user = User.objects.create_user(username='saver', email='saver@example.com')
+        self.client.force_authenticate(self.user)
+        for n, amount in [(2, 30), (1, 60), (0, 90)]:
+            self.spend(amount, 'Fun', months_ago(n))
+            self.spend(10, 'Food', months_ago(n))
+
+    def dump(self, directory, name, package, mtime=1_000_000):
+        path = os.path.join(directory, name)
+        joblib.dump(package, path)
+        os.utime(path, (mtime, mtime))
+
+    def spend(self, amount, category, day=None):
+        Transaction.objects.create(user=self.user, title='t', amount=amount, type='expense',
+                                   category=category, date=day or date.today())
+
+    def spend_predictions(self):
+        response = self.client.get('/api/ai/predict-spending/')
+        self.assertEqual(response.status_code, 200)
+        return {p['category']: (p['predicted'], p['model_type']) for p in response.data['predictions']}
+
+    def expense_prediction(self):
+        response = self.client.get('/api/insights/predict-monthly/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['predicted_expense'], response.data['model_type']
+
+    def test_batch_matches_live(self):
+        live = self.spend_predictions(), self.expense_prediction()
+        self.assertEqual(live, ({'Food': (50, 'global'), 'Fun': (60, 'heuristic')}, (321, 'global')))
+        counts = compute_predictions()
+        self.assertEqual(counts, {'category': {'users': 1, 'predictions': 2},
+                                  'expense': {'users': 1, 'predictions': 1}})
+        self.assertEqual((self.spend_predictions(), self.expense_prediction()), live)
+
+    def test_serves_stored_until_data_changes(self):
+        compute_predictions()
+        # Mark the stored rows so it's visible which path answered
+        Prediction.objects.filter(category='Fun').update(predicted=999)
+        Prediction.objects.filter(kind='expense').update(predicted=888)
+        self.assertEqual(self.spend_predictions()['Fun'], (999, 'heuristic'))
+        self.assertEqual(self.expense_prediction(), (888, 'global'))
+
+        self.spend(30, 'Fun')
+        self.assertEqual(self.spend_predictions()['Fun'], (70, 'heuristic'))
+        self.assertEqual(self.expense_prediction(), (321, 'global'))
+
+    def test_stored_needs_every_category(self):
+        compute_predictions()
+        Prediction.objects.filter(category='Food').update(predicted=999)
+        Prediction.objects.filter(category='Fun').delete()
+        self.assertEqual(self.spend_predictions(), {'Food': (50, 'global'), 'Fun': (60, 'heuristic')})
+
+    def test_live_results_follow_data_version(self):
+        self.assertEqual(self.spend_predictions()['Fun'], (60, 'heuristic'))
+        self.spend(30, 'Fun')
+        self.assertEqual(self.spend_predictions()['Fun'], (70, 'heuristic'))
+        Transaction.objects.filter(user=self.user, category='Fun', date=months_ago(2)).delete()
+        self.assertEqual(self.spend_predictions()['Fun'], (60, 'heuristic'))
+
+    def test_retrain_invalidates_stored(self):
+        compute_predictions()
+        Prediction.objects.update(predicted=999)
+        self.dump(self.spend_dir, 'global_cat_food.pkl', constant_model(75), mtime=2_000_000)
+        self.dump(self.insights_dir, f'user_{self.user.id}_rf.pkl', constant_model(111))
+        self.assertEqual(self.spend_predictions(), {'Food': (75, 'global'), 'Fun': (60, 'heuristic')})
+        self.assertEqual(self.expense_prediction(), (111, 'user'))
+
+    def test_recomputes_only_changed_users(self):
+        other = User.objects.create_user(username='other', email='other@example.com')
+        Transaction.objects.create(user=other, title='t', amount=5, type='expense', category='Fun')
+        self.assertEqual(compute_predictions()['category']['users'], 2)
+        self.assertEqual(compute_predictions()['category'], {'users': 0, 'predictions': 0})
+        self.spend(30, 'Fun')
+        self.assertEqual(compute_predictions()['expense'], {'users': 1, 'predictions': 1})
+        self.assertEqual(Prediction.objects.filter(user=other).count(), 2)
+
+
+class IncrementalTrainingTests(TestCase):
+    """ An incremental run must see exactly the data a full rebuild would. """
+
+    def setUp(self):
+        from ai_engine import train_spending
+        from insights import train_insights
+        self.train_spending, self.train_insights = train_spending, train_insights
+        models_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(models_dir.cleanup)
+        self.models_dir = models_dir.name
+        for module in (train_spending, train_insights):
+            patcher = mock.patch.object(module, 'MODELS_DIR', self.models_dir)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.users = [User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com') for i in range(4)]
+        for i, user in enumerate(self.users):
+            for n in range(12):
+                self.spend(user, 10 * (i + 1) + n, 'Food', months_ago(n))
+                self.spend(user, 5 + (i + n) % 3, 'Fun', months_ago(n))
+
+    def spend(self, user, amount, category, day):
+        return Transaction.objects.create(user=user, title='t', amount=amount, type='expense',
+                                          category=category, date=day)
+
+    def change_data(self):
+        """ One of each: edit inside the window, edit outside it, new user, deleted user. """
+        a, b, _, d = self.users
+        self.spend(a, 40, 'Food', date.today())
+        self.spend(b, 999, 'Food', months_ago(40))
+        c = User.objects.create_user(username='new', email='new@example.com')
+        for n in range(12):
+            self.spend(c, 7, 'Travel', months_ago(n))
+        d.delete()
+        return a, b, c, d
+
+    def spend_cache(self, months_back):
+        ts = self.train_spending
+        return FeatureCache(os.path.join(self.models_dir, 'feature_cache.pkl'),
+                            key={'months_back': months_back, 'start': ts.window_start(months_back)})
+
+    def assertSeriesEqual(self, cached, expected):
+        self.assertEqual(set(cached), set(expected))
+        for user_id, series in expected.items():
+            self.assertEqual(set(cached[user_id]), set(series), user_id)
+            for key, row in series.items():
+                np.testing.assert_array_equal(cached[user_id][key], row)
+
+    def test_feature_cache_matches_full_extraction(self):
+        ts = self.train_spending
+        cache = self.spend_cache(12)
+        versions = current_data_versions()
+        cache.update(ts.per_user_series(ts.extract_training_series(months_back=12)), versions, list(versions))
+        cache.save()
+
+        a, b, c, d = self.change_data()
+        cache = self.spend_cache(12)
+        self.assertTrue(cache.valid)
+        versions = current_data_versions()
+        stale = cache.stale_user_ids(versions)
+        self.assertEqual(set(stale), {a.id, b.id, c.id})
+        series = ts.per_user_series(ts.extract_training_series(months_back=12, user_ids=stale))
+        changed = cache.update(series, versions, stale)
+        # b's change is outside the window: re-read, but nothing to retrain
+        self.assertEqual(set(changed), {a.id, c.id})
+
+        full = ts.per_user_series(ts.extract_training_series(months_back=12))
+        self.assertSeriesEqual({uid: entry['series'] for uid, entry in cache.users.items()}, full)
+        # Same training rows, whatever order the users come in
+        incremental = ts.build_lag_tensors(cache.matrices())
+        rebuilt = ts.build_lag_tensors({cat: m for cat, (_, m) in ts.extract_training_series(months_back=12).items()})
+        self.assertEqual(set(incremental), set(rebuilt))
+        for cat, (X, y) in rebuilt.items():
+            got = np.column_stack(incremental[cat])
+            want = np.column_stack([X, y])
+            np.testing.assert_array_equal(got[np.lexsort(got.T)], want[np.lexsort(want.T)])
+
+    def test_cache_for_another_window_is_ignored(self):
+        cache = self.spend_cache(12)
+        cache.save()
+        self.assertTrue(self.spend_cache(12).valid)
+        self.assertFalse(self.spend_cache(24).valid)
+
+    def test_spend_models_warm_start_changed_categories_only(self):
+        ts = self.train_spending
+        with redirect_stdout(StringIO()):
+            ts.main(months_back=12, workers=1)
+        food = os.path.join(self.models_dir, 'global_cat_food.pkl')
+        fun = os.path.join(self.models_dir, 'global_cat_fun.pkl')
+        self.assertEqual(joblib.load(food)['model'].n_estimators, 100)
+        os.utime(fun, (1_000_000, 1_000_000))
+
+        self.spend(self.users[0], 40, 'Food', date.today())
+        with redirect_stdout(StringIO()):
+            ts.main(months_back=12, workers=1, incremental=True)
+        self.assertEqual(joblib.load(food)['model'].n_estimators, 120)
+        self.assertEqual(os.stat(fun).st_mtime, 1_000_000)
+        full = ts.per_user_series(ts.extract_training_series(months_back=12))
+        self.assertSeriesEqual({uid: e['series'] for uid, e in self.spend_cache(12).users.items()}, full)
+
+    def test_insights_models_retrain_changed_users_only(self):
+        ti = self.train_insights
+        with redirect_stdout(StringIO()):
+            ti.main()
+        paths = {user.id: os.path.join(self.models_dir, f'user_{user.id}_rf.pkl') for user in self.users}
+        for path in paths.values():
+            os.utime(path, (1_000_000, 1_000_000))
+        global_path = os.path.join(self.models_dir, 'global_rf.pkl')
+        self.assertEqual(joblib.load(global_path)['model'].n_estimators, 200)
+
+        a, b, c, d = self.change_data()
+        with redirect_stdout(StringIO()):
+            ti.main(incremental=True)
+        self.assertNotEqual(os.stat(paths[a.id]).st_mtime, 1_000_000)
+        self.assertEqual(os.stat(paths[b.id]).st_mtime, 1_000_000)
+        self.assertEqual(os.stat(paths[self.users[2].id]).st_mtime, 1_000_000)
+        self.assertTrue(os.path.exists(os.path.join(self.models_dir, f'user_{c.id}_rf.pkl')))
+        self.assertEqual(joblib.load(global_path)['model'].n_estimators, 220)
+
+        cache = FeatureCache(os.path.join(self.models_dir, 'feature_cache.pkl'), key=None)
+        cache.users = joblib.load(cache.path)['users']
+        full = {uid: {'expense': row} for uid, row in ti.expense_series(current_data_versions()).items()}
+        self.assertSeriesEqual({uid: e['series'] for uid, e in cache.users.items()}, full)
+
+
+class ExtendForestTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.uniform(0, 100, size=(400, 3))
+        self.y = self.X.mean(axis=1)
+
+    def test_adds_trees_and_keeps_old_ones(self):
+        model = RandomForestRegressor(n_estimators=30, random_state=42).fit(self.X[:200], self.y[:200])
+        old_trees = list(model.estimators_)
+        self.assertTrue(extend_forest(model, self.X[200:], self.y[200:], add_estimators=10))
+        self.assertEqual(model.n_estimators, 40)
+        self.assertEqual(model.estimators_[:30], old_trees)
+        self.assertFalse(model.warm_start)
+
+        # About as good as refitting everything from scratch
+        full = RandomForestRegressor(n_estimators=40, random_state=42).fit(self.X, self.y)
+        grid = np.random.default_rng(1).uniform(0, 100, size=(200, 3))
+        truth = grid.mean(axis=1)
+        warm_err = np.abs(model.predict(grid) - truth).mean()
+        full_err = np.abs(full.predict(grid) - truth).mean()
+        self.assertLess(warm_err, 1.5 * full_err)
+
+    def test_refuses_past_cap(self):
+        model = RandomForestRegressor(n_estimators=290, random_state=42).fit(self.X[:50], self.y[:50])
+        self.assertFalse(extend_forest(model, self.X[50:], self.y[50:], add_estimators=20, max_estimators=300))
+        self.assertEqual((model.n_estimators, len(model.estimators_)), (290, 290))
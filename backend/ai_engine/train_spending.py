@@ -1,6 +1,12 @@
 # backend/ai_engine/train_spending.py
+import argparse
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import tracemalloc
+from array import array
+from datetime import date
 import django
 import numpy as np
 import pandas as pd
@@ -15,10 +21,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finwise_backend.settings')
 django.setup()
 # --- End Django Setup ---
 
-from django.contrib.auth import get_user_model
-from ai_engine.ai_utils.spend_utils import build_monthly_category_matrix
-
-User = get_user_model()
+from django.db.models import Sum, Value, CharField
+from django.db.models.functions import Trim, NullIf, Coalesce
+from numpy.lib.stride_tricks import sliding_window_view
+from transactions.models import MonthlyRollup
+from ai_engine.ai_utils.incremental import FeatureCache, current_data_versions, extend_forest
 
 # Save models in a subfolder of the 'ai_models' directory from Day 13
 MODELS_DIR = os.path.join(BASE_DIR, 'ai_models', 'spend_models')
@@ -45,7 +52,7 @@ def create_lag_features(series, window=3):
 
     return np.array(X), np.array(y)
 
-def train_global_category_model(category, X_all, y_all, window=3):
+def train_global_category_model(category, X_all, y_all, window=3, n_jobs=-1):
     """
     Trains and saves a single global model for a specific category.
     """
@@ -54,7 +61,7 @@ def train_global_category_model(category, X_all, y_all, window=3):
         return None
 
     X_train, X_test, y_train, y_test = train_test_split(X_all, y_all, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
     score = model.score(X_test, y_test)
 
@@ -63,48 +70,279 @@ def train_global_category_model(category, X_all, y_all, window=3):
     joblib.dump({'model': model, 'window': window, 'score': score, 'category': category}, path)
     return {'path': path, 'score': score}
 
-def main(months_back=36, window=3):
-    users = User.objects.all()
-    print(f"--- Training Spending Models for {users.count()} users ---")
+def window_start(months_back=36):
+    """ First month of the training window (the window ends with the current month). """
+    today = date.today()
+    return (pd.Timestamp(today.year, today.month, 1) - pd.DateOffset(months=months_back - 1)).date()
+
+def _stream_rollup_rows(start_date, user_ids=None, chunk_size=20000, id_chunk=5000):
+    """ Yields (category, user_id, month, total); for everyone, or for user_ids in chunks. """
+    qs = MonthlyRollup.objects.filter(type='expense', month__gte=start_date)
+    if user_ids is None:
+        id_chunks = [None]
+    else:
+        user_ids = list(user_ids)
+        id_chunks = [user_ids[i:i + id_chunk] for i in range(0, len(user_ids), id_chunk)]
+    for ids in id_chunks:
+        rows = qs if ids is None else qs.filter(user_id__in=ids)
+        rows = rows \
+            .annotate(cat=Coalesce(NullIf(Trim('category'), Value('')), Value('Uncategorized'), output_field=CharField())) \
+            .values_list('cat', 'user_id', 'month') \
+            .annotate(total=Sum('total')) \
+            .order_by()
+        yield from rows.iterator(chunk_size=chunk_size)
+
+def extract_training_series(months_back=36, chunk_size=20000, user_ids=None):
+    """
+    Streams users' monthly expense per category out of the rollups in one
+    grouped query (a server-side cursor on Postgres) and reshapes it into
+    { 'category_name': (user_ids, array of shape (n_users_with_category, months_back)) }.
+    Pass user_ids to only extract those users.
+    """
+    start_date = window_start(months_back)
+
+    # Flat column buffers: category code, user id, month offset, amount
+    cat_codes = {}
+    cats, users, months, amounts = array('i'), array('q'), array('i'), array('d')
+    for cat, user_id, month, total in _stream_rollup_rows(start_date, user_ids, chunk_size):
+        offset = (month.year - start_date.year) * 12 + (month.month - start_date.month)
+        if offset >= months_back:
+            continue # Future-dated rows beyond the current month
+        cats.append(cat_codes.setdefault(cat, len(cat_codes)))
+        users.append(user_id)
+        months.append(offset)
+        amounts.append(float(total))
+
+    cats = np.frombuffer(cats, dtype=np.int32)
+    users = np.frombuffer(users, dtype=np.int64)
+    months = np.frombuffer(months, dtype=np.int32)
+    amounts = np.frombuffer(amounts, dtype=float)
+
+    # Group the rows by category, then scatter each group into a dense
+    # (users x months) matrix
+    order = np.argsort(cats, kind='stable')
+    bounds = np.searchsorted(cats[order], np.arange(len(cat_codes) + 1))
+    series = {}
+    for cat, code in cat_codes.items():
+        idx = order[bounds[code]:bounds[code + 1]]
+        user_ids_cat, user_row = np.unique(users[idx], return_inverse=True)
+        matrix = np.zeros((len(user_ids_cat), months_back))
+        np.add.at(matrix, (user_row, months[idx]), amounts[idx])
+        series[cat] = (user_ids_cat, matrix)
+    return series
 
-    # 1. Gather data from all users
-    global_data = {}  # Format: { 'category_name': {'X': [], 'y': []} }
+def per_user_series(series):
+    """ Regroups {category: (user_ids, matrix)} as {user_id: {category: row}}. """
+    by_user = {}
+    for category, (user_ids, matrix) in series.items():
+        for user_id, row in zip(user_ids.tolist(), matrix):
+            by_user.setdefault(user_id, {})[category] = row
+    return by_user
 
-    for user in users:
-        print(f"Processing data for: {user.username}")
-        pivot = build_monthly_category_matrix(user, months_back=months_back)
-        if pivot.empty:
+def build_lag_tensors(series, window=3):
+    """
+    Vectorized version of create_lag_features over all users of a category.
+    Takes { 'category_name': (users x months) matrix } and
+    returns { 'category_name': (X, y) }, skipping all-zero series and
+    categories without enough months.
+    """
+    data = {}
+    for category, matrix in series.items():
+        matrix = matrix[matrix.sum(axis=1) != 0] # Skip if category is all zeros
+        if len(matrix) == 0 or matrix.shape[1] <= window:
             continue
+        # (users, months - window, window + 1): each slice is 3 lags + target
+        windows = sliding_window_view(matrix, window + 1, axis=1).reshape(-1, window + 1)
+        data[category] = (windows[:, :window], windows[:, window])
+    return data
 
-        for category in pivot.columns:
-            series = pivot[category].values
-            if np.sum(series) == 0: # Skip if category is all zeros
-                continue
+def main(months_back=36, window=3, workers=None, max_worker_mem_mb=None, incremental=False):
+    print("--- Extracting training data ---")
+    cache = FeatureCache(os.path.join(MODELS_DIR, 'feature_cache.pkl'),
+                         key={'months_back': months_back, 'start': window_start(months_back)})
+    versions = current_data_versions()
 
-            X, y = create_lag_features(series, window=window)
+    # 1. Gather data: everyone in one pass, or only users whose data changed
+    tracemalloc.start()
+    started = time.perf_counter()
+    if incremental and cache.valid:
+        stale = cache.stale_user_ids(versions)
+        series = extract_training_series(months_back=months_back, user_ids=stale)
+        before = cache.snapshot(stale)
+        changed = cache.update(per_user_series(series), versions, stale)
+        print(f"Incremental run: {len(stale)} users with new data versions, {len(changed)} with changed series")
+        global_data = build_lag_tensors(cache.matrices(), window=window)
+        # Only the categories whose rows changed get warm-started
+        new_data = build_lag_tensors(cache.changed_matrices(before, changed), window=window)
+    else:
+        if incremental:
+            print("No usable feature cache for this window; doing a full build")
+        series = extract_training_series(months_back=months_back)
+        by_user = per_user_series(series)
+        cache.users = {}
+        cache.update(by_user, versions, set(versions) | set(by_user))
+        global_data = build_lag_tensors({c: m for c, (_, m) in series.items()}, window=window)
+        new_data = None
+    extraction_s = time.perf_counter() - started
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
 
-            if X is not None:
-                if category not in global_data:
-                    global_data[category] = {'X': [], 'y': []}
-                global_data[category]['X'].append(X)
-                global_data[category]['y'].append(y)
+    n_samples = sum(len(y) for _, y in global_data.values())
+    print(f"Extracted {n_samples} samples in {extraction_s:.2f}s "
+          f"(peak memory {peak_bytes / 1024 / 1024:.1f} MiB)")
 
-    # 2. Train one model for each category
+    # 2. Train one model for each category, spread over a process pool
     print(f"\n--- Found {len(global_data)} categories. Training global models... ---")
-    global_trained = 0
-    for category, parts in global_data.items():
-        try:
-            X_all = np.vstack(parts['X'])
-            y_all = np.concatenate(parts['y'])
+    global_trained = train_categories(global_data, window=window, workers=workers,
+                                      max_worker_mem_mb=max_worker_mem_mb, new_data=new_data)
+    cache.save()
+
+    print(f"\n--- Training Finished. {global_trained} global models trained. ---")
+
+def update_global_category_model(category, X_new, y_new, window=3, n_jobs=-1,
+                                 add_estimators=20, max_estimators=300):
+    """
+    Warm-starts the saved model for a category: adds a few trees fitted on
+    the new rows only. Returns None if there is no compatible saved model or
+    the forest is already at max_estimators (the caller then refits).
+    """
+    path = os.path.join(MODELS_DIR, f"global_cat_{safe_name(category)}.pkl")
+    if not os.path.exists(path):
+        return None
+    pkg = joblib.load(path)
+    model = pkg['model']
+    if pkg.get('window', 3) != window:
+        return None
+
+    score = pkg.get('score')
+    model.set_params(n_jobs=n_jobs)
+    if len(X_new) >= 10:
+        X_train, X_test, y_train, y_test = train_test_split(X_new, y_new, test_size=0.2, random_state=42)
+    else:
+        X_train, y_train, X_test, y_test = X_new, y_new, None, None
+    if not extend_forest(model, X_train, y_train, add_estimators, max_estimators):
+        return None
+    if X_test is not None:
+        score = model.score(X_test, y_test)
+
+    joblib.dump({'model': model, 'window': window, 'score': score, 'category': category}, path)
+    return {'path': path, 'score': score, 'warm': True}
+
+def _limit_worker_memory(max_mb):
+    """ Pool initializer: caps the address space of a training worker. """
+    if not max_mb:
+        return
+    try:
+        import resource
+    except ImportError: # Not available on Windows
+        return
+    limit = int(max_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _train_category_job(category, X_all, y_all, window, X_new=None, y_new=None, n_jobs=1):
+    """
+    Trains one category: warm-starts the saved model on the new rows when
+    there are any, otherwise (or if that isn't possible) refits on all rows.
+    Runs in a worker process with a single-threaded forest by default.
+    """
+    started = time.perf_counter()
+    res = None
+    if X_new is not None:
+        res = update_global_category_model(category, X_new, y_new, window=window, n_jobs=n_jobs)
+    if res is None:
+        res = train_global_category_model(category, X_all, y_all, window=window, n_jobs=n_jobs)
+    return res, time.perf_counter() - started
 
-            res = train_global_category_model(category, X_all, y_all, window=window)
+def _category_jobs(global_data, new_data):
+    """
+    (category, X_all, y_all, X_new, y_new) per category that needs work.
+    In incremental mode, categories with no new rows and an existing model
+    are left alone.
+    """
+    jobs = []
+    for category, (X_all, y_all) in global_data.items():
+        if new_data is None:
+            jobs.append((category, X_all, y_all, None, None))
+            continue
+        path = os.path.join(MODELS_DIR, f"global_cat_{safe_name(category)}.pkl")
+        if category in new_data and os.path.exists(path):
+            X_new, y_new = new_data[category]
+            jobs.append((category, X_all, y_all, X_new, y_new))
+        elif not os.path.exists(path):
+            jobs.append((category, X_all, y_all, None, None))
+        else:
+            print(f"  -> Unchanged '{category}': keeping saved model")
+    return jobs
+
+def train_categories(global_data, window=3, workers=None, max_worker_mem_mb=None, new_data=None):
+    """
+    Trains every category's model and returns how many were trained.
+
+    Categories are submitted largest first (longest-processing-time-first),
+    so the big jobs start early and the small ones fill in the gaps at the
+    end instead of a big one leaving the other workers idle. Each worker
+    trains with n_jobs=1; the parallelism comes from running categories
+    side by side.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Largest job first: the new rows for a warm start, all rows for a refit
+    jobs = sorted(_category_jobs(global_data, new_data),
+                  key=lambda job: len(job[4] if job[4] is not None else job[2]), reverse=True)
+
+    started = time.perf_counter()
+    trained = 0
+    busy_s = 0.0
+
+    if workers == 1 or len(jobs) <= 1:
+        # Nothing to spread out: let the forest use every core itself
+        for category, X_all, y_all, X_new, y_new in jobs:
+            try:
+                res, wall_s = _train_category_job(category, X_all, y_all, window, X_new, y_new, n_jobs=-1)
+            except Exception as e:
+                print(f"  -> ERROR training '{category}': {e}")
+                continue
+            busy_s += wall_s
             if res:
-                global_trained += 1
-                print(f"  -> Trained global model for '{category}' (Score: {res['score']:.3f})")
-        except Exception as e:
-            print(f"  -> ERROR training '{category}': {e}")
+                trained += 1
+                verb = 'Warm-started' if res.get('warm') else 'Trained'
+                print(f"  -> {verb} global model for '{category}' (Score: {res['score']:.3f}, {wall_s:.1f}s)")
+    else:
+        # Don't hand open DB connections to forked workers
+        from django.db import connections
+        connections.close_all()
 
-    print(f"\n--- Training Finished. {global_trained} global models trained. ---")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_limit_worker_memory,
+                                 initargs=(max_worker_mem_mb,)) as pool:
+            futures = {
+                pool.submit(_train_category_job, category, X_all, y_all, window, X_new, y_new): category
+                for category, X_all, y_all, X_new, y_new in jobs
+            }
+            for future in as_completed(futures):
+                category = futures[future]
+                try:
+                    res, wall_s = future.result()
+                except Exception as e:
+                    print(f"  -> ERROR training '{category}': {e!r}")
+                    continue
+                busy_s += wall_s
+                if res:
+                    trained += 1
+                    verb = 'Warm-started' if res.get('warm') else 'Trained'
+                    print(f"  -> {verb} global model for '{category}' (Score: {res['score']:.3f}, {wall_s:.1f}s)")
+
+    total_s = time.perf_counter() - started
+    if total_s > 0:
+        print(f"Trained in {total_s:.1f}s wall on {workers} worker(s); "
+              f"{busy_s:.1f}s of category time (effective parallelism {busy_s / total_s:.1f}x)")
+    return trained
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the global per-category spend models.")
+    parser.add_argument('--months-back', type=int, default=36)
+    parser.add_argument('--workers', type=int, default=None, help="Training processes (default: all cores).")
+    parser.add_argument('--max-worker-mem-mb', type=int, default=None, help="Address-space cap per worker.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-extract users whose data changed and warm-start the saved models.")
+    args = parser.parse_args()
+    main(months_back=args.months_back, workers=args.workers, max_worker_mem_mb=args.max_worker_mem_mb,
+         incremental=args.incremental)
@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import CategorizeTransactionView # Existing
-from .views_spend import PredictSpendingView, spending_trend_and_insights # <-- 1. Import new view
+from .views import CategorizeTransactionView, CategorizeBatchView # Existing
+from .views_spend import PredictSpendingView, spending_trend_and_insights, ModelRegistryStatsView # <-- 1. Import new view
 
 urlpatterns = [
     path('categorize-transaction/', CategorizeTransactionView.as_view(), name='categorize-transaction'),
+    path('categorize-batch/', CategorizeBatchView.as_view(), name='categorize-batch'),
     path('predict-spending/', PredictSpendingView.as_view(), name='predict-spending'),
     path('spending-trend/', spending_trend_and_insights, name='spending-trend'), # <-- 2. Add new path
+    path('model-stats/', ModelRegistryStatsView.as_view(), name='model-stats'),
 ]
\ No newline at end of file
@@ -1,8 +1,8 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
-from .serializers import CategorizeRequestSerializer
-from ai_engine.ai_utils.transaction_categorizer import predict
+from .serializers import CategorizeRequestSerializer, CategorizeBatchRequestSerializer
+from ai_engine.ai_utils.transaction_categorizer import predict, predict_batch
 
 class CategorizeTransactionView(APIView):
     """
@@ -22,4 +22,23 @@ class CategorizeTransactionView(APIView):
         # Call the predict function from our utility file
         result = predict(description)
         
-        return Response(result)
\ No newline at end of file
+        return Response(result)
+
+class CategorizeBatchView(APIView):
+    """
+    API Endpoint to categorize many transaction descriptions in one call.
+    POST { "descriptions": ["Starbucks coffee", "Uber ride", ...] }
+    Returns { "results": [{ "category": ..., "confidence": ..., ... }, ...] }
+    in the same order as the input.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CategorizeBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # One vectorized model call for everything the rules don't catch
+        results = predict_batch(serializer.validated_data['descriptions'])
+
+        return Response({'results': results})
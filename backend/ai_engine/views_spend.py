@@ -1,9 +1,4 @@
-import os
-import joblib
-import numpy as np
-import pandas as pd
-from decimal import Decimal
-from datetime import date
+import hashlib
 
 # --- Django & DRF Imports ---
 from rest_framework.views import APIView
@@ -11,37 +6,42 @@ from rest_framework.response import Response
 from rest_framework import permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-
 from django.conf import settings
-from transactions.models import Transaction
+from django.core.cache import caches
 
 # --- Helper Function Imports ---
 # Import the data preparation function from Day 14
 from ai_engine.ai_utils.spend_utils import build_monthly_category_matrix
+from ai_engine.ai_utils.model_registry import get_model_registry
+# Live and nightly-batch (stored) predictions
+from ai_engine.predictions import predict_spend, stored_spend_predictions, spend_model_version
+from finwise_backend.cache_backends import get_or_compute
+from analytics.caching import conditional_get
+from transactions.rollups import get_data_version
 
-# --- Constants ---
-# Use Django's settings.BASE_DIR to build the path
-BASE_DIR = settings.BASE_DIR 
-# Path to the models we trained on Day 14
-MODELS_DIR = os.path.join(BASE_DIR, 'ai_models', 'spend_models')
-
-
-# --- Helper Functions (from Day 14) ---
 
-def safe_name(s: str) -> str:
-    """Cleans a category name to be a safe filename."""
-    return "".join(c if c.isalnum() else "_" for c in s).lower()
+# --- Helper Functions ---
 
-def load_global_model(category):
+def get_spend_predictions(user, pivot, categories):
     """
-    Loads the correct global model (.pkl file) for a specific category.
+    Returns {category: (predicted, model_type, model_score)} for next month.
+    Uses the nightly stored predictions when they are current, otherwise
+    predicts live from the user's monthly matrix.
     """
-    gname = f"global_cat_{safe_name(category)}.pkl"
-    gpath = os.path.join(MODELS_DIR, gname)
-    
-    if os.path.exists(gpath):
-        return joblib.load(gpath)
-    return None # Return None if no model exists for this category
+    stored = stored_spend_predictions(user, categories)
+    if stored is not None:
+        return {c: (float(stored[c].predicted), stored[c].model_type, stored[c].model_score) for c in categories}
+
+    # Live results are shared across workers until the data or the models change
+    cats_hash = hashlib.md5("\x1f".join(categories).encode()).hexdigest()
+    key = f"ai:spend:u{user.id}:v{get_data_version(user.id)}:m{spend_model_version()}:{cats_hash}"
+
+    def compute():
+        results = predict_spend({c: pivot[c].values.reshape(1, -1) for c in categories})
+        return {c: (float(preds[0]), model_type, score) for c, (preds, model_type, score) in results.items()}
+
+    timeout = getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 60 * 15)
+    return get_or_compute(caches['shared'], key, compute, timeout=timeout)
 
 
 # --- Existing View (from Day 14) ---
@@ -50,6 +50,7 @@ def load_global_model(category):
 class PredictSpendingView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get('predict-spending', versions=[lambda request: spend_model_version()], user_param=False)
     def get(self, request):
         """
         Returns predicted next-month expense for each category for the logged-in user.
@@ -61,46 +62,19 @@ class PredictSpendingView(APIView):
         if pivot.empty:
             return Response({'detail': 'No transaction history available'}, status=status.HTTP_400_BAD_REQUEST)
 
-        predictions = []
+        # 2. Predict every category the user has (stored or live)
+        results = get_spend_predictions(user, pivot, list(pivot.columns))
 
-        # 2. Loop through each category the user has
-        for category in pivot.columns:
-            series = pivot[category].values  # Get the array of monthly spends
-            
-            # 3. Try to load the global model for this category
-            pkg = load_global_model(category)
-            
-            if pkg:
-                model = pkg.get('model')
-                window = pkg.get('window', 3)
-                score = pkg.get('score', None)
-                
-                if len(series) >= window:
-                    # Prepare the last 'window' months as features
-                    feat = np.array(series[-window:]).reshape(1, -1)
-                    try:
-                        pred = float(model.predict(feat)[0])
-                        predictions.append({
-                            'category': category, 
-                            'predicted': round(max(0, pred), 2), # Ensure non-negative
-                            'model_type': 'global', 
-                            'model_score': round(score, 3) if score is not None else None
-                        })
-                        continue # Go to the next category
-                    except Exception:
-                        pass # Model failed, fall back to heuristic
-            
-            # 4. Fallback: If no model or not enough data, use heuristic (avg of last 3)
-            last_n = series[-3:]
-            avg = float(last_n.mean()) if len(last_n) > 0 else 0.0
+        predictions = []
+        for category, (predicted, model_type, score) in results.items():
             predictions.append({
                 'category': category, 
-                'predicted': round(avg, 2), 
-                'model_type': 'heuristic', 
-                'model_score': None
+                'predicted': round(predicted, 2),
+                'model_type': model_type, 
+                'model_score': round(score, 3) if score is not None else None
             })
 
-        # 5. Return sorted predictions
+        # 3. Return sorted predictions
         predictions = sorted(predictions, key=lambda x: x['predicted'], reverse=True)
         
         last_month_date = pivot.index[-1].isoformat()
@@ -118,6 +92,7 @@ class PredictSpendingView(APIView):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional_get('spending-trend', versions=[lambda request: spend_model_version()], user_param=False)
 def spending_trend_and_insights(request):
     """
     Returns actual spending (last 3 months) + predicted next month for
@@ -140,54 +115,33 @@ def spending_trend_and_insights(request):
     trends = []
     insights = []
 
-    # 3. Loop through top 5 categories and get predictions
+    # 3. Predictions for the top 5 categories (stored or live)
+    results = get_spend_predictions(user, pivot, list(top_5_categories))
+
     for category in top_5_categories:
         series = pivot[category].values # Full 12-month series
         
         # Get last 3 actual values for the chart
         actuals = series[-3:]
         
-        # Load the correct Day 14 model (e.g., global_cat_groceries.pkl)
-        pkg = load_global_model(category)
-        
-        predicted_amount = 0.0
-        
-        if pkg:
-            model = pkg.get('model')
-            window = pkg.get('window', 3) # This is the 3-month lag feature
-            
-            # Ensure we have enough data to form a feature vector
-            if len(series) >= window:
-                # Use the last 'window' months of spending as features
-                features = np.array(series[-window:]).reshape(1, -1)
-                try:
-                    # Predict next month's spending
-                    predicted_amount = float(model.predict(features)[0])
-                    predicted_amount = max(0, predicted_amount) # Ensure non-negative
-                except Exception as e:
-                    print(f"Prediction failed for {category}: {e}")
-                    predicted_amount = float(actuals.mean()) # Fallback
-            else:
-                 predicted_amount = float(actuals.mean()) # Fallback
-        else:
-            # Fallback heuristic: average of last 3 months if no model
-            predicted_amount = float(actuals.mean())
+        # Model prediction, or the average of the last 3 months if no model
+        predicted_amount = results[category][0]
         
         # 4. Generate Insights
         avg_recent = float(actuals.mean())
         # Prevent division by zero if avg_recent is 0
         change_pct = ((predicted_amount - avg_recent) / avg_recent * 100) if avg_recent > 0 else 0
         
-        status = "stable"
-        if change_pct > 15: status = "overspend"  # Predicted spend is >15% higher than avg
-        if change_pct < -15: status = "saving"    # Predicted spend is >15% lower than avg
+        trend_status = "stable"
+        if change_pct > 15: trend_status = "overspend"  # Predicted spend is >15% higher than avg
+        if change_pct < -15: trend_status = "saving"    # Predicted spend is >15% lower than avg
 
         insights.append({
             "category": category,
             "predicted": round(predicted_amount, 2),
             "avg_recent": round(avg_recent, 2),
             "change_percent": round(change_pct, 1),
-            "status": status
+            "status": trend_status
         })
 
         # 5. Format data for the line chart
@@ -212,3 +166,16 @@ def spending_trend_and_insights(request):
         "trends": trends,       # For the line chart
         "insights": insights    # For the insights list
     })
+
+
+class ModelRegistryStatsView(APIView):
+    """
+    Admin-only view of the model registry counters (hits, misses, load time),
+    so we can see how much unpickling the hot paths are saving.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'detail': 'Forbidden'}, status=403)
+        return Response(get_model_registry().stats())
@@ -1,3 +1,7 @@
 from django.contrib import admin
+from .models import UserMonthSummary, PlatformCategoryMonth, PlatformMonth
 
 # Register your models here.
+admin.site.register(UserMonthSummary)
+admin.site.register(PlatformCategoryMonth)
+admin.site.register(PlatformMonth)
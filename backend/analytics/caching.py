@@ -0,0 +1,112 @@
+# backend/analytics/caching.py
+import hashlib
+from datetime import date
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from finwise_backend.cache_backends import get_or_compute
+
+from transactions.rollups import get_data_version
+
+
+def analytics_user_id(request):
+    """ The user whose data an analytics request reads (admins may pass ?user_id=). """
+    return request.query_params.get('user_id') or request.user.id
+
+
+def request_data_version(request, user_id):
+    """
+    get_data_version(user_id), looked up once per request: the ETag and the
+    cache key both need it.
+    """
+    http_request = getattr(request, '_request', request)
+    versions = http_request.__dict__.setdefault('_data_versions', {})
+    key = str(user_id)
+    if key not in versions:
+        versions[key] = get_data_version(user_id)
+    return versions[key]
+
+
+def analytics_cache_key(view_name, request):
+    """
+    Cache key covering every query parameter plus the target user's data
+    version. Any Transaction write bumps the version, so older entries are
+    simply never read again and expire on their own.
+    """
+    user_id = analytics_user_id(request)
+    params = urlencode(sorted(request.query_params.items()))
+    params_hash = hashlib.md5(params.encode()).hexdigest()
+    return f"analytics:{view_name}:u{user_id}:v{request_data_version(request, user_id)}:{params_hash}"
+
+
+def cached_payload(view_name, request, compute):
+    """
+    Returns the cached payload for this request, computing and storing it
+    on a miss. Permission checks must happen before calling this.
+
+    The shared cache is visible to every worker, and only one request
+    recomputes a missing key while concurrent ones wait for its result.
+    """
+    key = analytics_cache_key(view_name, request)
+    timeout = getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 60 * 15)
+    return get_or_compute(caches['shared'], key, compute, timeout=timeout)
+
+
+def response_etag(view_name, request, user_id, versions=()):
+    """
+    Strong ETag for a read: the view, the target user and their data version,
+    every query param, the current month (month windows are relative to
+    today) and any extra versions, such as the model version.
+    """
+    parts = [
+        view_name, f"u{user_id}", f"v{request_data_version(request, user_id)}", date.today().strftime('%Y-%m'),
+        urlencode(sorted(request.query_params.items())),
+    ]
+    parts += [str(version(request)) for version in versions]
+    return '"%s"' % hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def conditional_get(view_name, versions=(), user_param=True):
+    """
+    Decorator for GET handlers (APIView methods or @api_view functions).
+    Tags 200 responses with a strong ETag and answers a matching
+    If-None-Match with 304 before the view runs its queries or models.
+
+    `versions` are callables taking the request and returning anything
+    else the response depends on (e.g. a model version). Views that always
+    read the logged-in user's data pass user_param=False.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            if not user_param:
+                user_id = request.user.id
+            elif request.query_params.get('user_id') and getattr(request.user, 'role', None) != 'admin':
+                # Let the view refuse it; don't answer for another user's data
+                return func(*args, **kwargs)
+            else:
+                user_id = analytics_user_id(request)
+
+            etag = response_etag(view_name, request, user_id, versions)
+            tags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+            if etag in tags or '*' in tags:
+                response = Response(status=304)
+            else:
+                response = func(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            # Cached per user, but the browser must revalidate each time
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
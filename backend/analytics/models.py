@@ -1,3 +1,63 @@
 from django.db import models
+from users.models import User
 
 # Create your models here.
+
+
+class UserMonthSummary(models.Model):
+    """
+    One row per user and month with their income and expense totals.
+    Rebuilt from the MonthlyRollup table by `manage.py refresh_platform_summaries`
+    and read by the admin platform analytics.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='month_summaries')
+    month = models.DateField() # First day of the month
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tx_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='uniq_summary_user_month'),
+        ]
+        indexes = [
+            # Top spenders of a month straight off the index
+            models.Index(fields=['month', '-expense'], name='summary_month_expense'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m}: +{self.income} -{self.expense}"
+
+
+class PlatformCategoryMonth(models.Model):
+    """ Platform-wide totals per month, type and category. """
+    month = models.DateField()
+    type = models.CharField(max_length=10)
+    category = models.CharField(max_length=50)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    tx_count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'type', 'category'], name='uniq_platform_month_type_cat'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.type} {self.category}: {self.total}"
+
+
+class PlatformMonth(models.Model):
+    """
+    Platform-wide totals per month, plus a quantile sketch of the per-user
+    monthly expense (see analytics/sketch.py) for approximate percentiles.
+    """
+    month = models.DateField(unique=True)
+    income = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    active_users = models.PositiveIntegerField(default=0)
+    tx_count = models.PositiveBigIntegerField(default=0)
+    expense_sketch = models.JSONField(default=dict)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.active_users} users"
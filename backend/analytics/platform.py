@@ -0,0 +1,184 @@
+# backend/analytics/platform.py
+"""
+Platform-wide (all users) analytics for admins.
+
+Nothing here reads the raw Transaction table. A nightly refresh folds the
+MonthlyRollup rows into per-user-month summaries and per-month platform
+totals (with a quantile sketch), and the admin endpoints only read those
+small tables.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from transactions.models import MonthlyRollup
+from .models import UserMonthSummary, PlatformCategoryMonth, PlatformMonth
+from .sketch import QuantileSketch
+
+ZERO = Decimal('0')
+
+# Per-month candidates kept for a multi-month top-K, as a multiple of K
+TOP_K_CANDIDATE_FACTOR = 10
+
+
+def _bulk_create(model, rows, batch_size):
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def refresh_platform_summaries(since=None, batch_size=5000):
+    """
+    Rebuilds the summary tables for months >= `since` (every month when
+    None) from the rollups. Returns the number of rows written per table.
+    """
+    rollups = MonthlyRollup.objects.all()
+    summaries = UserMonthSummary.objects.all()
+    categories = PlatformCategoryMonth.objects.all()
+    months = PlatformMonth.objects.all()
+    if since is not None:
+        rollups = rollups.filter(month__gte=since)
+        summaries = summaries.filter(month__gte=since)
+        categories = categories.filter(month__gte=since)
+        months = months.filter(month__gte=since)
+
+    counts = {}
+    with transaction.atomic():
+        # 1. Per user and month
+        summaries.delete()
+        per_user = rollups.values('user_id', 'month').annotate(
+            income=Sum('total', filter=Q(type='income')),
+            expense=Sum('total', filter=Q(type='expense')),
+            tx_count=Sum('count'),
+        ).order_by()
+        counts['user_months'] = _bulk_create(UserMonthSummary, (
+            UserMonthSummary(
+                user_id=row['user_id'], month=row['month'], tx_count=row['tx_count'],
+                income=row['income'] or ZERO, expense=row['expense'] or ZERO,
+            )
+            for row in per_user.iterator(chunk_size=batch_size)
+        ), batch_size)
+
+        # 2. Per month, type and category
+        categories.delete()
+        per_category = rollups.values('month', 'type', 'category') \
+            .annotate(total=Sum('total'), tx_count=Sum('count')).order_by()
+        counts['category_months'] = _bulk_create(
+            PlatformCategoryMonth, (PlatformCategoryMonth(**row) for row in per_category.iterator()), batch_size,
+        )
+
+        # 3. Per month, with a sketch of the per-user expense
+        months.delete()
+        new_summaries = UserMonthSummary.objects.filter(month__gte=since) if since else UserMonthSummary.objects.all()
+        sketches = defaultdict(QuantileSketch)
+        for month, expense in new_summaries.values_list('month', 'expense').iterator(chunk_size=batch_size):
+            sketches[month].add(expense)
+        per_month = new_summaries.values('month').annotate(
+            income=Sum('income'), expense=Sum('expense'), active_users=Count('user_id'), tx_count=Sum('tx_count'),
+        ).order_by()
+        counts['months'] = _bulk_create(PlatformMonth, (
+            PlatformMonth(expense_sketch=sketches[row['month']].to_dict(), **row) for row in per_month
+        ), batch_size)
+    return counts
+
+
+# --- Reads (used by the admin endpoints) ---
+
+def category_totals(first, last, type_='expense'):
+    """ Platform totals per category for months first..last, largest first. """
+    rows = PlatformCategoryMonth.objects.filter(month__gte=first, month__lte=last, type=type_) \
+        .values('category').annotate(total=Sum('total'), tx_count=Sum('tx_count')).order_by('-total')
+    return [{'category': r['category'], 'total': str(r['total']), 'tx_count': r['tx_count']} for r in rows]
+
+
+def top_spenders(first, last, k=10):
+    """
+    The k users with the highest expense over months first..last.
+
+    A single month is exact: the top k rows are read straight off the
+    (month, -expense) index, with no grouping. For a range, each month
+    contributes its top k * TOP_K_CANDIDATE_FACTOR users as candidates and
+    only those are summed exactly, so a user who is never near the top in
+    any single month can be missed. Returns (rows, approximate).
+    """
+    base = UserMonthSummary.objects.filter(expense__gt=0)
+    month_list = list(PlatformMonth.objects.filter(month__gte=first, month__lte=last)
+                      .order_by('month').values_list('month', flat=True))
+    if len(month_list) <= 1:
+        if not month_list:
+            return [], False
+        summaries = base.filter(month=month_list[0]).select_related('user') \
+            .only('user_id', 'expense', 'income', 'user__username').order_by('-expense')[:k]
+        return [{
+            'user_id': s.user_id, 'username': s.user.username,
+            'expense': str(s.expense), 'income': str(s.income),
+        } for s in summaries], False
+
+    candidates = set()
+    per_month = k * TOP_K_CANDIDATE_FACTOR
+    for month in month_list:
+        candidates.update(base.filter(month=month).order_by('-expense')
+                          .values_list('user_id', flat=True)[:per_month])
+
+    rows = base.filter(user_id__in=candidates, month__gte=first, month__lte=last) \
+        .values('user_id', 'user__username') \
+        .annotate(expense=Sum('expense'), income=Sum('income')) \
+        .order_by('-expense')[:k]
+    return [{
+        'user_id': r['user_id'], 'username': r['user__username'],
+        'expense': str(r['expense']), 'income': str(r['income']),
+    } for r in rows], True
+
+
+def _pct_change(new, old):
+    if not old:
+        return None
+    return round(float((new - old) / old * 100), 2)
+
+
+def monthly_growth(first, last):
+    """ Platform totals per month with month-over-month growth in percent. """
+    rows = list(PlatformMonth.objects.filter(month__gte=first, month__lte=last).order_by('month')
+                .values('month', 'income', 'expense', 'active_users', 'tx_count'))
+    out = []
+    prev = None
+    for r in rows:
+        out.append({
+            'month': r['month'].isoformat(),
+            'income': str(r['income']),
+            'expense': str(r['expense']),
+            'active_users': r['active_users'],
+            'tx_count': r['tx_count'],
+            'income_growth_pct': _pct_change(r['income'], prev['income']) if prev else None,
+            'expense_growth_pct': _pct_change(r['expense'], prev['expense']) if prev else None,
+            'active_users_growth_pct': _pct_change(r['active_users'], prev['active_users']) if prev else None,
+        })
+        prev = r
+    return out
+
+
+def expense_quantiles(first, last, qs=(0.5, 0.9, 0.99)):
+    """
+    Approximate quantiles of per-user monthly expense over months
+    first..last, from the merged monthly sketches (1% relative error).
+    """
+    sketch = QuantileSketch()
+    for data in PlatformMonth.objects.filter(month__gte=first, month__lte=last).values_list('expense_sketch', flat=True):
+        sketch.merge(QuantileSketch.from_dict(data))
+    return {
+        'count': sketch.count,
+        'relative_error': sketch.alpha,
+        'quantiles': {str(q): (round(v, 2) if v is not None else None) for q, v in
+                      ((q, sketch.quantile(q)) for q in qs)},
+    }
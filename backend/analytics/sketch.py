@@ -0,0 +1,63 @@
+# backend/analytics/sketch.py
+"""
+A small mergeable quantile sketch (log-bucketed histogram, as in DDSketch).
+
+Every value lands in the bucket i with gamma^(i-1) < x <= gamma^i, so any
+quantile read back is within `alpha` relative error of the true one. The
+sketch has a few hundred buckets at most for money amounts, whatever the
+number of values, and sketches for different months merge by adding counts.
+"""
+import math
+
+
+class QuantileSketch:
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}   # bucket index -> count
+        self.zeros = 0   # values <= 0
+        self.count = 0
+
+    def add(self, value, n=1):
+        value = float(value)
+        if value <= 0:
+            self.zeros += n
+        else:
+            i = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[i] = self.bins.get(i, 0) + n
+        self.count += n
+
+    def merge(self, other):
+        for i, n in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """ Approximate q-quantile (0 <= q <= 1), or None if the sketch is empty. """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if rank < seen:
+                # Midpoint of the bucket (in relative terms)
+                return 2 * self.gamma ** i / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'zeros': self.zeros, 'bins': {str(i): n for i, n in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(alpha=data.get('alpha', 0.01))
+        sketch.zeros = data.get('zeros', 0)
+        sketch.bins = {int(i): n for i, n in data.get('bins', {}).items()}
+        sketch.count = sketch.zeros + sum(sketch.bins.values())
+        return sketch
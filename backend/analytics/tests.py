@@ -1,3 +1,348 @@
-from django.test import TestCase
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from finwise_backend.testing import QueryBudgetTestCase
+from goals.models import Goal
+from transactions.models import Transaction
+from users.models import User
+from .caching import analytics_cache_key, cached_payload
+from .models import PlatformMonth, UserMonthSummary
+from .platform import category_totals, expense_quantiles, monthly_growth, refresh_platform_summaries, top_spenders
+from .sketch import QuantileSketch
 
 # Create your tests here.
+
+
+class AnalyticsQueryBudgetTests(QueryBudgetTestCase):
+    """ Aggregates must cost the same number of queries however many rows they cover. """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', password='x', role='admin')
+        self.client.force_authenticate(self.user)
+        self.n_rows = 0
+
+    def seed(self, n):
+        categories = ['Food', 'Rent', 'Fun', 'Travel']
+        for _ in range(n):
+            self.n_rows += 1
+            day = date.today() - timedelta(days=17 * self.n_rows)
+            Transaction.objects.create(user=self.user, title='t', amount=10, type='expense',
+                                       category=categories[self.n_rows % 4], date=day)
+            Transaction.objects.create(user=self.user, title='t', amount=25, type='income',
+                                       category='Salary', date=day)
+            Goal.objects.create(user=self.user, name='Trip', target_amount=500, deadline=day)
+
+    def test_monthly_spending(self):
+        self.assertQueryBudget(3, '/api/analytics/monthly-spending/?months=12', self.seed)
+
+    def test_category_spending(self):
+        self.assertQueryBudget(2, '/api/analytics/category-spending/', self.seed)
+
+    def test_category_spending_date_range(self):
+        start = (date.today() - timedelta(days=200)).isoformat()
+        self.assertQueryBudget(3, f'/api/analytics/category-spending/?start={start}', self.seed)
+
+    def test_savings_vs_expense(self):
+        self.assertQueryBudget(2, '/api/analytics/savings-vs-expense/', self.seed)
+
+    def test_dashboard(self):
+        # Includes the current month's raw rows and the stored prediction
+        # lookup (data version + Prediction), made before any model is loaded
+        self.assertQueryBudget(7, '/api/dashboard/', self.seed)
+
+    def test_platform_endpoints(self):
+        self.client.force_authenticate(self.admin)
+
+        def seed(n):
+            # More users within one month: top-spenders reads one index range per month
+            for _ in range(n):
+                self.n_rows += 1
+                user = User.objects.create_user(username=f'u{self.n_rows}', email=f'u{self.n_rows}@example.com')
+                Transaction.objects.create(user=user, title='t', amount=self.n_rows, type='expense', category='Food')
+            call_command('refresh_platform_summaries', stdout=StringIO())
+
+        for url in ['categories', 'top-spenders', 'growth', 'quantiles']:
+            with self.subTest(url=url):
+                self.assertQueryBudget(3, f'/api/analytics/platform/{url}/', seed)
+
+
+class MonthlySpendingTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com')
+        self.client.force_authenticate(self.user)
+
+    def test_current_month_counts_up_to_today(self):
+        today = date.today()
+        last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=28)
+        for day, amount in [(last_month, 40), (today, 15), (today + timedelta(days=1), 700)]:
+            Transaction.objects.create(user=self.user, title='t', amount=amount, type='expense',
+                                       category='Food', date=day)
+
+        months = self.client.get('/api/analytics/monthly-spending/?months=2').json()['months'][-2:]
+        self.assertEqual([m['month'] for m in months],
+                         [last_month.replace(day=1).isoformat(), today.replace(day=1).isoformat()])
+        # Tomorrow's transaction isn't counted yet
+        self.assertEqual([Decimal(m['expense']) for m in months], [40, 15])
+        # The dashboard trend agrees
+        trend = self.client.get('/api/dashboard/?months=2').json()['trend'][-2:]
+        self.assertEqual(trend, months)
+
+    def test_rejects_bad_months(self):
+        for url in ['/api/analytics/monthly-spending/', '/api/dashboard/']:
+            for months in ['0', '-3', 'abc']:
+                with self.subTest(url=url, months=months):
+                    response = self.client.get(f'{url}?months={months}')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('months', response.json())
+
+
+class ConditionalGetTests(QueryBudgetTestCase):
+
+    url = '/api/analytics/monthly-spending/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', role='admin')
+        Transaction.objects.create(user=self.user, title='t', amount=10, type='expense', category='Food')
+        self.client.force_authenticate(self.user)
+
+    def etag(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_repeat_get_is_not_modified(self):
+        etag = self.etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('no-cache', response['Cache-Control'])
+        # A stale tag gets the full response
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_etag_changes_after_write(self):
+        etag = self.etag()
+        Transaction.objects.create(user=self.user, title='t', amount=5, type='income', category='Salary')
+        self.assertNotEqual(self.etag(), etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_user_and_params(self):
+        own = self.etag()
+        self.assertNotEqual(self.etag(f'{self.url}?months=3'), own)
+        self.client.force_authenticate(self.admin)
+        self.assertNotEqual(self.etag(), own)
+        self.assertNotEqual(self.etag(f'{self.url}?user_id={self.user.id}'), self.etag())
+        # Another user's write only changes their ETag
+        about_user = self.etag(f'{self.url}?user_id={self.user.id}')
+        Transaction.objects.create(user=self.admin, title='t', amount=5, type='expense', category='Food')
+        self.assertEqual(self.etag(f'{self.url}?user_id={self.user.id}'), about_user)
+
+    def test_no_etag_on_errors(self):
+        response = self.client.get(f'{self.url}?user_id={self.admin.id}')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+        response = self.client.get(f'{self.url}?months=0')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class AnalyticsCacheTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com')
+        self.factory = APIRequestFactory()
+
+    def request(self, query=''):
+        request = Request(self.factory.get(f'/api/analytics/monthly-spending/{query}'))
+        request.user = self.user
+        return request
+
+    def test_key_covers_params_and_user(self):
+        keys = {
+            analytics_cache_key('monthly-spending', self.request(query))
+            for query in ['', '?months=3', '?months=12', '?months=3&start=2026-01-01']
+        }
+        self.assertEqual(len(keys), 4)
+        # Param order doesn't matter
+        self.assertEqual(analytics_cache_key('v', self.request('?a=1&b=2')),
+                         analytics_cache_key('v', self.request('?b=2&a=1')))
+        self.assertNotEqual(analytics_cache_key('v', self.request()), analytics_cache_key('w', self.request()))
+        other = self.request()
+        other.user = User.objects.create_user(username='other', email='other@example.com')
+        self.assertNotEqual(analytics_cache_key('v', other), analytics_cache_key('v', self.request()))
+
+    def test_write_makes_next_read_miss(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cached_payload('v', self.request(), compute), 1)
+        self.assertEqual(cached_payload('v', self.request(), compute), 1)
+        self.assertEqual(cached_payload('v', self.request('?months=3'), compute), 2)
+        Transaction.objects.create(user=self.user, title='t', amount=5, type='expense', category='Food')
+        self.assertEqual(cached_payload('v', self.request(), compute), 3)
+
+    def test_endpoint_reflects_write(self):
+        self.client.force_authenticate(self.user)
+        url = '/api/analytics/category-spending/'
+        self.assertEqual(self.client.get(url).json()['categories'], [])
+        Transaction.objects.create(user=self.user, title='t', amount=5, type='expense', category='Food')
+        self.assertEqual([row['category'] for row in self.client.get(url).json()['categories']], ['Food'])
+
+
+def exact_quantile(values, q):
+    """ The value the sketch approximates: the one at rank floor(q * (n - 1)). """
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+class QuantileSketchTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        # Money-like amounts over several orders of magnitude, with some zeros
+        self.values = [round(rng.lognormvariate(6, 1.5), 2) for _ in range(5000)] + [0] * 200
+
+    def sketch(self, values):
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def test_within_relative_error(self):
+        sketch = self.sketch(self.values)
+        self.assertEqual(sketch.count, len(self.values))
+        for q in [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999, 1]:
+            with self.subTest(q=q):
+                exact = exact_quantile(self.values, q)
+                self.assertLessEqual(abs(sketch.quantile(q) - exact), sketch.alpha * exact + 1e-9)
+
+    def test_merge_and_round_trip(self):
+        whole = self.sketch(self.values)
+        merged = self.sketch(self.values[::2]).merge(QuantileSketch.from_dict(self.sketch(self.values[1::2]).to_dict()))
+        self.assertEqual((merged.bins, merged.zeros, merged.count), (whole.bins, whole.zeros, whole.count))
+
+    def test_small_and_empty(self):
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+        sketch = self.sketch([0, 0, 100])
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertAlmostEqual(sketch.quantile(1), 100, delta=1)
+
+
+class PlatformSummaryTests(QueryBudgetTestCase):
+    """ The summary tables must agree with aggregating the raw rows directly. """
+
+    months = [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(5)
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', role='admin')
+        self.expense = defaultdict(Decimal)  # (user_id, month) -> expense
+        self.by_category = defaultdict(Decimal)  # (month, category) -> expense
+        cents = rng.sample(range(100, 10 ** 6), 400)  # Distinct, so rankings have no ties
+        for i in range(40):
+            user = User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com')
+            for month in self.months:
+                if rng.random() < 0.2:
+                    continue  # Not active this month
+                Transaction.objects.create(user=user, title='t', amount=500, type='income',
+                                           category='Salary', date=month)
+                for _ in range(rng.randrange(0, 4)):
+                    amount = Decimal(cents.pop()) / 100
+                    category = rng.choice(['Food', 'Rent', 'Fun'])
+                    Transaction.objects.create(user=user, title='t', amount=amount, type='expense',
+                                               category=category, date=month + timedelta(days=rng.randrange(28)))
+                    self.expense[user.id, month] += amount
+                    self.by_category[month, category] += amount
+        refresh_platform_summaries()
+
+    def exact_top(self, first, last, k):
+        totals = defaultdict(Decimal)
+        for (user_id, month), expense in self.expense.items():
+            if first <= month <= last:
+                totals[user_id] += expense
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def test_top_spenders_single_month_exact(self):
+        for month in self.months:
+            with self.subTest(month=month):
+                rows, approximate = top_spenders(month, month, k=5)
+                self.assertFalse(approximate)
+                self.assertEqual([(r['user_id'], Decimal(r['expense'])) for r in rows], self.exact_top(month, month, 5))
+
+    def test_top_spenders_range(self):
+        rows, approximate = top_spenders(self.months[0], self.months[-1], k=5)
+        self.assertTrue(approximate)
+        # Every user is a candidate here, so the answer is exact
+        self.assertEqual([(r['user_id'], Decimal(r['expense'])) for r in rows],
+                         self.exact_top(self.months[0], self.months[-1], 5))
+
+    def test_top_spenders_candidates_are_bounded(self):
+        # With one candidate per month, only monthly winners can be ranked
+        with mock.patch('analytics.platform.TOP_K_CANDIDATE_FACTOR', 1):
+            rows, _ = top_spenders(self.months[0], self.months[-1], k=1)
+        monthly_winners = {self.exact_top(m, m, 1)[0][0] for m in self.months}
+        self.assertIn(rows[0]['user_id'], monthly_winners)
+        self.assertEqual(Decimal(rows[0]['expense']),
+                         sum(e for (uid, _), e in self.expense.items() if uid == rows[0]['user_id']))
+
+    def test_quantiles_against_exact(self):
+        first, last = self.months[0], self.months[-1]
+        values = [float(s.expense) for s in UserMonthSummary.objects.all()]
+        data = expense_quantiles(first, last, qs=(0.1, 0.5, 0.9, 0.99))
+        self.assertEqual(data['count'], len(values))
+        for q, estimate in data['quantiles'].items():
+            with self.subTest(q=q):
+                exact = exact_quantile(values, float(q))
+                self.assertLessEqual(abs(estimate - exact), data['relative_error'] * exact + 0.01)
+
+    def test_category_totals_and_growth(self):
+        march = self.months[-1]
+        self.assertEqual({r['category']: Decimal(r['total']) for r in category_totals(march, march)},
+                         {c: t for (m, c), t in self.by_category.items() if m == march})
+        growth = monthly_growth(self.months[0], self.months[-1])
+        expense = [sum(e for (_, m), e in self.expense.items() if m == month) for month in self.months]
+        self.assertEqual([Decimal(g['expense']) for g in growth], expense)
+        self.assertIsNone(growth[0]['expense_growth_pct'])
+        self.assertAlmostEqual(growth[1]['expense_growth_pct'], float((expense[1] - expense[0]) / expense[0] * 100),
+                               places=2)
+
+    def test_partial_refresh_matches_full(self):
+        def snapshot():
+            return (set(UserMonthSummary.objects.values_list('user_id', 'month', 'income', 'expense', 'tx_count')),
+                    set(PlatformMonth.objects.values_list('month', 'income', 'expense', 'active_users', 'tx_count')))
+
+        user = User.objects.get(username='u0')
+        Transaction.objects.create(user=user, title='t', amount=77, type='expense', category='Food',
+                                   date=self.months[-1])
+        refresh_platform_summaries(since=self.months[-1])
+        partial = snapshot()
+        refresh_platform_summaries()
+        self.assertEqual(partial, snapshot())
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.get(username='u0'))
+        self.assertEqual(self.client.get('/api/analytics/platform/top-spenders/').status_code, 403)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/analytics/platform/top-spenders/?start=2026-02&end=2026-02&k=3')
+        self.assertEqual([r['user_id'] for r in response.json()['top_spenders']],
+                         [uid for uid, _ in self.exact_top(self.months[1], self.months[1], 3)])
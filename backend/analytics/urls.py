@@ -1,9 +1,16 @@
 from django.urls import path
 from .views import MonthlySpendingView, CategorySpendingView, SavingsVsExpenseView
+from .views_platform import PlatformCategoryView, PlatformTopSpendersView, PlatformGrowthView, PlatformQuantilesView
 
 # These URLs will be prefixed with '/api/analytics/' by the main urls.py
 urlpatterns = [
     path('monthly-spending/', MonthlySpendingView.as_view(), name='monthly-spending'),
     path('category-spending/', CategorySpendingView.as_view(), name='category-spending'),
     path('savings-vs-expense/', SavingsVsExpenseView.as_view(), name='savings-vs-expense'),
+
+    # Platform-wide, admin only (read the pre-aggregated summary tables)
+    path('platform/categories/', PlatformCategoryView.as_view(), name='platform-categories'),
+    path('platform/top-spenders/', PlatformTopSpendersView.as_view(), name='platform-top-spenders'),
+    path('platform/growth/', PlatformGrowthView.as_view(), name='platform-growth'),
+    path('platform/quantiles/', PlatformQuantilesView.as_view(), name='platform-quantiles'),
 ]
\ No newline at end of file
@@ -2,19 +2,27 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 from django.db.models import Sum, Q
-from django.db.models.functions import TruncMonth
 from datetime import date, timedelta
 from decimal import Decimal
+import hashlib
 
-# --- 1. Import the cache ---
-from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
 
-from transactions.models import Transaction
+from transactions.models import Transaction, MonthlyRollup
+from transactions.rollups import range_totals
+from goals.models import Goal
+from goals.serializers import GoalSerializer
+from insights.utils import insights_model_version
+from insights.views import predict_monthly_expense
+from .caching import analytics_user_id, cached_payload, conditional_get
 
 # (Helper function 'get_analytics_queryset' stays the same)
-def get_analytics_queryset(request):
+def get_analytics_queryset(request, model=Transaction):
     user_id = request.query_params.get('user_id', None)
-    qs = Transaction.objects.all()
+    qs = model.objects.all()
     if user_id:
         if not request.user.role == 'admin':
             return None
@@ -23,57 +31,93 @@ def get_analytics_queryset(request):
         qs = qs.filter(user=request.user)
     return qs
 
+def get_rollup_queryset(request):
+    """ Same scoping rules as get_analytics_queryset, over the MonthlyRollup table. """
+    return get_analytics_queryset(request, model=MonthlyRollup)
+
+def get_date_range(request):
+    """ Parses the optional ?start= and ?end= (YYYY-MM-DD) query params. """
+    bounds = []
+    for name in ('start', 'end'):
+        value = request.query_params.get(name) or None
+        if value is not None:
+            try:
+                value = parse_date(value)
+            except ValueError:
+                value = None
+            if value is None:
+                raise ValidationError({name: 'Expected a date in YYYY-MM-DD format.'})
+        bounds.append(value)
+    return tuple(bounds)
+
+def get_months(request, default=6):
+    """ Parses ?months= (a positive number of trailing months). """
+    try:
+        months = int(request.query_params.get('months', default))
+    except ValueError:
+        months = 0
+    if months < 1:
+        raise ValidationError({'months': 'Expected a positive whole number of months.'})
+    return months
+
+def current_month_totals(txns, today):
+    """
+    Income and expense for the current month from the raw rows dated up to
+    today, so future-dated transactions only count once their date comes.
+    """
+    totals = txns.filter(date__gte=today.replace(day=1), date__lte=today).aggregate(
+        income=Sum('amount', filter=Q(type='income')),
+        expense=Sum('amount', filter=Q(type='expense')),
+    )
+    return {key: value or Decimal('0') for key, value in totals.items()}
+
+def trailing_months(months):
+    """ First-of-month dates for the last `months` months, oldest first. """
+    end_month = date.today().replace(day=1)
+    start_month = (end_month - timedelta(days=(months - 1) * 31)).replace(day=1)
+    months_list = []
+    cur = start_month
+    while cur <= end_month:
+        months_list.append(cur)
+        if cur.month == 12:
+            cur = cur.replace(year=cur.year + 1, month=1)
+        else:
+            cur = cur.replace(month=cur.month + 1)
+    return months_list
+
 
 class MonthlySpendingView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    # Keyed by day as well: the current month only counts rows dated up to today
+    @conditional_get('monthly-spending', versions=[lambda request: date.today().isoformat()])
     def get(self, request):
-        
-        # --- 2. Create a unique cache key ---
-        # This key is specific to this user and this view
-        user_id = request.user.id
-        cache_key = f'monthly_spending_user_{user_id}'
-
-        # --- 3. Try to get data from cache ---
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            # If data is found, return it immediately
-            return Response({'months': cached_data})
-
-        # --- 4. If not in cache, run the expensive query ---
-        # (This is all your original logic)
-        qs = get_analytics_queryset(request)
+        qs = get_rollup_queryset(request)
         if qs is None:
             return Response({'detail': 'Forbidden'}, status=403)
-        
-        months = int(request.query_params.get('months', 6))
+        txns = get_analytics_queryset(request)
+        months = get_months(request)
+
+        # Cached per user, query params and data version (see analytics/caching.py)
         today = date.today()
-        end_month = today.replace(day=1)
-        start_month = (end_month - timedelta(days=(months - 1) * 31)).replace(day=1)
-        qs = qs.filter(date__gte=start_month, date__lte=today)
+        data = cached_payload(f'monthly-spending:{today.isoformat()}', request,
+                              lambda: self.compute(qs, txns, months, today))
+        return Response({'months': data})
+
+    def compute(self, qs, txns, months, today):
+        months_list = trailing_months(months)
+        start_month, end_month = months_list[0], months_list[-1]
+        qs = qs.filter(month__gte=start_month, month__lt=end_month)
         
-        incomes = qs.filter(type='income') \
-            .annotate(month=TruncMonth('date')) \
-            .values('month') \
-            .annotate(total=Sum('amount')) \
-            .order_by('month')
-        expenses = qs.filter(type='expense') \
-            .annotate(month=TruncMonth('date')) \
-            .values('month') \
-            .annotate(total=Sum('amount')) \
-            .order_by('month')
-
-        months_list = []
-        cur = start_month
-        while cur <= end_month:
-            months_list.append(cur)
-            if cur.month == 12:
-                cur = cur.replace(year=cur.year + 1, month=1)
-            else:
-                cur = cur.replace(month=cur.month + 1)
-
-        income_map = {item['month']: item['total'] or Decimal('0') for item in incomes}
-        expense_map = {item['month']: item['total'] or Decimal('0') for item in expenses}
+        # Income and expense per month in one pass, for the complete months
+        totals = list(qs.values('month').annotate(
+            income=Sum('total', filter=Q(type='income')),
+            expense=Sum('total', filter=Q(type='expense')),
+        ).order_by('month'))
+        totals.append(dict(current_month_totals(txns, today), month=end_month))
+
+        income_map = {item['month']: item['income'] or Decimal('0') for item in totals}
+        expense_map = {item['month']: item['expense'] or Decimal('0') for item in totals}
 
         data = []
         for m in months_list:
@@ -84,44 +128,148 @@ class MonthlySpendingView(APIView):
                 'income': str(inc),
                 'expense': str(exp),
             })
+        return data
 
-        # --- 5. Save the final result to the cache ---
-        # We'll save it for 15 minutes (900 seconds)
-        cache.set(cache_key, data, timeout=(60 * 15))
-
-        return Response({'months': data})
-
-# (CategorySpendingView stays the same)
 class CategorySpendingView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get('category-spending')
     def get(self, request):
-        qs = get_analytics_queryset(request)
-        if qs is None:
+        start, end = get_date_range(request)
+        txns = get_analytics_queryset(request)
+        if txns is None:
             return Response({'detail': 'Forbidden'}, status=403)
-        start = request.query_params.get('start', None)
-        end = request.query_params.get('end', None)
-        if start:
-            qs = qs.filter(date__gte=start)
-        if end:
-            qs = qs.filter(date__lte=end)
-        cat = qs.filter(type='expense').values('category').annotate(total=Sum('amount')).order_by('-total')
-        data = [{'category': c['category'], 'total': str(c['total'] or '0.00')} for c in cat]
+        rollups = get_rollup_queryset(request)
+
+        def compute():
+            # Whole months from the rollups, partial edge months from the raw rows
+            totals = range_totals(
+                txns.filter(type='expense'), rollups.filter(type='expense'),
+                start, end, group_by=['category'],
+            )
+            cat = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+            return [{'category': c, 'total': str(t)} for (c,), t in cat]
+
+        data = cached_payload('category-spending', request, compute)
         return Response({'categories': data})
 
-# (SavingsVsExpenseView stays the same)
 class SavingsVsExpenseView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get('savings-vs-expense')
     def get(self, request):
-        qs = get_analytics_queryset(request)
+        start, end = get_date_range(request)
+        txns = get_analytics_queryset(request)
+        if txns is None:
+            return Response({'detail': 'Forbidden'}, status=403)
+        rollups = get_rollup_queryset(request)
+
+        def compute():
+            totals = range_totals(txns, rollups, start, end, group_by=['type'])
+            total_income = totals.get(('income',), Decimal('0.00'))
+            total_expense = totals.get(('expense',), Decimal('0.00'))
+            savings = total_income - total_expense
+            return {
+                'total_income': str(total_income),
+                'total_expense': str(total_expense),
+                'savings': str(savings)
+            }
+
+        return Response(cached_payload('savings-vs-expense', request, compute))
+
+
+def goals_version(request):
+    """ Fingerprint of the target user's goals (goal edits don't bump the data version). """
+    rows = Goal.objects.filter(user_id=analytics_user_id(request)).order_by('id') \
+        .values_list('id', 'name', 'target_amount', 'saved_amount', 'deadline', 'completed')
+    return hashlib.md5(repr(list(rows)).encode()).hexdigest()
+
+
+class DashboardView(APIView):
+    """
+    Everything the dashboard shows, in one response: the savings summary, the
+    monthly trend, category totals, goals and the next-month prediction.
+
+    The three analytics payloads (and the monthly totals the prediction
+    needs) come from a single grouped query over the rollups, with income
+    and expense as conditional sums; the trend's current month is summed
+    from the raw rows dated up to today.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Keyed by day as well: the trend's current month only counts rows dated up to today
+    @conditional_get('dashboard', versions=[
+        lambda request: insights_model_version(), goals_version, lambda request: date.today().isoformat(),
+    ])
+    def get(self, request):
+        qs = get_rollup_queryset(request)
         if qs is None:
             return Response({'detail': 'Forbidden'}, status=403)
-        total_income = qs.filter(type='income').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        total_expense = qs.filter(type='expense').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        savings = total_income - total_expense
+        txns = get_analytics_queryset(request)
+        months = get_months(request)
+        user_id = request.query_params.get('user_id')
+        user = get_object_or_404(get_user_model(), pk=user_id) if user_id else request.user
+
+        today = date.today()
+        aggregates = cached_payload(f'dashboard:{today.isoformat()}', request,
+                                    lambda: self.compute(qs, txns, months, today))
+
+        goals = Goal.objects.filter(user=user).select_related('user').order_by('deadline')
+        prediction, _ = predict_monthly_expense(user, by_month=aggregates['by_month'])
+
         return Response({
-            'total_income': str(total_income),
-            'total_expense': str(total_expense),
-            'savings': str(savings)
-        })
\ No newline at end of file
+            'summary': aggregates['summary'],
+            'trend': aggregates['trend'],
+            'categories': aggregates['categories'],
+            'goals': GoalSerializer(goals, many=True).data,
+            'prediction': prediction,
+        })
+
+    def compute(self, qs, txns, months, today):
+        rows = qs.values('month', 'category').annotate(
+            income=Sum('total', filter=Q(type='income')),
+            expense=Sum('total', filter=Q(type='expense')),
+        ).order_by()
+
+        total_income = Decimal('0.00')
+        total_expense = Decimal('0.00')
+        by_month = {}
+        by_category = {}
+        for row in rows:
+            income = row['income'] or Decimal('0')
+            expense = row['expense'] or Decimal('0')
+            total_income += income
+            total_expense += expense
+            month = by_month.setdefault(row['month'], {'income': Decimal('0'), 'expense': Decimal('0')})
+            month['income'] += income
+            month['expense'] += expense
+            if row['expense'] is not None:
+                by_category[row['category']] = by_category.get(row['category'], Decimal('0')) + expense
+
+        # As in MonthlySpendingView, the current month comes from the raw rows
+        current_month = {today.replace(day=1): current_month_totals(txns, today)}
+        trend = []
+        for m in trailing_months(months):
+            totals = current_month.get(m) or by_month.get(m, {})
+            trend.append({
+                'month': m.isoformat(),
+                'income': str(totals.get('income', Decimal('0'))),
+                'expense': str(totals.get('expense', Decimal('0'))),
+            })
+
+        categories = [
+            {'category': c, 'total': str(t)}
+            for c, t in sorted(by_category.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+        return {
+            'summary': {
+                'total_income': str(total_income),
+                'total_expense': str(total_expense),
+                'savings': str(total_income - total_expense),
+            },
+            'trend': trend,
+            'categories': categories,
+            # Kept for the prediction features, not sent to the client
+            'by_month': {m: {k: float(v) for k, v in t.items()} for m, t in by_month.items()},
+        }
@@ -0,0 +1,86 @@
+# backend/analytics/views_platform.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from django.utils.dateparse import parse_date
+
+from .platform import category_totals, top_spenders, monthly_growth, expense_quantiles
+from .views import trailing_months
+
+
+def parse_month(value, name):
+    """ Accepts YYYY-MM or YYYY-MM-DD and returns the first day of that month. """
+    try:
+        d = parse_date(value if len(value) > 7 else f"{value}-01")
+    except ValueError:
+        d = None
+    if d is None:
+        raise ValidationError({name: 'Expected a month in YYYY-MM format.'})
+    return d.replace(day=1)
+
+
+def get_month_range(request, default_months=12):
+    """ ?start= / ?end= months, defaulting to the last `default_months` months. """
+    months = trailing_months(default_months)
+    start = request.query_params.get('start')
+    end = request.query_params.get('end')
+    first = parse_month(start, 'start') if start else months[0]
+    last = parse_month(end, 'end') if end else months[-1]
+    return first, last
+
+
+class PlatformAdminView(APIView):
+    """
+    Base for the platform-wide admin views. They only read the summary tables
+    built by `manage.py refresh_platform_summaries`, never raw transactions.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'detail': 'Forbidden'}, status=403)
+        first, last = get_month_range(request)
+        data = self.compute(request, first, last)
+        data.update({'start': first.isoformat(), 'end': last.isoformat()})
+        return Response(data)
+
+
+class PlatformCategoryView(PlatformAdminView):
+    """ Spend (or income, with ?type=income) per category across all users. """
+
+    def compute(self, request, first, last):
+        type_ = request.query_params.get('type', 'expense')
+        return {'categories': category_totals(first, last, type_=type_)}
+
+
+class PlatformTopSpendersView(PlatformAdminView):
+    """ Top ?k= spenders; exact for one month, approximate over a range. """
+
+    def compute(self, request, first, last):
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 1), 100)
+        except ValueError:
+            raise ValidationError({'k': 'Expected an integer.'})
+        rows, approximate = top_spenders(first, last, k=k)
+        return {'top_spenders': rows, 'approximate': approximate}
+
+
+class PlatformGrowthView(PlatformAdminView):
+    """ Platform totals per month with month-over-month growth. """
+
+    def compute(self, request, first, last):
+        return {'months': monthly_growth(first, last)}
+
+
+class PlatformQuantilesView(PlatformAdminView):
+    """ Approximate percentiles of per-user monthly expense (?q=0.5,0.9,0.99). """
+
+    def compute(self, request, first, last):
+        try:
+            qs = [float(q) for q in request.query_params.get('q', '0.5,0.9,0.99').split(',')]
+        except ValueError:
+            raise ValidationError({'q': 'Expected comma-separated numbers between 0 and 1.'})
+        if any(q < 0 or q > 1 for q in qs):
+            raise ValidationError({'q': 'Expected comma-separated numbers between 0 and 1.'})
+        return expense_quantiles(first, last, qs=qs)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Budget
+from .models import Budget, BudgetAlert, BudgetPeriodTotal
 
 # This will add the Budget model
-admin.site.register(Budget)
\ No newline at end of file
+admin.site.register(Budget)
+admin.site.register(BudgetPeriodTotal)
+admin.site.register(BudgetAlert)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BudgetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'budgets'
+
+    def ready(self):
+        # Keeps BudgetPeriodTotal in sync with Transaction and Budget writes
+        from . import signals  # noqa: F401
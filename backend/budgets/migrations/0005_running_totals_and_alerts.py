@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_period_totals(apps, schema_editor):
+    # Totals only; past threshold crossings are not turned into alerts
+    Budget = apps.get_model('budgets', 'Budget')
+    BudgetPeriodTotal = apps.get_model('budgets', 'BudgetPeriodTotal')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    totals = []
+    for budget in Budget.objects.iterator():
+        spent = Transaction.objects.filter(
+            user_id=budget.user_id, type='expense', category=budget.category,
+            date__gte=budget.start_date, date__lte=budget.end_date,
+        ).aggregate(total=Sum('amount'))['total'] or 0
+        totals.append(BudgetPeriodTotal(budget=budget, period_start=budget.start_date,
+                                        period_end=budget.end_date, spent=spent))
+    BudgetPeriodTotal.objects.bulk_create(totals, batch_size=5000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0004_pagination_indexes'),
+        ('transactions', '0008_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('threshold', models.PositiveSmallIntegerField()),
+                ('spent', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('limit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BudgetPeriodTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'category', 'start_date'], name='budget_user_cat_start'),
+        ),
+        migrations.AddField(
+            model_name='budgetalert',
+            name='budget',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='budgets.budget'),
+        ),
+        migrations.AddField(
+            model_name='budgetalert',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='budgetperiodtotal',
+            name='budget',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_totals', to='budgets.budget'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetalert',
+            index=models.Index(fields=['user', '-created_at'], name='budget_alert_user_created'),
+        ),
+        migrations.AddConstraint(
+            model_name='budgetalert',
+            constraint=models.UniqueConstraint(fields=('budget', 'period_start', 'threshold'), name='uniq_budget_alert'),
+        ),
+        migrations.AddConstraint(
+            model_name='budgetperiodtotal',
+            constraint=models.UniqueConstraint(fields=('budget', 'period_start'), name='uniq_budget_period'),
+        ),
+        migrations.RunPython(backfill_period_totals, migrations.RunPython.noop),
+    ]
@@ -14,6 +14,59 @@ class Budget(models.Model):
 
     class Meta:
         ordering = ['-start_date'] # Show newest budgets first by default
+        indexes = [
+            # Keyset pagination of the list API, per user and (for admins) overall
+            models.Index(fields=['user', '-start_date', '-id'], name='budget_user_start_id'),
+            models.Index(fields=['-start_date', '-id'], name='budget_start_id'),
+            # Finding the budgets a new transaction counts towards
+            models.Index(fields=['user', 'category', 'start_date'], name='budget_user_cat_start'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.category} ({self.start_date} to {self.end_date})"
\ No newline at end of file
+        return f"{self.user.username} - {self.category} ({self.start_date} to {self.end_date})"
+
+
+class BudgetPeriodTotal(models.Model):
+    """
+    Running expense total for one budget period. Updated with F() in the
+    same database transaction as every Transaction write (see
+    budgets/running_totals.py), so alerts never need to re-sum history.
+    A budget currently has a single period: its start_date..end_date window.
+    """
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='period_totals')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start'], name='uniq_budget_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id} {self.period_start}: {self.spent}"
+
+
+class BudgetAlert(models.Model):
+    """ Recorded the first time a budget period's spending reaches a threshold. """
+    THRESHOLDS = (80, 100, 120) # Percent of the budget limit
+
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alerts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    period_start = models.DateField()
+    threshold = models.PositiveSmallIntegerField()
+    spent = models.DecimalField(max_digits=14, decimal_places=2) # Running total when it fired
+    limit = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start', 'threshold'], name='uniq_budget_alert'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='budget_alert_user_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id} reached {self.threshold}% ({self.spent}/{self.limit})"
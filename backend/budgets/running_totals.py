@@ -0,0 +1,88 @@
+# backend/budgets/running_totals.py
+"""
+Per-budget running expense totals and threshold alerts.
+
+Every Transaction write sends transactions.rollups.transactions_changed with
+the rows it added or removed. apply_changes looks up the budgets those rows
+fall into (one indexed query), moves each budget's BudgetPeriodTotal with an
+F() update and records a BudgetAlert when the total crosses 80/100/120% of
+the limit. The cost per write depends on the number of budgets touched,
+never on how many transactions the user already has.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum
+
+from transactions.models import Transaction
+from .models import Budget, BudgetAlert, BudgetPeriodTotal
+
+ZERO = Decimal('0')
+
+
+def crossed_thresholds(limit, before, after):
+    """ The alert thresholds (percent) passed going from `before` to `after`. """
+    if not limit or limit <= 0:
+        return []
+    return [t for t in BudgetAlert.THRESHOLDS if before < limit * t / 100 <= after]
+
+
+def record_alerts(budget, before, after):
+    alerts = [
+        BudgetAlert(budget=budget, user_id=budget.user_id, period_start=budget.start_date,
+                    threshold=t, spent=after, limit=budget.limit)
+        for t in crossed_thresholds(budget.limit, before, after)
+    ]
+    if alerts:
+        # Each threshold fires once per period
+        BudgetAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+
+
+def apply_changes(changes):
+    """ Applies transactions_changed rows to the matching budgets' running totals. """
+    by_key = defaultdict(list)
+    for user_id, date, type_, category, amount in changes:
+        if type_ == 'expense' and amount:
+            by_key[(user_id, category)].append((date, Decimal(str(amount))))
+    if not by_key:
+        return
+
+    match = Q()
+    for (user_id, category), rows in by_key.items():
+        dates = [date for date, _ in rows]
+        match |= Q(user_id=user_id, category=category, start_date__lte=max(dates), end_date__gte=min(dates))
+    budgets = Budget.objects.filter(match).order_by() \
+        .only('id', 'user_id', 'category', 'limit', 'start_date', 'end_date')
+
+    for budget in budgets:
+        delta = sum((amount for date, amount in by_key[(budget.user_id, budget.category)]
+                     if budget.start_date <= date <= budget.end_date), ZERO)
+        if not delta:
+            continue
+        totals = BudgetPeriodTotal.objects.filter(budget=budget, period_start=budget.start_date)
+        if not totals.update(spent=F('spent') + delta):
+            # No running total yet (e.g. a budget from before they existed)
+            recompute_budget_total(budget)
+            continue
+        after = totals.values_list('spent', flat=True).get()
+        if delta > 0:
+            record_alerts(budget, after - delta, after)
+
+
+def recompute_budget_total(budget):
+    """
+    Re-sums a budget's window from the raw transactions, e.g. after the
+    budget's category, dates or limit changed. Returns the total.
+    """
+    spent = Transaction.objects.filter(
+        user_id=budget.user_id, type='expense', category=budget.category,
+        date__gte=budget.start_date, date__lte=budget.end_date,
+    ).aggregate(total=Sum('amount'))['total'] or ZERO
+
+    BudgetPeriodTotal.objects.filter(budget=budget).exclude(period_start=budget.start_date).delete()
+    BudgetPeriodTotal.objects.update_or_create(
+        budget=budget, period_start=budget.start_date,
+        defaults={'period_end': budget.end_date, 'spent': spent},
+    )
+    record_alerts(budget, ZERO, spent)
+    return spent
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Budget
+from .models import Budget, BudgetAlert
 
 class BudgetSerializer(serializers.ModelSerializer):
     """
@@ -21,4 +21,16 @@ class BudgetSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Validation Error: Start date must be before or the same as end date.")
         if 'limit' in data and float(data['limit']) <= 0:
             raise serializers.ValidationError("Validation Error: Budget limit must be positive.")
-        return data
\ No newline at end of file
+        return data
+
+
+class BudgetAlertSerializer(serializers.ModelSerializer):
+    """
+    Serializes BudgetAlert instances, with the budget's category for display.
+    """
+    category = serializers.CharField(source='budget.category', read_only=True)
+
+    class Meta:
+        model = BudgetAlert
+        fields = ['id', 'budget', 'category', 'period_start', 'threshold', 'spent', 'limit', 'created_at']
+        read_only_fields = fields
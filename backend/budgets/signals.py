@@ -0,0 +1,20 @@
+# backend/budgets/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from transactions.rollups import transactions_changed
+from .models import Budget
+from .running_totals import apply_changes, recompute_budget_total
+
+
+@receiver(transactions_changed)
+def update_budget_totals(sender, changes, **kwargs):
+    apply_changes(changes)
+
+
+@receiver(post_save, sender=Budget)
+def recompute_on_budget_save(sender, instance, **kwargs):
+    # The window, category or limit may have changed
+    with transaction.atomic():
+        recompute_budget_total(instance)
@@ -0,0 +1,87 @@
+# backend/budgets/status.py
+"""
+Budget utilization: how much of each budget has been spent so far.
+
+Every active budget is evaluated in one SQL query. Correlated subqueries
+sum the user's expenses in the budget's category over the budget's own
+start_date..end_date window (served by the txn_user_type_date index):
+`spent` covers the whole window, so future-dated (scheduled) expenses the
+user has already entered count against the budget, while the pace used for
+the projection only counts expenses dated up to today.
+"""
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from transactions.models import Transaction
+from .models import Budget
+
+CENT = Decimal('0.01')
+
+
+def spent_subquery(until=None):
+    """
+    Expense total for the outer Budget's user, category and date window,
+    only up to `until` when it is given.
+    """
+    spent = Transaction.objects.filter(
+        user=OuterRef('user'),
+        type='expense',
+        category=OuterRef('category'),
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date'),
+    )
+    if until is not None:
+        spent = spent.filter(date__lte=until)
+    spent = spent.order_by().values('user').annotate(total=Sum('amount')).values('total')
+    return Coalesce(
+        Subquery(spent, output_field=DecimalField(max_digits=14, decimal_places=2)),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def project(spent, spent_to_date, limit, start, end, today):
+    """
+    Extends the spending pace so far (spent_to_date per elapsed day) to the
+    whole budget period, but never below what is already booked in it.
+    Returns (projected_spent, projected_overrun).
+    """
+    total_days = (end - start).days + 1
+    elapsed_days = min((min(today, end) - start).days + 1, total_days)
+    projected = spent
+    if elapsed_days > 0:
+        paced = (spent_to_date / elapsed_days * total_days).quantize(CENT, ROUND_HALF_UP)
+        projected = max(paced, spent)
+    return projected, max(projected - limit, Decimal('0'))
+
+
+def budget_status(user, today=None):
+    """ Status rows for the user's budgets that are active on `today`. """
+    today = today or date.today()
+    budgets = Budget.objects.filter(user=user, start_date__lte=today, end_date__gte=today) \
+        .annotate(spent=spent_subquery(), spent_to_date=spent_subquery(until=today)) \
+        .order_by('end_date', 'id')
+
+    rows = []
+    for budget in budgets:
+        spent = Decimal(budget.spent).quantize(CENT)
+        spent_to_date = Decimal(budget.spent_to_date).quantize(CENT)
+        projected, overrun = project(spent, spent_to_date, budget.limit, budget.start_date, budget.end_date, today)
+        rows.append({
+            'id': budget.id,
+            'category': budget.category,
+            'limit': str(budget.limit),
+            'start_date': budget.start_date,
+            'end_date': budget.end_date,
+            'spent': str(spent),
+            'spent_to_date': str(spent_to_date),
+            'remaining': str(budget.limit - spent),
+            'percent_used': round(float(spent / budget.limit * 100), 1) if budget.limit else None,
+            'projected_spent': str(projected),
+            'projected_overrun': str(overrun),
+            'days_left': (budget.end_date - today).days,
+        })
+    return rows
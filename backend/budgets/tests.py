@@ -1,3 +1,161 @@
+from datetime import date
+
 from django.test import TestCase
 
+from finwise_backend.testing import QueryBudgetTestCase
+from users.models import User
+from transactions.models import Transaction
+from .models import Budget
+
 # Create your tests here.
+
+
+class BudgetQueryBudgetTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', password='x', role='admin')
+        self.n_users = 0
+
+    def seed(self, n):
+        for _ in range(n):
+            self.n_users += 1
+            owner = User.objects.create_user(username=f'u{self.n_users}', email=f'u{self.n_users}@example.com')
+            for user in (owner, self.user):
+                Budget.objects.create(user=user, category='Food', limit=100,
+                                      start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+
+    def test_list(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, '/api/budgets/', self.seed)
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(1, '/api/budgets/', self.seed)
+
+    def seed_status(self, n):
+        for i in range(n):
+            Budget.objects.create(user=self.user, category=f'C{i % 4}', limit=100,
+                                  start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+            Transaction.objects.create(user=self.user, title='t', amount=5, type='expense',
+                                       category=f'C{i % 4}', date=date(2026, 1, 10))
+
+    def test_status(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, '/api/budgets/status/?date=2026-01-15', self.seed_status)
+
+
+class BudgetStatusTests(TestCase):
+
+    def test_spent_and_projection(self):
+        user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        budget = Budget.objects.create(user=user, category='Food', limit=300,
+                                       start_date=date(2026, 1, 1), end_date=date(2026, 1, 30))
+        for day, amount, category in [(1, 50, 'Food'), (10, 100, 'Food'), (12, 70, 'Rent'), (20, 999, 'Food')]:
+            Transaction.objects.create(user=user, title='t', amount=amount, type='expense',
+                                       category=category, date=date(2026, 1, day))
+        Transaction.objects.create(user=user, title='t', amount=40, type='expense',
+                                   category='Food', date=date(2025, 12, 31))
+
+        self.client.force_login(user)
+        [row] = self.client.get('/api/budgets/status/?date=2026-01-15').json()
+        self.assertEqual(row['id'], budget.id)
+        # Only Food expenses inside the window count, including ones after `date`
+        self.assertEqual(row['spent'], '1149.00')
+        self.assertEqual(row['spent_to_date'], '150.00')
+        self.assertEqual(row['remaining'], '-849.00')
+        self.assertEqual(row['percent_used'], 383.0)
+        # 150 over 15 of 30 days paces to 300, below what is already booked
+        self.assertEqual(row['projected_spent'], '1149.00')
+        self.assertEqual(row['projected_overrun'], '849.00')
+
+        Transaction.objects.filter(user=user, amount=999).delete()
+        [row] = self.client.get('/api/budgets/status/?date=2026-01-12').json()
+        # 150 over 12 of 30 days
+        self.assertEqual(row['spent_to_date'], '150.00')
+        self.assertEqual(row['projected_spent'], '375.00')
+        self.assertEqual(row['projected_overrun'], '75.00')
+        self.assertEqual(self.client.get('/api/budgets/status/?date=2026-02-01').json(), [])
+
+
+class BudgetAlertTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.budget = Budget.objects.create(user=self.user, category='Food', limit=100,
+                                            start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        self.client.force_login(self.user)
+
+    def spend(self, amount, day=10, category='Food'):
+        response = self.client.post('/api/transactions/', {
+            'title': 't', 'amount': amount, 'type': 'expense', 'category': category,
+            'date': date(2026, 1, day).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def spent(self):
+        return self.budget.period_totals.get().spent
+
+    def thresholds(self):
+        return sorted(self.budget.alerts.values_list('threshold', flat=True))
+
+    def test_running_total_and_alerts(self):
+        self.spend(50)
+        self.spend(20, category='Rent')
+        self.spend(30, day=1)
+        Transaction.objects.create(user=self.user, title='t', amount=500, type='expense',
+                                   category='Food', date=date(2026, 2, 1))
+        self.assertEqual(self.spent(), 80)
+        self.assertEqual(self.thresholds(), [80])
+
+        last = self.spend(45)
+        self.assertEqual(self.thresholds(), [80, 100, 120])
+        # Going back under and over again does not repeat an alert
+        self.client.delete(f'/api/transactions/{last}/')
+        self.spend(25)
+        self.assertEqual(self.spent(), 105)
+        self.assertEqual(self.thresholds(), [80, 100, 120])
+        self.assertEqual(
+            [a['threshold'] for a in self.client.get('/api/budgets/alerts/').json()], [120, 100, 80],
+        )
+
+    def test_bulk_insert_and_budget_edit(self):
+        response = self.client.post('/api/transactions/bulk/', [
+            {'title': 't', 'amount': '40', 'type': 'expense', 'category': 'Food', 'date': '2026-01-05'},
+            {'title': 't', 'amount': '45', 'type': 'expense', 'category': 'Food', 'date': '2026-01-06'},
+            {'title': 't', 'amount': '45', 'type': 'income', 'category': 'Food', 'date': '2026-01-06'},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.spent(), 85)
+        self.assertEqual(self.thresholds(), [80])
+
+        # Lowering the limit re-evaluates the period
+        self.budget.limit = 70
+        self.budget.save()
+        self.assertEqual(self.thresholds(), [80, 100, 120])
+        self.budget.start_date = date(2026, 1, 6)
+        self.budget.save()
+        self.assertEqual(self.spent(), 45)
+
+
+class TransactionWriteQueryBudgetTests(QueryBudgetTestCase):
+    """ Inserting a transaction costs the same however much history the user has. """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        Budget.objects.create(user=self.user, category='Food', limit=100,
+                              start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+
+    def seed(self, n):
+        for _ in range(n):
+            Transaction.objects.create(user=self.user, title='t', amount=5, type='expense',
+                                       category='Food', date=date(2026, 1, 10))
+
+    def test_create(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(10, '/api/transactions/', self.seed, method='post', data={
+            'title': 't', 'amount': '1', 'type': 'expense', 'category': 'Food', 'date': '2026-01-10',
+        })
@@ -1,11 +1,19 @@
+from datetime import date
+
 from rest_framework import viewsets, permissions
-from .models import Budget
-from .serializers import BudgetSerializer
-from users.models import User
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .models import Budget, BudgetAlert
+from .serializers import BudgetSerializer, BudgetAlertSerializer
+from .status import budget_status
+from finwise_backend.pagination import KeysetPagination
 
 class BudgetViewSet(viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
     permission_classes = [permissions.IsAuthenticated] # Only logged-in users
+    pagination_class = KeysetPagination
+    ordering = ('-start_date', '-id')
 
     def get_queryset(self):
         """
@@ -16,10 +24,33 @@ class BudgetViewSet(viewsets.ModelViewSet):
         user = self.request.user
         # Check the 'role' field we added on Day 7
         if hasattr(user, 'role') and user.role == 'admin':
-            return Budget.objects.all().order_by('-start_date') # Admins see all
+            return Budget.objects.select_related('user').order_by(*self.ordering) # Admins see all
         # Normal users only see their own
-        return Budget.objects.filter(user=user).order_by('-start_date')
+        return Budget.objects.filter(user=user).select_related('user').order_by(*self.ordering)
 
     def perform_create(self, serializer):
         """Ensure the budget is saved with the logged-in user."""
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['get'], url_path='status')
+    def current_status(self, request):
+        """
+        Spent, remaining and percentage used for each of the user's active
+        budgets, plus the projected end-of-period spend at the pace so far.
+        `spent` includes future-dated expenses already entered in the period;
+        `spent_to_date` (what the pace is based on) does not.
+        ?date=YYYY-MM-DD evaluates the budgets as of another day.
+        """
+        today = date.today()
+        if request.query_params.get('date'):
+            try:
+                today = date.fromisoformat(request.query_params['date'])
+            except ValueError:
+                raise ValidationError({'date': 'Use YYYY-MM-DD.'})
+        return Response(budget_status(request.user, today))
+
+    @action(detail=False, methods=['get'], url_path='alerts')
+    def alerts(self, request):
+        """ The user's most recent budget threshold alerts (80%, 100%, 120%), newest first. """
+        alerts = BudgetAlert.objects.filter(user=request.user).select_related('budget')[:50]
+        return Response(BudgetAlertSerializer(alerts, many=True).data)
@@ -0,0 +1,151 @@
+# backend/finwise_backend/bench_cache.py
+"""
+Benchmark for the shared cache backend.
+
+Runs 1, 4 and 16 worker processes that each serve a stream of requests for
+Zipf-distributed keys (a few hot users, a long tail), computing a key with a
+fixed cost on a miss. Compares the per-process LocMemCache with the shared
+SQLiteCache on hit rate and p50/p99 latency, then checks the stampede case:
+every worker asking for the same cold key at once. Run with:
+    python finwise_backend/bench_cache.py
+"""
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Points to D:\finwise\backend
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+WORKER_COUNTS = [1, 4, 16]
+N_KEYS = 500
+REQUESTS_PER_WORKER = 400
+COMPUTE_SECONDS = 0.005
+ZIPF_A = 1.2
+
+
+def setup_django(cache_dir):
+    import django
+    from django.conf import settings
+    settings.configure(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bench',
+            'TIMEOUT': 3600,
+        },
+        'shared': {
+            'BACKEND': 'finwise_backend.cache_backends.SQLiteCache',
+            'LOCATION': os.path.join(cache_dir, 'bench.sqlite3'),
+            'TIMEOUT': 3600,
+        },
+    })
+    django.setup()
+
+
+def worker(alias, seed, start_event, results):
+    from django.core.cache import caches
+    from finwise_backend.cache_backends import get_or_compute
+
+    cache = caches[alias]
+    rng = np.random.default_rng(seed)
+    keys = np.minimum(rng.zipf(ZIPF_A, REQUESTS_PER_WORKER), N_KEYS)
+    computes = 0
+
+    def compute():
+        nonlocal computes
+        computes += 1
+        time.sleep(COMPUTE_SECONDS)
+        return {'payload': list(range(50))}
+
+    latencies = []
+    start_event.wait()
+    for k in keys:
+        t0 = time.perf_counter()
+        get_or_compute(cache, f"bench:{k}", compute)
+        latencies.append(time.perf_counter() - t0)
+    results.put((computes, latencies))
+
+
+def run(alias, n_workers):
+    from django.core.cache import caches
+    caches[alias].clear()
+
+    ctx = mp.get_context('fork')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(alias, seed, start_event, results)) for seed in range(n_workers)]
+    for p in procs:
+        p.start()
+    start_event.set()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    computes = sum(c for c, _ in collected)
+    latencies = np.concatenate([l for _, l in collected]) * 1000
+    total = n_workers * REQUESTS_PER_WORKER
+    return 1 - computes / total, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def stampede_worker(naive, start_event, results):
+    from django.core.cache import caches
+    from finwise_backend.cache_backends import get_or_compute
+
+    cache = caches['shared']
+    computes = 0
+
+    def compute():
+        nonlocal computes
+        computes += 1
+        time.sleep(COMPUTE_SECONDS * 20)
+        return 'value'
+
+    start_event.wait()
+    if naive:
+        # Plain get/set, what the views did before
+        if cache.get('bench:hot') is None:
+            cache.set('bench:hot', compute())
+    else:
+        get_or_compute(cache, 'bench:hot', compute)
+    results.put(computes)
+
+
+def run_stampede(naive, n_workers=16):
+    from django.core.cache import caches
+    caches['shared'].clear()
+
+    ctx = mp.get_context('fork')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=stampede_worker, args=(naive, start_event, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    start_event.set()
+    computes = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return computes
+
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        setup_django(cache_dir)
+
+        print(f"{'backend':>8} {'workers':>8} {'hit_rate':>9} {'p50_ms':>8} {'p99_ms':>8}")
+        for alias, label in [('default', 'locmem'), ('shared', 'sqlite')]:
+            for n in WORKER_COUNTS:
+                hit_rate, p50, p99 = run(alias, n)
+                print(f"{label:>8} {n:>8} {hit_rate:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+
+        print()
+        print("16 workers requesting one cold key at once:")
+        print(f"  plain get/set:   {run_stampede(naive=True)} computes")
+        print(f"  get_or_compute:  {run_stampede(naive=False)} computes")
+
+
+if __name__ == "__main__":
+    main()
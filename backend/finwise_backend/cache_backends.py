@@ -0,0 +1,179 @@
+# backend/finwise_backend/cache_backends.py
+"""
+A cache backend shared by every worker process on the machine, without an
+external service: entries live in one SQLite file (WAL mode, memory-mapped),
+so all gunicorn workers see the same entries and the same invalidations.
+
+Also provides get_or_compute(), which makes sure only one caller recomputes
+an expired key while the others wait for its result.
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """
+    CACHES = {'shared': {
+        'BACKEND': 'finwise_backend.cache_backends.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 50000, 'MMAP_SIZE': 256 * 1024 * 1024},
+    }}
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._mmap_size = int(options.get('MMAP_SIZE', 256 * 1024 * 1024))
+        self._local = threading.local()
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # --- connection handling ---
+
+    def _conn(self):
+        # One connection per thread and per process (never reuse one across fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={self._mmap_size}')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expiry(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        # None means "never expires"
+        return float('inf') if timeout is None else timeout
+
+    # --- BaseCache API ---
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        # Inserts, or replaces an expired entry; a live entry is left alone
+        cur = self._conn().execute(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache_entries.expires <= ?',
+            (key, blob, self._expiry(timeout), time.time()),
+        )
+        return cur.rowcount > 0
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND expires > ?', (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+            (key, blob, self._expiry(timeout)),
+        )
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cur = self._conn().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND expires > ?',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return cur.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cur = self._conn().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cur.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND expires > ?', (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests
+        pass
+
+    # --- culling ---
+
+    def _maybe_cull(self):
+        # Amortized: only every ~cull_frequency-th write pays for it
+        if random.randrange(max(self._cull_frequency, 1) * 10) != 0:
+            return
+        conn = self._conn()
+        conn.execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count > self._max_entries:
+            # Drop the entries closest to expiry, 1/cull_frequency of the table
+            excess = count - self._max_entries + count // max(self._cull_frequency, 1)
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN '
+                '(SELECT key FROM cache_entries ORDER BY expires LIMIT ?)', (excess,),
+            )
+
+
+def get_or_compute(cache, key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=30, poll=0.02):
+    """
+    Returns cache[key], calling compute() on a miss. Works with any Django
+    cache that has an atomic add().
+
+    When a popular key expires, the first caller takes a short-lived lock key
+    and recomputes; concurrent callers wait for its result instead of all
+    recomputing at once. If the lock holder dies or runs past lock_timeout,
+    a waiter takes over.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + lock_timeout
+    delay = poll
+    while True:
+        if cache.add(lock_key, os.getpid(), timeout=lock_timeout):
+            try:
+                # Someone may have filled it between our miss and the lock
+                value = cache.get(key, _MISSING)
+                if value is _MISSING:
+                    value = compute()
+                    cache.set(key, value, timeout=timeout)
+                return value
+            finally:
+                cache.delete(lock_key)
+
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if time.monotonic() > deadline:
+            # The lock holder is stuck; don't make this request wait any longer
+            return compute()
@@ -161,6 +161,29 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'finwise-cache',
-    }
+    },
+    # Shared by every worker process on the host (one SQLite file), so hits and
+    # invalidations are not per-process. Used for analytics and AI results.
+    'shared': {
+        'BACKEND': 'finwise_backend.cache_backends.SQLiteCache',
+        'LOCATION': str(BASE_DIR / 'cache' / 'shared_cache.sqlite3'),
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MMAP_SIZE': 256 * 1024 * 1024,
+        },
+    },
 }
-# --- END CACHE CONFIGURATION ---
\ No newline at end of file
+# --- END CACHE CONFIGURATION ---
+
+# Upper bound (in bytes of pickle on disk) for the per-process model registry
+# that keeps the spend/categorizer models resident between requests.
+MODEL_REGISTRY_MAX_BYTES = 256 * 1024 * 1024
+
+# Optional CSV (columns: keyword,category) with extra merchant keywords for the
+# categorizer's rule fast path. Entries override the built-in RULES.
+CATEGORIZER_RULES_CSV = None
+
+# Analytics results are cached per user, query params and data version, and
+# every Transaction write bumps the version, so entries can live for hours.
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 6
@@ -0,0 +1,53 @@
+# backend/finwise_backend/testing.py
+"""
+Test helpers shared by the apps' tests.py files.
+
+QueryBudgetTestCase gives every endpoint a fixed query budget: the request
+is run once with a few rows and again with several times as many, and the
+test fails if the count grew (an N+1 somewhere) or is over the budget.
+"""
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-shared'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryBudgetTestCase(APITestCase):
+    """
+    Subclasses call assertQueryBudget(budget, url, seed) where seed(n) adds
+    n more rows of whatever the endpoint lists or aggregates.
+    """
+    small = 3
+    large = 15
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import caches
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+    def count_queries(self, url, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+        return len(ctx.captured_queries), ctx.captured_queries
+
+    def assertQueryBudget(self, budget, url, seed, method='get', **kwargs):
+        seed(self.small)
+        few, _ = self.count_queries(url, method, **kwargs)
+        seed(self.large - self.small)
+        many, queries = self.count_queries(url, method, **kwargs)
+
+        sql = "\n".join(q['sql'] for q in queries)
+        self.assertEqual(
+            few, many,
+            f"{url}: {few} queries with {self.small} rows but {many} with {self.large} "
+            f"(a query per row?)\n{sql}",
+        )
+        self.assertLessEqual(many, budget, f"{url}: {many} queries, budget is {budget}\n{sql}")
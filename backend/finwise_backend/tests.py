@@ -0,0 +1,183 @@
+import base64
+import json
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from budgets.models import Budget
+from transactions.models import Transaction
+from users.models import User
+from .cache_backends import SQLiteCache, get_or_compute
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.cache = SQLiteCache(f'{self.dir.name}/cache.sqlite3', {'TIMEOUT': 60})
+
+    def test_set_get_delete(self):
+        self.assertIsNone(self.cache.get('k'))
+        self.assertEqual(self.cache.get('k', 'default'), 'default')
+        self.cache.set('k', {'rows': [1, 2]})
+        self.assertEqual(self.cache.get('k'), {'rows': [1, 2]})
+        self.assertTrue(self.cache.has_key('k'))
+        self.cache.set('k', 'replaced')
+        self.assertEqual(self.cache.get('k'), 'replaced')
+        self.assertTrue(self.cache.delete('k'))
+        self.assertFalse(self.cache.delete('k'))
+        self.assertIsNone(self.cache.get('k'))
+
+    def test_add_only_when_missing(self):
+        self.assertTrue(self.cache.add('k', 1))
+        self.assertFalse(self.cache.add('k', 2))
+        self.assertEqual(self.cache.get('k'), 1)
+        # Falsy values are still values
+        self.cache.set('zero', 0)
+        self.assertEqual(self.cache.get('zero', 'default'), 0)
+
+    def test_expiry(self):
+        self.cache.set('short', 'a', timeout=10)
+        self.cache.set('forever', 'b', timeout=None)
+        self.cache.add('lock', 'c', timeout=10)
+        later = time.time() + 11
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertFalse(self.cache.has_key('short'))
+            self.assertEqual(self.cache.get('forever'), 'b')
+            # An expired entry can be added over
+            self.assertTrue(self.cache.add('lock', 'd'))
+            self.assertEqual(self.cache.get('lock'), 'd')
+
+    def test_shared_between_instances(self):
+        # What the workers see: separate connections to one file
+        other = SQLiteCache(f'{self.dir.name}/cache.sqlite3', {'TIMEOUT': 60})
+        self.cache.set('k', 'v')
+        self.assertEqual(other.get('k'), 'v')
+        other.delete('k')
+        self.assertIsNone(self.cache.get('k'))
+
+
+class GetOrComputeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.caches = {
+            'sqlite': SQLiteCache(f'{self.dir.name}/cache.sqlite3', {'TIMEOUT': 60}),
+            'locmem': LocMemCache('get-or-compute', {'TIMEOUT': 60}),
+        }
+        for cache in self.caches.values():
+            cache.clear()
+
+    def test_computes_once_under_concurrency(self):
+        for name, cache in self.caches.items():
+            with self.subTest(cache=name):
+                calls = []
+                started = threading.Event()
+
+                def compute():
+                    calls.append(1)
+                    started.set()
+                    time.sleep(0.2)  # Hold the lock while the others arrive
+                    return 'value'
+
+                results = []
+                first = threading.Thread(target=lambda: results.append(get_or_compute(cache, 'hot', compute)))
+                first.start()
+                started.wait(5)
+                waiters = [threading.Thread(target=lambda: results.append(get_or_compute(cache, 'hot', compute)))
+                           for _ in range(6)]
+                for t in waiters:
+                    t.start()
+                for t in [first, *waiters]:
+                    t.join()
+                self.assertEqual(len(calls), 1)
+                self.assertEqual(results, ['value'] * 7)
+                self.assertIsNone(cache.get('hot:lock'))
+
+    def test_failed_compute_releases_lock(self):
+        for name, cache in self.caches.items():
+            with self.subTest(cache=name):
+                def fail():
+                    raise RuntimeError('boom')
+
+                with self.assertRaises(RuntimeError):
+                    get_or_compute(cache, 'k', fail)
+                self.assertIsNone(cache.get('k:lock'))
+                # The next caller isn't kept waiting
+                self.assertEqual(get_or_compute(cache, 'k', lambda: 'ok', lock_timeout=0.1), 'ok')
+                self.assertEqual(cache.get('k'), 'ok')
+
+    def test_waiter_takes_over_from_stuck_holder(self):
+        for name, cache in self.caches.items():
+            with self.subTest(cache=name):
+                # A holder that died without releasing its lock
+                cache.add('k:lock', 123, timeout=60)
+                calls = []
+                value = get_or_compute(cache, 'k', lambda: calls.append(1) or 'fresh', lock_timeout=0.1)
+                self.assertEqual(value, 'fresh')
+                self.assertEqual(len(calls), 1)
+
+
+class KeysetPaginationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', email='pager@example.com')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', role='admin')
+        other = User.objects.create_user(username='other', email='other@example.com')
+        # Many rows per date, so the id tie-break decides page boundaries
+        for i in range(23):
+            day = date(2026, 1, 1) + timedelta(days=i % 4)
+            for owner in (self.user, other):
+                Transaction.objects.create(user=owner, title=f't{i}', amount=1, type='expense',
+                                           category='Food', date=day)
+        for i in range(7):
+            Budget.objects.create(user=self.user, category=f'c{i}', limit=10,
+                                  start_date=date(2026, 1, 1) + timedelta(days=i % 2), end_date=date(2026, 12, 31))
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_walks_transactions_without_gaps_or_duplicates(self):
+        self.client.force_authenticate(self.user)
+        ids, pages = self.walk('/api/transactions/?page_size=5')
+        expected = list(Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 5)
+
+    def test_admin_walks_everyone(self):
+        self.client.force_authenticate(self.admin)
+        ids, _ = self.walk('/api/transactions/?page_size=7')
+        self.assertEqual(ids, list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True)))
+
+    def test_walks_budgets(self):
+        self.client.force_authenticate(self.user)
+        ids, pages = self.walk('/api/budgets/?page_size=2')
+        self.assertEqual(ids, list(Budget.objects.order_by('-start_date', '-id').values_list('id', flat=True)))
+        self.assertEqual(pages, 4)
+
+    def test_tampered_cursor(self):
+        self.client.force_authenticate(self.user)
+        first = self.client.get('/api/transactions/?page_size=5').data['next']
+        cursor = parse_qs(urlparse(first).query)['cursor'][0]
+        for bad in ['not-base64!', cursor[:-3],
+                    base64.urlsafe_b64encode(json.dumps(['2026-01-01']).encode()).decode(),
+                    base64.urlsafe_b64encode(json.dumps(['not a date', 5]).encode()).decode()]:
+            with self.subTest(cursor=bad):
+                self.assertEqual(self.client.get(f'/api/transactions/?cursor={bad}').status_code, 404)
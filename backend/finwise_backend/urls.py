@@ -10,6 +10,7 @@ from users.views import UserViewSet, RegisterView, CustomTokenObtainPairView
 from transactions.views import TransactionViewSet
 from budgets.views import BudgetViewSet
 from goals.views import GoalViewSet
+from analytics.views import DashboardView
 
 # Import only the 'refresh' view from simplejwt
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -51,4 +52,5 @@ urlpatterns = [
     path('api/analytics/', include('analytics.urls')),
     path('api/insights/', include('insights.urls')),
     path('api/ai/', include('ai_engine.urls')),
+    path('api/dashboard/', DashboardView.as_view(), name='dashboard'),
 ]
\ No newline at end of file
@@ -0,0 +1,70 @@
+# backend/goals/bench_forecast.py
+"""
+Benchmark for the Monte Carlo goal forecast.
+
+Times simulate_goals on synthetic savings histories for different numbers
+of goals, with the path counts the endpoint would use, and checks the p99
+against the 100 ms request budget; exits non-zero when it is exceeded. The
+queries are covered by GoalForecastTests.test_worst_case_within_budget.
+Run with:
+    python goals/bench_forecast.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+# Points to D:\finwise\backend
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+BUDGET_MS = 100
+RUNS = 30
+CASES = [  # (requested paths, goals, mean monthly savings)
+    (10000, 1, 400),
+    (20000, 1, 400),
+    (20000, 5, 400),
+    (20000, 20, 400),
+    (20000, 50, 400),
+    (20000, 200, 400),
+    # Savings going nowhere: every block up to the horizon is simulated
+    (20000, 20, -100),
+]
+
+
+def setup_django():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finwise_backend.settings')
+    django.setup()
+
+
+def main():
+    setup_django()
+    from goals.forecast import HORIZON_MONTHS, path_count, simulate_goals
+
+    rng = np.random.default_rng(7)
+
+    print(f"{'paths':>7} {'goals':>5} {'mean':>5} {'p50 ms':>8} {'p99 ms':>8}")
+    over = False
+    for requested, n_goals, mean in CASES:
+        n_paths = path_count(requested, n_goals)
+        # Two years of monthly net savings with some bad months
+        history = rng.normal(mean, 600, size=24)
+        # Goals spread so most of them are being reached within each block
+        remaining = rng.uniform(100, 20000 / n_goals + 500, size=n_goals)
+        deadlines = rng.integers(1, 60, size=n_goals)
+        timings = []
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            simulate_goals(history, remaining, deadlines, n_paths, horizon=HORIZON_MONTHS, rng=rng)
+            timings.append((time.perf_counter() - start) * 1000)
+        p50, p99 = np.percentile(timings, [50, 99])
+        over |= p99 > BUDGET_MS
+        print(f"{n_paths:>7} {n_goals:>5} {mean:>5} {p50:>8.1f} {p99:>8.1f}")
+    print(f"Budget {BUDGET_MS} ms: {'EXCEEDED' if over else 'ok'}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# backend/goals/forecast.py
+"""
+Monte Carlo forecast of goal completion.
+
+A user's future monthly net savings (income - expense) are simulated by
+resampling the months of their own history, so the spread and skew of
+real months carry over. Paths are generated and accumulated as
+(paths x months) numpy arrays, and every goal is read off the same arrays.
+
+Goals are funded one after another in deadline order: a goal is reached
+once the savings so far cover its remaining amount plus the remaining
+amounts of the goals due before it.
+"""
+from datetime import date
+
+import numpy as np
+from django.db.models import Case, DecimalField, Sum, When
+
+from transactions.models import MonthlyRollup
+from transactions.rollups import get_data_version, next_month_start
+from .models import Goal
+
+DEFAULT_PATHS = 20000
+MIN_PATHS = 1000
+MAX_PATHS = 20000
+# Paths x goals simulated per request. Users with many goals get fewer
+# paths, so the forecast stays within its 100 ms budget (bench_forecast.py).
+MAX_PATH_GOALS = 20 * MAX_PATHS
+HISTORY_MONTHS = 24
+MIN_HISTORY_MONTHS = 3
+# Paths that haven't reached a goal within this many months never do
+HORIZON_MONTHS = 120
+# Months simulated per step; short goals rarely need more than one step
+SIMULATION_BLOCK = 24
+
+
+def add_months(d, months):
+    month = d.month - 1 + months
+    year = d.year + month // 12
+    month = month % 12 + 1
+    return d.replace(year=year, month=month, day=1)
+
+
+def months_until(today, deadline):
+    """ Whole months of saving left before `deadline` (0 if it has passed). """
+    return max((deadline.year - today.year) * 12 + deadline.month - today.month, 0)
+
+
+def monthly_net_savings(user, today, months=HISTORY_MONTHS):
+    """
+    Net savings for each complete month of the user's recent history, from
+    the first month with any transactions. Returns a float array, oldest first.
+    """
+    this_month = today.replace(day=1)
+    first = add_months(this_month, -months)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    rows = MonthlyRollup.objects.filter(user=user, month__gte=first, month__lt=this_month) \
+        .values('month') \
+        .annotate(
+            income=Sum(Case(When(type='income', then='total'), default=0, output_field=money)),
+            expense=Sum(Case(When(type='expense', then='total'), default=0, output_field=money)),
+        ).order_by('month')
+    net = {row['month']: float(row['income'] - row['expense']) for row in rows}
+    if not net:
+        return np.zeros(0)
+
+    # Months without transactions in between count as zero savings
+    series = []
+    month = min(net)
+    while month < this_month:
+        series.append(net.get(month, 0.0))
+        month = next_month_start(month)
+    return np.array(series)
+
+
+def path_count(requested, n_goals):
+    """ Paths to simulate for `n_goals` goals when `requested` were asked for. """
+    limit = MAX_PATH_GOALS // max(n_goals, 1)
+    return max(MIN_PATHS, min(requested, MAX_PATHS, limit))
+
+
+def simulate_goals(history, remaining, deadline_months, n_paths=DEFAULT_PATHS,
+                   horizon=HORIZON_MONTHS, rng=None, block=SIMULATION_BLOCK):
+    """
+    history: past monthly net savings. remaining: amount still needed per
+    goal, in funding order. deadline_months: months left per goal.
+
+    Months are simulated `block` at a time, stopping once every deadline is
+    covered and most paths have reached every goal (or at `horizon`).
+    Returns (probability of reaching each goal by its deadline, median
+    months to reach it or None when most paths never do).
+    """
+    rng = rng or np.random.default_rng()
+    if len(remaining) == 0:
+        return np.zeros(0), []
+    remaining = np.asarray(remaining, dtype=np.float64)
+    needed = np.cumsum(remaining).astype(np.float32)
+    last_deadline = max(deadline_months)
+    horizon = int(max(horizon, last_deadline))
+    samples = np.asarray(history, dtype=np.float32)
+
+    # Arrays are (months, paths), so every step works on whole rows of paths.
+    # months_short[i, p]: months so far in which path p had not yet covered goal i.
+    months_short = np.zeros((len(needed), n_paths), dtype=np.int32)
+    peak = np.empty((block, n_paths), dtype=np.float32)
+    below = np.empty((block, n_paths), dtype=bool)
+    balance = np.zeros(n_paths, dtype=np.float32)
+    best = np.full(n_paths, -np.inf, dtype=np.float32)
+    simulated = 0
+    while simulated < horizon:
+        size = min(block, horizon - simulated)
+        # uint16 draws and take() are several times faster than int64 fancy indexing
+        draws = rng.integers(0, len(samples), size=(size, n_paths), dtype=np.uint16)
+        samples.take(draws, out=peak[:size])
+        # Running balance, then the best balance so far (once a goal is
+        # covered it stays reached). Row by row, as accumulate along axis 0
+        # is much slower than adding whole contiguous rows.
+        for month in range(size):
+            row = peak[month]
+            np.add(balance, row, out=balance)
+            np.maximum(best, balance, out=best)
+            row[:] = best
+
+        lowest, highest = peak[0].min(), peak[size - 1].max()
+        for i, amount in enumerate(needed):
+            if amount > highest:
+                months_short[i] += size # No path gets there in this block
+            elif amount > lowest:
+                np.less(peak[:size], amount, out=below[:size])
+                months_short[i] += below[:size].sum(axis=0, dtype=np.int32)
+        simulated += size
+        mostly_reached = np.count_nonzero(months_short < simulated, axis=1) > n_paths // 2
+        if simulated >= last_deadline and (mostly_reached | (remaining <= 0)).all():
+            break
+
+    # Month (1-based) each path reached each goal; simulated + 1 means it didn't
+    first_month = months_short + 1
+    deadlines = np.asarray(deadline_months, dtype=np.int32)[:, None]
+    probability = np.count_nonzero(first_month <= deadlines, axis=1) / n_paths
+    # Goals already fully saved for are reached whatever happens
+    probability[remaining <= 0] = 1.0
+    # Exact whenever more than half the paths got there within `simulated`
+    medians = np.median(first_month, axis=1)
+    median_months = [
+        0 if left <= 0 else (int(np.ceil(median)) if median <= simulated else None)
+        for left, median in zip(remaining, medians)
+    ]
+    return probability, median_months
+
+
+def forecast_goals(user, n_paths=DEFAULT_PATHS, today=None):
+    """ Completion forecast for all of the user's open goals. """
+    today = today or date.today()
+    history = monthly_net_savings(user, today)
+    goals = list(Goal.objects.filter(user=user, completed=False).order_by('deadline', 'id'))
+    n_paths = path_count(n_paths, len(goals))
+
+    result = {
+        'paths': n_paths,
+        'history_months': len(history),
+        'monthly_net_savings': {
+            'mean': round(float(history.mean()), 2) if len(history) else None,
+            'std': round(float(history.std()), 2) if len(history) else None,
+        },
+        'goals': [],
+    }
+    if not goals:
+        return result
+
+    remaining = [max(float(g.target_amount - g.saved_amount), 0.0) for g in goals]
+    deadline_months = [months_until(today, g.deadline) for g in goals]
+    if len(history) < MIN_HISTORY_MONTHS:
+        probability, median_months = [None] * len(goals), [None] * len(goals)
+        result['detail'] = f"At least {MIN_HISTORY_MONTHS} months of history are needed to forecast."
+    else:
+        # Seeded by the data version, so the same data gives the same answer
+        rng = np.random.default_rng([user.id, get_data_version(user.id)])
+        probability, median_months = simulate_goals(history, remaining, deadline_months, n_paths, rng=rng)
+
+    for goal, left, p, months in zip(goals, remaining, probability, median_months):
+        completion = None
+        if months is not None:
+            completion = today if months == 0 else add_months(today, months)
+        result['goals'].append({
+            'id': goal.id,
+            'name': goal.name,
+            'deadline': goal.deadline,
+            'remaining': f"{left:.2f}",
+            'probability_by_deadline': round(float(p), 3) if p is not None else None,
+            'expected_completion': completion,
+        })
+    return result
@@ -15,6 +15,11 @@ class Goal(models.Model):
 
     class Meta:
         ordering = ['deadline'] # Order goals by deadline by default
+        indexes = [
+            # Keyset pagination of the list API, per user and (for admins) overall
+            models.Index(fields=['user', 'deadline', 'id'], name='goal_user_deadline_id'),
+            models.Index(fields=['deadline', 'id'], name='goal_deadline_id'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.name}"
\ No newline at end of file
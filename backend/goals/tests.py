@@ -1,3 +1,140 @@
+from datetime import date, timedelta
+
+import numpy as np
+
 from django.test import TestCase
 
+from finwise_backend.testing import QueryBudgetTestCase
+from transactions.models import Transaction
+from users.models import User
+from .forecast import (
+    HORIZON_MONTHS, MAX_PATH_GOALS, MAX_PATHS, MIN_PATHS, SIMULATION_BLOCK, add_months, path_count, simulate_goals,
+)
+from .models import Goal
+
 # Create your tests here.
+
+
+class GoalQueryBudgetTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', password='x', role='admin')
+        self.n_users = 0
+
+    def seed(self, n):
+        for _ in range(n):
+            self.n_users += 1
+            owner = User.objects.create_user(username=f'u{self.n_users}', email=f'u{self.n_users}@example.com')
+            for user in (owner, self.user):
+                Goal.objects.create(user=user, name='Trip', target_amount=500, saved_amount=50, deadline=date(2027, 1, 1))
+
+    def test_list(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, '/api/goals/', self.seed)
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(1, '/api/goals/', self.seed)
+
+    def seed_forecast(self, n):
+        # History and goals both grow; the forecast reads them in fixed queries
+        for _ in range(n):
+            self.n_users += 1
+            Transaction.objects.create(user=self.user, title='t', amount=100, type='income', category='Salary',
+                                       date=date.today() - timedelta(days=31 * (self.n_users % 12 + 1)))
+            Goal.objects.create(user=self.user, name='Trip', target_amount=500, deadline=date.today() + timedelta(days=365))
+
+    def test_forecast(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(3, '/api/goals/forecast/?paths=1000', self.seed_forecast)
+
+
+class GoalForecastTests(TestCase):
+
+    def test_steady_savings(self):
+        user = User.objects.create_user(username='saver', email='saver@example.com', password='x')
+        this_month = date.today().replace(day=1)
+        for months_ago in range(1, 7):
+            month = add_months(this_month, -months_ago)
+            Transaction.objects.create(user=user, title='pay', amount=1000, type='income', category='Salary', date=month)
+            Transaction.objects.create(user=user, title='rent', amount=500, type='expense', category='Rent', date=month)
+        first = Goal.objects.create(user=user, name='Laptop', target_amount=2000, saved_amount=500,
+                                    deadline=add_months(this_month, 4))
+        second = Goal.objects.create(user=user, name='Trip', target_amount=2000,
+                                     deadline=add_months(this_month, 5))
+        Goal.objects.create(user=user, name='Done', target_amount=10, deadline=this_month, completed=True)
+
+        self.client.force_login(user)
+        data = self.client.get('/api/goals/forecast/').json()
+        self.assertEqual(data['history_months'], 6)
+        self.assertEqual(data['monthly_net_savings'], {'mean': 500.0, 'std': 0.0})
+        by_id = {g['id']: g for g in data['goals']}
+        self.assertEqual(set(by_id), {first.id, second.id})
+        # 1500 left at 500 a month: reached after 3 months
+        self.assertEqual(by_id[first.id]['probability_by_deadline'], 1.0)
+        self.assertEqual(by_id[first.id]['expected_completion'], add_months(date.today(), 3).isoformat())
+        # Funded after the first goal: 3500 in total takes 7 months, past its deadline
+        self.assertEqual(by_id[second.id]['probability_by_deadline'], 0.0)
+        self.assertEqual(by_id[second.id]['expected_completion'], add_months(date.today(), 7).isoformat())
+
+    def test_deterministic_and_capped(self):
+        # Two full years of varied history and 20 goals; latency is checked
+        # by goals/bench_forecast.py, not here
+        user = User.objects.create_user(username='planner', email='planner@example.com', password='x')
+        this_month = date.today().replace(day=1)
+        for months_ago in range(1, 25):
+            month = add_months(this_month, -months_ago)
+            Transaction.objects.create(user=user, title='pay', amount=1000 + 37 * months_ago, type='income',
+                                       category='Salary', date=month)
+            Transaction.objects.create(user=user, title='rent', amount=700 + 53 * (months_ago % 7), type='expense',
+                                       category='Rent', date=month)
+        for i in range(20):
+            Goal.objects.create(user=user, name=f'Goal {i}', target_amount=500 + 250 * i,
+                                deadline=add_months(this_month, 3 + 2 * i))
+
+        self.client.force_login(user)
+        data = self.client.get(f'/api/goals/forecast/?paths={MAX_PATHS * 5}').json()
+        self.assertEqual(data['paths'], MAX_PATHS)
+        self.assertEqual(data['history_months'], 24)
+        self.assertEqual(len(data['goals']), 20)
+        # Same data, same seed, same answer
+        self.assertEqual(self.client.get(f'/api/goals/forecast/?paths={MAX_PATHS * 5}').json(), data)
+
+        # Goals are funded in deadline order, so they complete in that order
+        probabilities = [g['probability_by_deadline'] for g in data['goals']]
+        self.assertTrue(all(0 <= p <= 1 for p in probabilities))
+        completions = [g['expected_completion'] for g in data['goals'] if g['expected_completion']]
+        self.assertEqual(completions, sorted(completions))
+
+    def test_path_count(self):
+        self.assertEqual(path_count(100000, 1), MAX_PATHS)
+        self.assertEqual(path_count(50, 1), MIN_PATHS)
+        self.assertEqual(path_count(MAX_PATHS, 50), MAX_PATH_GOALS // 50)
+        self.assertEqual(path_count(MAX_PATHS, 10000), MIN_PATHS)
+
+    def test_simulation_matches_brute_force(self):
+        history = np.array([400.0, -250.0, 900.0, 120.0, 650.0])
+        remaining, deadlines = [0.0, 1500.0, 2500.0, 4000.0], [0, 6, 10, 40]
+        probability, median_months = simulate_goals(history, remaining, deadlines, n_paths=500,
+                                                     rng=np.random.default_rng(3))
+        again = simulate_goals(history, remaining, deadlines, n_paths=500, rng=np.random.default_rng(3))
+        np.testing.assert_array_equal(probability, again[0])
+        self.assertEqual(median_months, again[1])
+
+        # Replay the same draws one path at a time
+        rng = np.random.default_rng(3)
+        draws = np.concatenate([
+            rng.integers(0, len(history), size=(SIMULATION_BLOCK, 500), dtype=np.uint16)
+            for _ in range(-(-HORIZON_MONTHS // SIMULATION_BLOCK))
+        ])
+        balances = np.cumsum(history.astype(np.float32)[draws], axis=0)
+        needed = np.cumsum(remaining)
+        for i, (left, deadline) in enumerate(zip(remaining, deadlines)):
+            reached = balances >= needed[i]
+            first = np.where(reached.any(axis=0), reached.argmax(axis=0) + 1, HORIZON_MONTHS + 1)
+            expected = 1.0 if left <= 0 else np.mean(first <= deadline)
+            self.assertAlmostEqual(probability[i], expected)
+            if left > 0:
+                self.assertEqual(median_months[i], int(np.ceil(np.median(first))))
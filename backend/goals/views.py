@@ -1,10 +1,16 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import Goal
 from .serializers import GoalSerializer
+from .forecast import DEFAULT_PATHS, forecast_goals
+from finwise_backend.pagination import KeysetPagination
 
 class GoalViewSet(viewsets.ModelViewSet):
     serializer_class = GoalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('deadline', 'id')
 
     def get_queryset(self):
         """
@@ -12,9 +18,23 @@ class GoalViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if hasattr(user, 'role') and user.role == 'admin':
-            return Goal.objects.all().order_by('deadline') # Admins see all
-        return Goal.objects.filter(user=user).order_by('deadline')
+            return Goal.objects.select_related('user').order_by(*self.ordering) # Admins see all
+        return Goal.objects.filter(user=user).select_related('user').order_by(*self.ordering)
 
     def perform_create(self, serializer):
         """Assign the logged-in user when creating a new goal."""
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['get'], url_path='forecast')
+    def forecast(self, request):
+        """
+        Monte Carlo forecast for the user's open goals: the probability of
+        reaching each one by its deadline and the expected completion date.
+        ?paths= sets the number of simulated paths (1000 to 20000, fewer for
+        users with many goals).
+        """
+        try:
+            n_paths = int(request.query_params.get('paths', DEFAULT_PATHS))
+        except ValueError:
+            n_paths = DEFAULT_PATHS
+        return Response(forecast_goals(request.user, n_paths=n_paths))
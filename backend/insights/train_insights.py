@@ -16,10 +16,14 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finwise_backend.settings')
 django.setup()
 
 from insights.utils import build_monthly_agg_for_user
-from transactions.models import Transaction
+from ai_engine.predictions import monthly_series
+from ai_engine.ai_utils.incremental import FeatureCache, current_data_versions, extend_forest
 
 User = get_user_model()
 
+GLOBAL_MONTHS_BACK = 36
+USER_MONTHS_BACK = 24
+
 MODELS_DIR = os.path.join(BASE_DIR, 'insights_models')
 os.makedirs(MODELS_DIR, exist_ok=True)
 
@@ -41,10 +45,13 @@ def create_features_from_series(series_values, window=3):
         y.append(vals[i])
     return np.array(X), np.array(y)
 
-def train_user_model(user, min_months=12, window=3):
-    df = build_monthly_agg_for_user(user, months_back=24)
-    # We'll predict 'expense' next month
-    expenses = df['expense'].values
+def train_user_model(user, min_months=12, window=3, expenses=None):
+    """ `user` can be a User or, when `expenses` is given, just a user id. """
+    user_id = getattr(user, 'id', user)
+    if expenses is None:
+        df = build_monthly_agg_for_user(user, months_back=USER_MONTHS_BACK)
+        # We'll predict 'expense' next month
+        expenses = df['expense'].values
     if np.count_nonzero(expenses) == 0:
         return False  # nothing to learn
     if len(expenses) < min_months:
@@ -57,18 +64,24 @@ def train_user_model(user, min_months=12, window=3):
     model.fit(X_train, y_train)
     score = model.score(X_test, y_test)
     # Save model
-    model_path = os.path.join(MODELS_DIR, f'user_{user.id}_rf.pkl')
+    model_path = os.path.join(MODELS_DIR, f'user_{user_id}_rf.pkl')
     joblib.dump({'model': model, 'window': window, 'score': score}, model_path)
-    print(f"Saved model for user {user.username} -> {model_path} (R2: {score:.3f})")
+    print(f"Saved model for user {user} -> {model_path} (R2: {score:.3f})")
     return True
 
-def train_global_model(window=3):
-    # Build dataset by stacking users' series where possible
+def expense_series(user_ids, months_back=GLOBAL_MONTHS_BACK, chunk_size=5000):
+    """ {user_id: monthly expense ndarray} from the rollups, a chunk of users per query. """
+    user_ids = list(user_ids)
+    out = {}
+    for i in range(0, len(user_ids), chunk_size):
+        _, series = monthly_series(user_ids[i:i + chunk_size], months_back, by_category=False)
+        out.update(series.get(None, {}))
+    return out
+
+def _stack_features(expense_rows, window):
     X_all = []
     y_all = []
-    for user in User.objects.all():
-        df = build_monthly_agg_for_user(user, months_back=36)
-        expenses = df['expense'].values
+    for expenses in expense_rows:
         if len(expenses) < window + 6:
             continue
         X, y = create_features_from_series(expenses, window=window)
@@ -76,30 +89,82 @@ def train_global_model(window=3):
             X_all.append(X)
             y_all.append(y)
     if not X_all:
+        return None, None
+    return np.vstack(X_all), np.concatenate(y_all)
+
+def train_global_model(window=3, expense_rows=None, new_rows=None):
+    """
+    Trains the global model on every user's series. With `new_rows` (the
+    series of users whose data changed) the saved model is warm-started with
+    extra trees on those rows instead, when possible.
+    """
+    model_path = os.path.join(MODELS_DIR, 'global_rf.pkl')
+    if expense_rows is None:
+        # Build dataset by stacking users' series where possible
+        expense_rows = (build_monthly_agg_for_user(u, months_back=GLOBAL_MONTHS_BACK)['expense'].values
+                        for u in User.objects.all())
+
+    if new_rows is not None and os.path.exists(model_path):
+        X_new, y_new = _stack_features(new_rows, window)
+        if X_new is None:
+            print("No new data for global model; keeping saved model")
+            return True
+        pkg = joblib.load(model_path)
+        model = pkg['model']
+        if pkg.get('window', 3) == window and len(X_new) >= 10:
+            X_train, X_test, y_train, y_test = train_test_split(X_new, y_new, test_size=0.2, random_state=42)
+            if extend_forest(model, X_train, y_train):
+                score = model.score(X_test, y_test)
+                joblib.dump({'model': model, 'window': window, 'score': score}, model_path)
+                print(f"Warm-started global model -> {model_path} ({model.n_estimators} trees, R2: {score:.3f})")
+                return True
+
+    X_all, y_all = _stack_features(expense_rows, window)
+    if X_all is None:
         print("Not enough data for global model")
         return False
-    X_all = np.vstack(X_all)
-    y_all = np.concatenate(y_all)
     model = RandomForestRegressor(n_estimators=200, random_state=42)
     X_train, X_test, y_train, y_test = train_test_split(X_all, y_all, test_size=0.2, random_state=42)
     model.fit(X_train, y_train)
     score = model.score(X_test, y_test)
-    model_path = os.path.join(MODELS_DIR, 'global_rf.pkl')
     joblib.dump({'model': model, 'window': window, 'score': score}, model_path)
     print(f"Saved global model -> {model_path} (R2: {score:.3f})")
     return True
 
-def main():
-    users = User.objects.all()
-    print(f"Training models for {users.count()} users...")
+def main(incremental=False):
+    start = (pd.Timestamp.today().to_period('M').to_timestamp() - pd.DateOffset(months=GLOBAL_MONTHS_BACK - 1)).date()
+    cache = FeatureCache(os.path.join(MODELS_DIR, 'feature_cache.pkl'),
+                         key={'months_back': GLOBAL_MONTHS_BACK, 'start': start})
+    versions = current_data_versions()
+
+    # Only users whose series changed since the last run need work
+    if incremental and cache.valid:
+        stale = cache.stale_user_ids(versions)
+    else:
+        cache.users = {}
+        stale = list(versions)
+    series = expense_series(stale)
+    changed = cache.update({uid: {'expense': row} for uid, row in series.items()}, versions, stale)
+    print(f"Training models for {len(changed)} users with changed data...")
+
     trained = 0
-    for user in users:
-        ok = train_user_model(user)
+    for user_id in changed:
+        row = cache.users[user_id]['series'].get('expense')
+        if row is None:
+            continue
+        ok = train_user_model(user_id, expenses=row[-USER_MONTHS_BACK:])
         if ok:
             trained += 1
     print(f"Trained {trained} user models")
+
     # always train global model
-    train_global_model()
+    all_rows = cache.matrices().get('expense', [])
+    if incremental and cache.valid:
+        new_rows = cache.matrices(changed).get('expense', []) if changed else []
+        train_global_model(expense_rows=all_rows, new_rows=new_rows)
+    else:
+        train_global_model(expense_rows=all_rows)
+    cache.save()
 
 if __name__ == "__main__":
-    main()
+    main(incremental='--incremental' in sys.argv)
@@ -1,54 +1,71 @@
 # backend/insights/utils.py
+import os
 import pandas as pd
 from datetime import date
-from decimal import Decimal
+from django.conf import settings
 from django.db.models import Sum
-from transactions.models import Transaction
+from transactions.models import MonthlyRollup
+from ai_engine.ai_utils.model_registry import get_model_registry, directory_version
+
+# Define path to saved models
+MODELS_DIR = os.path.join(settings.BASE_DIR, 'insights_models')
+
+def user_model_path(user_id):
+    return os.path.join(MODELS_DIR, f'user_{user_id}_rf.pkl')
+
+def global_model_path():
+    return os.path.join(MODELS_DIR, 'global_rf.pkl')
+
+def load_model_for_user(user):
+    """Loads the user-specific model, falling back to the global model."""
+    registry = get_model_registry()
+    pkg = registry.get(user_model_path(user.id))
+    if pkg is not None:
+        return pkg, 'user'
+    pkg = registry.get(global_model_path())
+    if pkg is not None:
+        return pkg, 'global'
+    return None, None
+
+def insights_model_version():
+    """
+    Changes whenever any insights model is retrained. Only the model files
+    count, not the training feature cache kept next to them.
+    """
+    return directory_version(MODELS_DIR, suffix='_rf.pkl')
 
 def build_monthly_agg_for_user(user, months_back=6):
     """
     Returns a pandas DataFrame with columns: ['month','income','expense']
     month is a datetime.date (first day of month)
     """
-    # Query user's transactions for the last `months_back` months
+    # Go back months_back months from the start of the current month
     today = date.today()
-    start_year = today.year
-    start_month = today.month
-    # Naive start date calculation: go back months_back months
-    # For simplicity use year-month arithmetic
     start = pd.Timestamp(today.year, today.month, 1) - pd.DateOffset(months=months_back-1)
     start_date = start.date()
 
-    qs = Transaction.objects.filter(user=user, date__gte=start_date).order_by('date')
-
-    # Build DataFrame from queryset
-    rows = []
-    for t in qs:
-        rows.append({
-            'date': pd.to_datetime(t.date),
-            'amount': float(t.amount),
-            'type': t.type,
-            'category': t.category,
-        })
-    if not rows:
-        # Return empty df with months back zeros
-        months = pd.date_range(start=start, periods=months_back, freq='MS')
-        df = pd.DataFrame({'month': months, 'income': 0.0, 'expense': 0.0})
-        df['month'] = df['month'].dt.date
-        return df
-
-    df = pd.DataFrame(rows)
-    df['month'] = df['date'].dt.to_period('M').dt.to_timestamp()
-    # Sum incomes and expenses per month
-    income = df[df['type'] == 'income'].groupby('month')['amount'].sum()
-    expense = df[df['type'] == 'expense'].groupby('month')['amount'].sum()
+    # Monthly totals per type come straight from the rollup table
+    totals = MonthlyRollup.objects.filter(user=user, month__gte=start_date) \
+        .values_list('month', 'type') \
+        .annotate(total=Sum('total')) \
+        .order_by()
+    by_month = {}
+    for month, type_, total in totals:
+        by_month.setdefault(month, {})[type_] = float(total)
+    return monthly_agg_frame(by_month, months_back)
 
+def monthly_agg_frame(by_month, months_back=6):
+    """
+    Builds the ['month','income','expense'] frame for the last months_back
+    months from {month: {'income': float, 'expense': float}}. Missing months
+    are zero and months outside the window are ignored.
+    """
+    today = date.today()
+    start = pd.Timestamp(today.year, today.month, 1) - pd.DateOffset(months=months_back-1)
     months = pd.date_range(start=start, periods=months_back, freq='MS')
     out = []
     for m in months:
         m_date = m.date()
-        inc = float(income.get(m, 0.0)) if m in income.index else 0.0
-        exp = float(expense.get(m, 0.0)) if m in expense.index else 0.0
-        out.append({'month': m_date, 'income': inc, 'expense': exp})
-    result_df = pd.DataFrame(out)
-    return result_df
+        row = by_month.get(m_date, {})
+        out.append({'month': m_date, 'income': row.get('income', 0.0), 'expense': row.get('expense', 0.0)})
+    return pd.DataFrame(out)
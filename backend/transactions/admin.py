@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Transaction
+from .models import Transaction, MonthlyRollup
 
 # This will add the Transaction model
-admin.site.register(Transaction)
\ No newline at end of file
+admin.site.register(Transaction)
+admin.site.register(MonthlyRollup)
@@ -0,0 +1,74 @@
+# backend/transactions/bulk.py
+"""
+Writing many transactions at once (bulk API, imports).
+
+bulk_create skips the per-row save signals, so the rollup changes for all
+rows are accumulated and applied once, in the same database transaction as
+the INSERTs.
+"""
+from django.db import transaction
+from rest_framework import serializers
+
+from .categorization import needs_category, enqueue_on_commit
+from .models import Transaction
+from .rollups import new_deltas, add_delta, rollup_key, apply_rollup_deltas, transactions_changed
+from .serializers import TransactionSerializer
+
+BULK_MAX_ROWS = 10000
+BULK_BATCH_SIZE = 1000
+
+
+def validate_rows(rows, serializer_class=TransactionSerializer):
+    """
+    Validates every row with one serializer instance.
+    Returns (valid, errors): valid is a list of (index, validated_data) and
+    errors a list of {'index': i, 'errors': {...}} for the rows that failed.
+    """
+    child = serializer_class()
+    valid, errors = [], []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': i, 'errors': {'non_field_errors': ['Expected an object.']}})
+            continue
+        try:
+            valid.append((i, child.run_validation(row)))
+        except serializers.ValidationError as e:
+            errors.append({'index': i, 'errors': e.detail})
+    return valid, errors
+
+
+def insert_transactions(objs, batch_size=BULK_BATCH_SIZE, categorize=True):
+    """
+    bulk_creates unsaved Transaction objects in batches inside one database
+    transaction and applies their rollup changes once. Rows without a
+    category are queued for auto-categorization unless `categorize` is
+    False. Returns the objects.
+    """
+    deltas = new_deltas()
+    with transaction.atomic():
+        for i in range(0, len(objs), batch_size):
+            batch = objs[i:i + batch_size]
+            Transaction.objects.bulk_create(batch)
+            for obj in batch:
+                add_delta(deltas, rollup_key(obj.user_id, obj.date, obj.type, obj.category), obj.amount, 1)
+        if deltas:
+            apply_rollup_deltas(deltas)
+            transactions_changed.send(sender=Transaction, changes=[
+                (obj.user_id, obj.date, obj.type, obj.category, obj.amount) for obj in objs
+            ])
+        if categorize:
+            enqueue_on_commit(obj.pk for obj in objs if needs_category(obj.category))
+    return objs
+
+
+def bulk_create_transactions(user, rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Validates `rows` (a list of transaction dicts) and writes the valid ones
+    for `user`. Invalid rows are reported, not fatal.
+    Returns (created objects, errors).
+    """
+    valid, errors = validate_rows(rows)
+    objs = [Transaction(user=user, **data) for _, data in valid]
+    if objs:
+        insert_transactions(objs, batch_size=batch_size)
+    return objs, errors
@@ -0,0 +1,159 @@
+# backend/transactions/categorization.py
+"""
+Background auto-categorization of saved transactions.
+
+Transactions saved without a category (blank or 'Uncategorized') are put on
+an in-process queue once their database transaction commits. A daemon
+worker thread drains the queue in micro-batches: one predict_batch call per
+batch, then one bulk_update plus the matching rollup moves. The request
+that saved the row never waits for the model.
+
+A row the model is unsure about is filed as 'Uncategorized', which marks
+it as attempted. The queue lives in memory, so ids still queued when the
+process exits are lost; `manage.py categorize_transactions` sweeps up the
+rows still blank (and retries 'Uncategorized' ones only when asked).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.db import close_old_connections, transaction
+
+from .models import Transaction
+from .rollups import new_deltas, add_delta, rollup_key, apply_rollup_deltas, transactions_changed
+
+logger = logging.getLogger(__name__)
+
+UNCATEGORIZED = 'Uncategorized'
+NEEDS_CATEGORY = ('', UNCATEGORIZED)
+# Predictions below this are filed as UNCATEGORIZED rather than guessed
+MIN_CONFIDENCE = 0.4
+BATCH_SIZE = 256
+# How long the worker waits for a batch to fill before running a partial one
+MAX_WAIT = 0.2
+
+CATEGORY_MAX = Transaction._meta.get_field('category').max_length
+
+
+def needs_category(category):
+    return (category or '').strip() in NEEDS_CATEGORY
+
+
+def resolve_category(result):
+    """ The category to store for one predict_batch result. """
+    if result['category'] and result['confidence'] >= MIN_CONFIDENCE:
+        return result['category'][:CATEGORY_MAX]
+    return UNCATEGORIZED
+
+
+def categorize_transactions(ids):
+    """
+    Categorizes the given transactions that still need a category.
+    Rows are re-checked under a row lock before writing, so a category the
+    user set in the meantime is never overwritten. Returns the number of
+    rows changed.
+    """
+    from ai_engine.ai_utils.transaction_categorizer import predict_batch
+
+    pending = list(Transaction.objects.filter(pk__in=ids, category__in=NEEDS_CATEGORY)
+                   .values_list('pk', 'title'))
+    if not pending:
+        return 0
+    results = predict_batch([title for _, title in pending], top_k=1)
+    predicted = {pk: resolve_category(result) for (pk, _), result in zip(pending, results)}
+
+    with transaction.atomic():
+        txns = Transaction.objects.select_for_update() \
+            .filter(pk__in=predicted, category__in=NEEDS_CATEGORY) \
+            .only('pk', 'user_id', 'date', 'type', 'amount', 'category')
+        deltas = new_deltas()
+        changes = []
+        changed = []
+        for txn in txns:
+            category = predicted[txn.pk]
+            if category == txn.category:
+                continue
+            # Move the amount between rollup rows, as the save signal would
+            add_delta(deltas, rollup_key(txn.user_id, txn.date, txn.type, txn.category), -txn.amount, -1)
+            add_delta(deltas, rollup_key(txn.user_id, txn.date, txn.type, category), txn.amount, 1)
+            changes.append((txn.user_id, txn.date, txn.type, txn.category, -txn.amount))
+            changes.append((txn.user_id, txn.date, txn.type, category, txn.amount))
+            txn.category = category
+            changed.append(txn)
+        if changed:
+            Transaction.objects.bulk_update(changed, ['category'], batch_size=BATCH_SIZE)
+            apply_rollup_deltas(deltas)
+            transactions_changed.send(sender=Transaction, changes=changes)
+    return len(changed)
+
+
+class CategorizationQueue:
+    """
+    In-process queue of transaction ids with one lazily started worker
+    thread (restarted after a fork, so each server worker has its own).
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, max_wait=MAX_WAIT):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def enqueue(self, ids):
+        self._ensure_worker()
+        for pk in ids:
+            self._queue.put(pk)
+
+    def join(self):
+        """ Blocks until everything queued so far has been processed. """
+        self._queue.join()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked: the parent's queue and thread don't carry over
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='categorization-worker', daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                categorize_transactions(batch)
+            except Exception:
+                logger.exception("Auto-categorization failed for %d transactions", len(batch))
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self._queue.task_done()
+
+
+categorization_queue = CategorizationQueue()
+
+
+def enqueue_on_commit(ids):
+    """ Queues the ids once the surrounding database transaction commits. """
+    ids = list(ids)
+    if ids:
+        transaction.on_commit(lambda: categorization_queue.enqueue(ids))
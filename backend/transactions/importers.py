@@ -0,0 +1,268 @@
+# backend/transactions/importers.py
+"""
+Streaming bank-statement import (CSV and OFX/QFX).
+
+The parsers read the upload incrementally and yield one row at a time, so
+memory stays bounded by the chunk size, not the file size. import_statement
+groups rows into chunks; each chunk gets one vectorized categorizer call
+for the rows without a category, then one bulk insert (with its rollup
+changes applied once) in its own database transaction. It yields a progress
+dict after every chunk.
+"""
+import codecs
+import csv
+import io
+import logging
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from .bulk import insert_transactions
+from .categorization import needs_category, resolve_category
+from .models import Transaction
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 2000
+MAX_ERRORS_REPORTED = 100
+
+TITLE_MAX = Transaction._meta.get_field('title').max_length
+CATEGORY_MAX = Transaction._meta.get_field('category').max_length
+_amount_field = Transaction._meta.get_field('amount')
+# Largest amount the column holds (8 integer digits for max_digits=10, decimal_places=2)
+AMOUNT_LIMIT = Decimal(10) ** (_amount_field.max_digits - _amount_field.decimal_places)
+CENT = Decimal('0.01')
+
+DATE_FORMATS = ['%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d', '%d %b %Y']
+
+# Accepted CSV header names (lowercased) for each field
+CSV_COLUMNS = {
+    'date': ['date', 'transaction date', 'posted date', 'value date', 'txn date'],
+    'title': ['description', 'title', 'narration', 'details', 'payee', 'name', 'memo'],
+    'amount': ['amount', 'transaction amount'],
+    'debit': ['debit', 'withdrawal', 'withdrawal amount', 'debit amount'],
+    'credit': ['credit', 'deposit', 'deposit amount', 'credit amount'],
+    'type': ['type'],
+    'category': ['category'],
+}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def parse_date(value):
+    value = value.strip()
+    try:
+        # Fast path for ISO dates, the common case
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"Unrecognised date {value!r}.")
+
+
+def parse_amount(value):
+    value = (value or '').strip().replace(',', '')
+    if not value:
+        return None
+    # Some banks write negatives as (12.50)
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ImportRowError(f"Invalid amount {value!r}.")
+    # NaN and Infinity parse fine but can't be compared or stored
+    if not amount.is_finite():
+        raise ImportRowError(f"Invalid amount {value!r}.")
+    if abs(amount) >= AMOUNT_LIMIT or abs(amount).quantize(CENT) >= AMOUNT_LIMIT:
+        raise ImportRowError(f"Amount {value!r} is too large.")
+    return amount
+
+
+def make_row(date, title, signed_amount, type_=None, category=''):
+    """
+    Builds a clean row dict. The sign of the amount decides the type unless
+    the statement gives it; stored amounts are always positive.
+    """
+    if signed_amount is None or abs(signed_amount).quantize(CENT) == 0:
+        raise ImportRowError("Missing or zero amount.")
+    if type_:
+        type_ = type_.strip().lower()
+        type_ = {'debit': 'expense', 'credit': 'income'}.get(type_, type_)
+        if type_ not in ('income', 'expense'):
+            raise ImportRowError(f"Unknown type {type_!r}.")
+    else:
+        type_ = 'expense' if signed_amount < 0 else 'income'
+    title = ' '.join((title or '').split())[:TITLE_MAX] or 'Imported transaction'
+    return {
+        'date': date,
+        'title': title,
+        'amount': abs(signed_amount).quantize(CENT),
+        'type': type_,
+        'category': (category or '').strip()[:CATEGORY_MAX],
+    }
+
+
+def _text_stream(fileobj):
+    """ Text view over a binary upload, decoded incrementally (BOM-aware). """
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def iter_csv_rows(fileobj):
+    """ Yields (line_number, row dict or ImportRowError) from a CSV statement. """
+    reader = csv.reader(_text_stream(fileobj))
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [h.strip().lower() for h in header]
+    cols = {}
+    for field, names in CSV_COLUMNS.items():
+        for name in names:
+            if name in header:
+                cols[field] = header.index(name)
+                break
+    if 'date' not in cols or not ({'amount', 'debit', 'credit'} & cols.keys()):
+        raise ImportRowError("CSV needs a date column and an amount (or debit/credit) column.")
+
+    def get(row, field):
+        i = cols.get(field)
+        return row[i] if i is not None and i < len(row) else ''
+
+    for line_no, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            if 'amount' in cols:
+                amount = parse_amount(get(row, 'amount'))
+            else:
+                debit = parse_amount(get(row, 'debit'))
+                credit = parse_amount(get(row, 'credit'))
+                amount = -abs(debit) if debit else credit
+            yield line_no, make_row(
+                parse_date(get(row, 'date')), get(row, 'title'), amount,
+                type_=get(row, 'type') or None, category=get(row, 'category'),
+            )
+        except ImportRowError as e:
+            yield line_no, e
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def iter_ofx_rows(fileobj, read_size=64 * 1024):
+    """
+    Yields (transaction_number, row dict or ImportRowError) from an OFX/QFX
+    statement. Handles both SGML (unclosed leaf tags) and XML OFX, reading
+    the file in fixed-size blocks.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    current = None
+    n = 0
+
+    def finish(fields):
+        date = fields.get('DTPOSTED', '')[:8]
+        try:
+            return make_row(
+                datetime.strptime(date, '%Y%m%d').date() if date else parse_date(''),
+                fields.get('NAME') or fields.get('MEMO') or fields.get('PAYEE'),
+                parse_amount(fields.get('TRNAMT')),
+            )
+        except (ImportRowError, ValueError) as e:
+            return e if isinstance(e, ImportRowError) else ImportRowError(str(e))
+
+    while True:
+        block = fileobj.read(read_size)
+        if isinstance(block, bytes):
+            block = decoder.decode(block, final=not block)
+        buffer += block
+        # Only parse up to the last complete tag; keep the rest for the next block
+        cut = len(buffer) if not block else buffer.rfind('<')
+        for closing, tag, text in OFX_TAG.findall(buffer[:cut]):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    n += 1
+                    yield n, finish(current)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = text.strip()
+        buffer = buffer[cut:]
+        if not block:
+            break
+    if current is not None:
+        n += 1
+        yield n, finish(current)
+
+
+PARSERS = {'csv': iter_csv_rows, 'ofx': iter_ofx_rows, 'qfx': iter_ofx_rows}
+
+
+def _categorize(rows):
+    """ Fills in missing categories with one batch call to the categorizer. """
+    from ai_engine.ai_utils.transaction_categorizer import predict_batch
+
+    missing = [row for row in rows if needs_category(row['category'])]
+    if not missing:
+        return
+    results = predict_batch([row['title'] for row in missing], top_k=1)
+    for row, result in zip(missing, results):
+        row['category'] = resolve_category(result)
+
+
+def import_statement(user, fileobj, file_type, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Imports a statement for `user`, one chunk at a time. Yields a progress
+    dict after every chunk and a final summary with 'done': True.
+    Each chunk is committed on its own, so a failure part-way keeps the
+    chunks already imported.
+    """
+    started = time.perf_counter()
+    parse = PARSERS[file_type]
+    totals = {'rows': 0, 'created': 0, 'failed': 0}
+    errors = []
+
+    def flush(chunk):
+        _categorize(chunk)
+        # Already categorized above, so nothing goes to the background queue
+        insert_transactions([Transaction(user=user, **row) for row in chunk], categorize=False)
+        totals['created'] += len(chunk)
+
+    chunk = []
+    try:
+        for ref, row in parse(fileobj):
+            totals['rows'] += 1
+            if isinstance(row, ImportRowError):
+                totals['failed'] += 1
+                if len(errors) < MAX_ERRORS_REPORTED:
+                    errors.append({'line': ref, 'error': str(row)})
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+                yield dict(totals, seconds=round(time.perf_counter() - started, 2))
+        if chunk:
+            flush(chunk)
+    except ImportRowError as e:
+        # The file as a whole is unreadable (e.g. no usable CSV header)
+        yield dict(totals, done=True, error=str(e), errors=errors)
+        return
+    except Exception:
+        # The response is already streaming, so end it with a summary line
+        # rather than cutting it off; the chunks committed so far are kept
+        logger.exception("Statement import failed for user %s", user.pk)
+        yield dict(totals, done=True, error="Import stopped by an unexpected error.", errors=errors)
+        return
+    yield dict(totals, done=True, errors=errors, seconds=round(time.perf_counter() - started, 2))
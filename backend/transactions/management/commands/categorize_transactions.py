@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from transactions.categorization import BATCH_SIZE, NEEDS_CATEGORY, categorize_transactions
+from transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = ("Auto-categorizes transactions left blank, in batches. Rows already filed as 'Uncategorized' "
+            "(the model was unsure) are only retried with --retry-uncategorized, e.g. after retraining.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--retry-uncategorized', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        categories = NEEDS_CATEGORY if options['retry_uncategorized'] else ('',)
+        ids = Transaction.objects.filter(category__in=categories).order_by('pk').values_list('pk', flat=True)
+        changed = seen = 0
+        last = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last)[:batch_size])
+            if not batch:
+                break
+            changed += categorize_transactions(batch)
+            seen += len(batch)
+            last = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f"Categorized {changed} of {seen} transactions."))
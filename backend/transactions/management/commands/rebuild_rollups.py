@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from transactions.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the MonthlyRollup table from the raw Transaction table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Only rebuild this user id (can be repeated).")
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows."))
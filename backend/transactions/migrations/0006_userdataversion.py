@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_versions(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    UserDataVersion = apps.get_model('transactions', 'UserDataVersion')
+    user_ids = Transaction.objects.values_list('user_id', flat=True).distinct().order_by()
+    UserDataVersion.objects.bulk_create((UserDataVersion(user_id=uid, version=1) for uid in user_ids.iterator()), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_monthlyrollup'),
+        ('users', '0002_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(backfill_versions, migrations.RunPython.noop),
+    ]
@@ -8,14 +8,65 @@ class Transaction(models.Model):
         ('expense', 'Expense'),
     )
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=True)
+    # No single-column indexes: the composite ones below lead with user
+    # (or date), and type alone is too coarse to be worth an index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    type = models.CharField(max_length=10, choices=TRANSACTION_TYPE, db_index=True)
+    type = models.CharField(max_length=10, choices=TRANSACTION_TYPE)
     category = models.CharField(max_length=50)
 
     # Allow users to set transaction date; default to today
-    date = models.DateField(default=timezone.now, db_index=True)
+    date = models.DateField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Per-user date-range reads by type (analytics, rollup rebuilds).
+            # The included columns let Postgres answer them from the index alone.
+            models.Index(fields=['user', 'type', 'date'], include=['amount', 'category'], name='txn_user_type_date'),
+            # Per-user totals grouped by category
+            models.Index(fields=['user', 'type', 'category'], include=['amount'], name='txn_user_type_cat'),
+            # Keyset pagination of the list API, per user and (for admins) overall
+            models.Index(fields=['user', '-date', '-id'], name='txn_user_date_id'),
+            models.Index(fields=['-date', '-id'], name='txn_date_id'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.amount}"
+
+
+class MonthlyRollup(models.Model):
+    """
+    Per-user monthly totals of transactions, by type and category.
+    Kept exact by the Transaction signals (see transactions/rollups.py), so
+    analytics can read a few rows per month instead of re-aggregating the
+    raw Transaction table.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField() # First day of the month
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE)
+    category = models.CharField(max_length=50)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'type', 'category'], name='uniq_rollup_user_month_type_cat'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.type} {self.category}: {self.total}"
+
+
+class UserDataVersion(models.Model):
+    """
+    Counter bumped every time a user's transactions change. Anything derived
+    from a user's data (stored predictions, caches) can compare against it
+    to tell whether it is still current.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
@@ -0,0 +1,198 @@
+# backend/transactions/rollups.py
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import MonthlyRollup, Transaction, UserDataVersion
+
+ZERO = Decimal('0')
+
+# Sent by every Transaction write path (including the bulk ones that skip the
+# model signals), inside the writing database transaction, with
+# changes=[(user_id, date, type, category, amount), ...]; a removed or moved
+# row appears with a negative amount.
+transactions_changed = Signal()
+
+
+def month_start(value):
+    """ Returns the first day of the month for a date (or datetime/str) value. """
+    d = Transaction._meta.get_field('date').to_python(value)
+    return d.replace(day=1)
+
+
+def next_month_start(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_date_range(start, end):
+    """
+    Splits the inclusive range [start, end] (either bound may be None for
+    open-ended) into the whole months it covers and the partial edges.
+
+    Returns (months, edges): months is (first, stop), meaning rollup months
+    first <= month < stop (either may be None for unbounded), or None when
+    no month is fully covered; edges is a list of (from, to) day ranges to
+    read from the raw rows.
+    """
+    first = None
+    if start is not None:
+        first = start if start.day == 1 else next_month_start(start)
+    stop = None
+    if end is not None:
+        stop = next_month_start(end) if (end + timedelta(days=1)).day == 1 else month_start(end)
+
+    if first is not None and stop is not None and first >= stop:
+        # Within (at most) two partial months: read it all raw
+        return None, [(start, end)]
+
+    edges = []
+    if start is not None and start < first:
+        edges.append((start, first - timedelta(days=1)))
+    if end is not None and end >= stop:
+        edges.append((stop, end))
+    return (first, stop), edges
+
+
+def range_totals(txns, rollups, start=None, end=None, group_by=('type', 'category')):
+    """
+    Sums amounts over [start, end] grouped by `group_by`, reading whole
+    months from the rollups and only the partial edge months from the raw
+    rows. A multi-year range costs about the same as a one-month one.
+
+    `txns` and `rollups` are the Transaction and MonthlyRollup querysets,
+    already scoped the same way (user, type, ...).
+    Returns {tuple of group values: Decimal total}.
+    """
+    group_by = list(group_by)
+    months, edges = split_date_range(start, end)
+    totals = defaultdict(lambda: ZERO)
+
+    if months is not None:
+        first, stop = months
+        if first is not None:
+            rollups = rollups.filter(month__gte=first)
+        if stop is not None:
+            rollups = rollups.filter(month__lt=stop)
+        for row in rollups.values_list(*group_by).annotate(sum=Sum('total')).order_by():
+            totals[row[:-1]] += row[-1] or ZERO
+
+    if edges:
+        in_edges = Q()
+        for edge_start, edge_end in edges:
+            in_edges |= Q(date__gte=edge_start, date__lte=edge_end)
+        for row in txns.filter(in_edges).values_list(*group_by).annotate(sum=Sum('amount')).order_by():
+            totals[row[:-1]] += row[-1] or ZERO
+    return dict(totals)
+
+
+def rollup_key(user_id, date, type, category):
+    return (user_id, month_start(date), type, category)
+
+
+def add_delta(deltas, key, amount, count):
+    """ Accumulates an (amount, count) change for one rollup row into `deltas`. """
+    total, n = deltas[key]
+    deltas[key] = (total + Decimal(str(amount)), n + count)
+
+
+def new_deltas():
+    return defaultdict(lambda: (ZERO, 0))
+
+
+def get_data_version(user_id):
+    """ Returns the current data version for a user (0 if never written). """
+    version = UserDataVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_data_versions(user_ids):
+    """ Marks the given users' data as changed. """
+    now = timezone.now()
+    for user_id in set(user_ids):
+        rows = UserDataVersion.objects.filter(user_id=user_id)
+        if not rows.update(version=F('version') + 1, updated_at=now):
+            try:
+                with transaction.atomic():
+                    UserDataVersion.objects.create(user_id=user_id, version=1, updated_at=now)
+            except IntegrityError:
+                rows.update(version=F('version') + 1, updated_at=now)
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Applies {(user_id, month, type, category): (amount_delta, count_delta)}
+    to MonthlyRollup with F() updates, creating rows as needed and removing
+    rows whose count drops to zero. Bumps the data version of every user
+    touched.
+    """
+    with transaction.atomic():
+        bump_data_versions(user_id for (user_id, _, _, _) in deltas)
+        for (user_id, month, type_, category), (amount, count) in deltas.items():
+            if amount == ZERO and count == 0:
+                continue
+            rows = MonthlyRollup.objects.filter(user_id=user_id, month=month, type=type_, category=category)
+            updated = rows.update(total=F('total') + amount, count=F('count') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        MonthlyRollup.objects.create(
+                            user_id=user_id, month=month, type=type_, category=category,
+                            total=amount, count=count,
+                        )
+                except IntegrityError:
+                    # Another writer created the row first; add on top of it
+                    rows.update(total=F('total') + amount, count=F('count') + count)
+            if count < 0:
+                rows.filter(count__lte=0).delete()
+
+
+def rebuild_rollups(user_ids=None, batch_size=5000):
+    """
+    Recomputes MonthlyRollup from the raw Transaction table, for all users
+    or only the given user ids. Returns the number of rollup rows written.
+    """
+    txns = Transaction.objects.all()
+    rollups = MonthlyRollup.objects.all()
+    if user_ids is not None:
+        txns = txns.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    grouped = txns.annotate(month=TruncMonth('date')) \
+        .values('user_id', 'month', 'type', 'category') \
+        .annotate(total=Sum('amount'), count=Count('id')) \
+        .order_by()
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(MonthlyRollup(**row))
+            if len(batch) >= batch_size:
+                MonthlyRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            MonthlyRollup.objects.bulk_create(batch)
+            written += len(batch)
+
+        if user_ids is None:
+            now = timezone.now()
+            UserDataVersion.objects.update(version=F('version') + 1, updated_at=now)
+            # Users whose rows were written without signals (e.g. bulk loads) get a version too
+            have_version = UserDataVersion.objects.values_list('user_id', flat=True)
+            missing = MonthlyRollup.objects.exclude(user_id__in=have_version) \
+                .values_list('user_id', flat=True).distinct().order_by()
+            UserDataVersion.objects.bulk_create(
+                [UserDataVersion(user_id=uid, version=1, updated_at=now) for uid in missing],
+                batch_size=batch_size,
+            )
+        else:
+            bump_data_versions(user_ids)
+    return written
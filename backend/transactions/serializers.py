@@ -11,6 +11,8 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = ['id', 'user', 'username', 'title', 'amount', 'type', 'category', 'date']
         read_only_fields = ['id', 'user', 'username']
+        # Left blank, the category is filled in by the background categorizer
+        extra_kwargs = {'category': {'required': False, 'allow_blank': True}}
 
     def validate_amount(self, value):
         """
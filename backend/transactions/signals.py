@@ -0,0 +1,52 @@
+# backend/transactions/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Transaction
+from .rollups import new_deltas, add_delta, rollup_key, apply_rollup_deltas, transactions_changed
+from .categorization import needs_category, enqueue_on_commit
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_values(sender, instance, **kwargs):
+    """ Keeps the row as it is in the database, so post_save can move it between rollups. """
+    instance._rollup_old = None
+    if instance.pk:
+        instance._rollup_old = Transaction.objects.filter(pk=instance.pk) \
+            .values_list('user_id', 'date', 'type', 'category', 'amount').first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollups_on_save(sender, instance, created, **kwargs):
+    deltas = new_deltas()
+    changes = []
+    old = getattr(instance, '_rollup_old', None)
+    if old:
+        user_id, date, type_, category, amount = old
+        add_delta(deltas, rollup_key(user_id, date, type_, category), -amount, -1)
+        changes.append((user_id, date, type_, category, -amount))
+    add_delta(deltas, rollup_key(instance.user_id, instance.date, instance.type, instance.category), instance.amount, 1)
+    changes.append((instance.user_id, instance.date, instance.type, instance.category, instance.amount))
+    apply_rollup_deltas(deltas)
+    transactions_changed.send(sender=Transaction, changes=changes)
+
+
+@receiver(post_save, sender=Transaction)
+def queue_auto_categorization(sender, instance, **kwargs):
+    if needs_category(instance.category):
+        enqueue_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    # Cascading from the user (or another model): their rollups, data
+    # version and budget totals are being deleted along with them
+    # (origin is the instance or queryset whose delete() started this)
+    if origin is not None and not isinstance(origin, Transaction) and getattr(origin, 'model', None) is not Transaction:
+        return
+    deltas = new_deltas()
+    add_delta(deltas, rollup_key(instance.user_id, instance.date, instance.type, instance.category), -instance.amount, -1)
+    apply_rollup_deltas(deltas)
+    transactions_changed.send(sender=Transaction, changes=[
+        (instance.user_id, instance.date, instance.type, instance.category, -instance.amount),
+    ])
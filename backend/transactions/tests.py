@@ -1,3 +1,671 @@
+import csv
+import gzip
+import io
+import json
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
 from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from budgets.models import Budget
+from finwise_backend.pagination import KeysetPagination
+from finwise_backend.testing import QueryBudgetTestCase
+from users.models import User
+from .bulk import BULK_MAX_ROWS
+from .categorization import CategorizationQueue, categorize_transactions
+from .importers import ImportRowError, import_statement, iter_csv_rows, iter_ofx_rows
+from .models import Transaction, MonthlyRollup, UserDataVersion
+from .rollups import get_data_version, range_totals, rebuild_rollups, split_date_range
+from .views import TransactionViewSet
 
 # Create your tests here.
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+class TransactionQueryPlanTests(TestCase):
+    """
+    Seeds a large synthetic table and checks with EXPLAIN that the hot
+    analytics and AI queries are served by indexes, not sequential scans.
+    """
+    N_USERS = 200
+    ROWS_PER_USER = 250
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(13)
+        users = User.objects.bulk_create([
+            User(username=f'plan{i}', email=f'plan{i}@example.com') for i in range(cls.N_USERS)
+        ])
+        categories = ['Food', 'Transport', 'Rent', 'Shopping', 'Utilities', 'Fun']
+        today = date.today()
+        rows = [
+            Transaction(
+                user=user, title='seed', amount=rng.randint(1, 500),
+                type='income' if rng.random() < 0.2 else 'expense',
+                category=rng.choice(categories),
+                date=today - timedelta(days=rng.randint(0, 730)),
+            )
+            for user in users for _ in range(cls.ROWS_PER_USER)
+        ]
+        Transaction.objects.bulk_create(rows, batch_size=5000)
+        rebuild_rollups()
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Transaction._meta.db_table}')
+            cursor.execute(f'ANALYZE {MonthlyRollup._meta.db_table}')
+        cls.user = users[len(users) // 2]
+        cls.start = today - timedelta(days=90)
+
+    def assertUsesIndex(self, qs):
+        plan = qs.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+        self.assertIn('Index', plan, plan)
+
+    def test_category_totals_for_date_range(self):
+        # CategorySpendingView with ?start=&end=
+        qs = Transaction.objects.filter(
+            user=self.user, type='expense', date__gte=self.start, date__lte=date.today(),
+        ).values('category').annotate(total=Sum('amount')).order_by('-total')
+        self.assertUsesIndex(qs)
+
+    def test_category_totals_all_time(self):
+        qs = Transaction.objects.filter(user=self.user, type='expense') \
+            .values('category').annotate(total=Sum('amount')).order_by()
+        self.assertUsesIndex(qs)
+
+    def test_monthly_totals_from_rollups(self):
+        # MonthlySpendingView: complete months come from the rollups...
+        qs = MonthlyRollup.objects.filter(user=self.user, month__gte=self.start.replace(day=1),
+                                          month__lt=date.today().replace(day=1)) \
+            .values('month').annotate(
+                income=Sum('total', filter=Q(type='income')),
+                expense=Sum('total', filter=Q(type='expense')),
+            ).order_by('month')
+        self.assertUsesIndex(qs)
+
+    def test_current_month_totals(self):
+        # ...and the current month from the raw rows dated up to today
+        qs = Transaction.objects.filter(user=self.user, date__gte=date.today().replace(day=1),
+                                        date__lte=date.today()) \
+            .values('user').annotate(
+                income=Sum('amount', filter=Q(type='income')),
+                expense=Sum('amount', filter=Q(type='expense')),
+            ).order_by()
+        self.assertUsesIndex(qs)
+
+    def keyset_page(self, qs):
+        # The list API's query for a page after the cursor (see KeysetPagination)
+        paginator = KeysetPagination()
+        paginator.ordering = TransactionViewSet.ordering
+        last = qs.order_by(*paginator.ordering)[self.ROWS_PER_USER // 2]
+        after = paginator.after(Transaction, [getattr(last, f.lstrip('-')) for f in paginator.ordering])
+        return qs.filter(after).order_by(*paginator.ordering)[:paginator.page_size + 1]
+
+    def test_keyset_page(self):
+        self.assertUsesIndex(self.keyset_page(Transaction.objects.filter(user=self.user)))
+
+    def test_admin_keyset_page(self):
+        self.assertUsesIndex(self.keyset_page(Transaction.objects.all()))
+
+    def test_rollup_rebuild_for_one_user(self):
+        # The grouped read behind rebuild_rollups(user_ids=[...])
+        qs = Transaction.objects.filter(user_id__in=[self.user.id]) \
+            .annotate(month=TruncMonth('date')) \
+            .values('user_id', 'month', 'type', 'category').annotate(total=Sum('amount')).order_by()
+        self.assertUsesIndex(qs)
+
+    def test_rollup_reads(self):
+        # Analytics and the spend models read per-user monthly rollups
+        qs = MonthlyRollup.objects.filter(user=self.user, type='expense', month__gte=self.start.replace(day=1)) \
+            .values_list('month', 'category').annotate(total=Sum('total')).order_by()
+        self.assertUsesIndex(qs)
+
+
+class TransactionQueryBudgetTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', password='x', role='admin')
+        self.n_users = 0
+
+    def seed(self, n):
+        # Each row belongs to a different user, so a per-row user lookup shows up
+        for _ in range(n):
+            self.n_users += 1
+            owner = User.objects.create_user(username=f'u{self.n_users}', email=f'u{self.n_users}@example.com')
+            Transaction.objects.create(user=owner, title='t', amount=5, type='expense', category='Food')
+            Transaction.objects.create(user=self.user, title='t', amount=5, type='expense', category='Food')
+
+    def test_list(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, '/api/transactions/', self.seed)
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(1, '/api/transactions/', self.seed)
+
+
+class TransactionBulkCreateTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulk', email='bulk@example.com', password='x')
+        self.client.force_authenticate(self.user)
+
+    def rollups(self):
+        return set(MonthlyRollup.objects.filter(user=self.user, count__gt=0)
+                   .values_list('month', 'type', 'category', 'total', 'count'))
+
+    def test_valid_rows_written_and_errors_by_index(self):
+        rows = [
+            {'title': 'Lunch', 'amount': '12.50', 'type': 'expense', 'category': 'Food', 'date': '2026-01-05'},
+            {'title': 'Bad', 'amount': 'abc', 'type': 'expense', 'category': 'Food', 'date': '2026-01-05'},
+            {'title': 'Pay', 'amount': '1000', 'type': 'income', 'category': 'Salary', 'date': '2026-01-31'},
+            'not an object',
+            {'title': 'Bus', 'amount': '3', 'type': 'transfer', 'category': 'Transport', 'date': '2026-02-01'},
+            {'title': 'Dinner', 'amount': '30', 'type': 'expense', 'category': 'Food', 'date': '2026-02-03'},
+        ]
+        response = self.client.post('/api/transactions/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 3, 4])
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertIn('type', response.data['errors'][2]['errors'])
+        self.assertEqual(
+            sorted(Transaction.objects.filter(user=self.user).values_list('title', flat=True)),
+            ['Dinner', 'Lunch', 'Pay'],
+        )
+        self.assertCountEqual(response.data['ids'], Transaction.objects.values_list('pk', flat=True))
+
+    def test_all_rows_invalid(self):
+        response = self.client.post('/api/transactions/bulk/', [{'title': 'x'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rejects_non_list(self):
+        response = self.client.post('/api/transactions/bulk/', {'title': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.data)
+
+    def test_rejects_too_many_rows(self):
+        row = {'title': 'x', 'amount': '1', 'type': 'expense', 'category': 'Food', 'date': '2026-01-01'}
+        response = self.client.post('/api/transactions/bulk/', [row] * (BULK_MAX_ROWS + 1), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rollups_and_data_version(self):
+        Transaction.objects.create(user=self.user, title='Rent', amount=800, type='expense',
+                                   category='Rent', date=date(2026, 1, 1))
+        version = get_data_version(self.user.id)
+        rows = [
+            {'title': f'Row {i}', 'amount': str(i + 1), 'type': 'expense' if i % 3 else 'income',
+             'category': ['Food', 'Rent', 'Salary'][i % 3], 'date': f'2026-{i % 4 + 1:02d}-{i % 28 + 1:02d}'}
+            for i in range(40)
+        ]
+        response = self.client.post('/api/transactions/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(get_data_version(self.user.id), version)
+
+        # The rollups bulk_create kept up to date must match a rebuild from the raw rows
+        maintained = self.rollups()
+        rebuild_rollups(user_ids=[self.user.id])
+        self.assertEqual(maintained, self.rollups())
+        self.assertEqual(sum(count for *_, count in maintained), 41)
+
+
+def fake_predict_batch(descriptions, top_k=3):
+    """ Stands in for the categorizer: coffee is confidently Food, anything else is a guess. """
+    return [
+        {'category': 'Food', 'confidence': 0.9} if 'coffee' in d.lower() else {'category': 'Fun', 'confidence': 0.1}
+        for d in descriptions
+    ]
+
+
+class StatementParserTests(TestCase):
+
+    def csv_rows(self, text):
+        return list(iter_csv_rows(io.BytesIO(text.encode())))
+
+    def test_csv_amount_column(self):
+        rows = self.csv_rows(
+            "\ufeffDate,Description,Amount,Category\n"
+            "2026-01-05,Coffee  shop,(12.50),\n"
+            "31/01/2026,Salary,\"1,000.00\",Salary\n"
+            "\n"
+            "2026-02-01,Refund,0.00,\n"
+        )
+        self.assertEqual([line for line, _ in rows], [2, 3, 5])
+        self.assertEqual(rows[0][1], {'date': date(2026, 1, 5), 'title': 'Coffee shop', 'amount': Decimal('12.50'),
+                                      'type': 'expense', 'category': ''})
+        self.assertEqual(rows[1][1]['date'], date(2026, 1, 31))
+        self.assertEqual(rows[1][1]['amount'], Decimal('1000.00'))
+        self.assertEqual(rows[1][1]['type'], 'income')
+        self.assertIsInstance(rows[2][1], ImportRowError)
+
+    def test_csv_debit_and_credit_columns(self):
+        rows = self.csv_rows(
+            "Txn Date,Narration,Withdrawal,Deposit\n"
+            "2026-03-02,ATM,200,\n"
+            "2026-03-03,Interest,,4.10\n"
+        )
+        self.assertEqual([(r['type'], r['amount']) for _, r in rows],
+                         [('expense', Decimal('200.00')), ('income', Decimal('4.10'))])
+
+    def test_csv_bad_rows(self):
+        rows = self.csv_rows(
+            "date,amount,title\n"
+            "2026-13-45,5,Bad date\n"
+            "2026-01-01,NaN,Not a number\n"
+            "2026-01-01,-Infinity,Infinite\n"
+            "2026-01-01,123456789,Too large\n"
+            "2026-01-01,99999999.995,Rounds too large\n"
+            "2026-01-01,99999999.99,Largest\n"
+        )
+        self.assertEqual([isinstance(r, ImportRowError) for _, r in rows], [True] * 5 + [False])
+        self.assertIn('too large', str(rows[3][1]))
+
+    def test_csv_bad_header(self):
+        with self.assertRaises(ImportRowError):
+            self.csv_rows("when,what,how much\n2026-01-01,x,5\n")
+
+    def test_ofx_split_across_read_blocks(self):
+        sgml = (
+            "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKTRANLIST>"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105120000<TRNAMT>-42.10<NAME>Grocery store</STMTTRN>"
+            "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260131<TRNAMT>1500.00<MEMO>Payroll</STMTTRN>"
+            "<STMTTRN><DTPOSTED>20260201<TRNAMT>abc<NAME>Broken</STMTTRN>"
+            "</BANKTRANLIST></OFX>"
+        )
+        xml = sgml.replace('<TRNTYPE>DEBIT', '<TRNTYPE>DEBIT</TRNTYPE>').replace('<NAME>Grocery store', '<NAME>Grocery store</NAME>')
+        for text in (sgml, xml):
+            for read_size in (5, 64 * 1024):
+                rows = list(iter_ofx_rows(io.BytesIO(text.encode()), read_size=read_size))
+                self.assertEqual([n for n, _ in rows], [1, 2, 3])
+                self.assertEqual(rows[0][1]['title'], 'Grocery store')
+                self.assertEqual((rows[0][1]['date'], rows[0][1]['amount'], rows[0][1]['type']),
+                                 (date(2026, 1, 5), Decimal('42.10'), 'expense'))
+                self.assertEqual((rows[1][1]['title'], rows[1][1]['type']), ('Payroll', 'income'))
+                self.assertIsInstance(rows[2][1], ImportRowError)
+
+
+@mock.patch('ai_engine.ai_utils.transaction_categorizer.predict_batch', fake_predict_batch)
+class ImportStatementTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', email='importer@example.com', password='x')
+
+    def test_chunks_committed_with_progress(self):
+        text = "date,description,amount,category\n" + "".join(
+            f"2026-01-{day:02d},{'Coffee' if day % 2 else 'Gadget'},-{day},\n" for day in range(1, 6)
+        ) + "2026-01-06,Bad,,\n"
+        lines = list(import_statement(self.user, io.BytesIO(text.encode()), 'csv', chunk_size=2))
+
+        self.assertEqual([(l['rows'], l['created'], l['failed']) for l in lines],
+                         [(2, 2, 0), (4, 4, 0), (6, 5, 1)])
+        self.assertTrue(lines[-1]['done'])
+        self.assertEqual(lines[-1]['errors'], [{'line': 7, 'error': 'Missing or zero amount.'}])
+        categories = dict(Transaction.objects.filter(user=self.user).values_list('amount', 'category'))
+        # Confident predictions are kept, unsure ones filed as Uncategorized
+        self.assertEqual(categories[Decimal('1.00')], 'Food')
+        self.assertEqual(categories[Decimal('2.00')], 'Uncategorized')
+        self.assertEqual(MonthlyRollup.objects.get(user=self.user, category='Food').total, Decimal('9.00'))
+
+    def test_unreadable_file(self):
+        lines = list(import_statement(self.user, io.BytesIO(b"a,b\n1,2\n"), 'csv'))
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0]['done'])
+        self.assertIn('date column', lines[0]['error'])
+
+    def test_endpoint_streams_progress(self):
+        self.client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('statement.csv', b"date,title,amount\n2026-01-05,Coffee,-3.20\n2026-01-06,x,NaN\n")
+        response = self.client.post('/api/transactions/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[-1]['created'], 1)
+        self.assertEqual(lines[-1]['failed'], 1)
+        self.assertEqual(Transaction.objects.get(user=self.user).category, 'Food')
+
+    def test_endpoint_rejects_unknown_type(self):
+        self.client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('statement.pdf', b"%PDF")
+        response = self.client.post('/api/transactions/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionExportTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', email='exporter@example.com')
+        self.other = User.objects.create_user(username='other', email='other@example.com')
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', role='admin')
+        self.first = Transaction.objects.create(user=self.user, title='Lunch, with "friends"', amount='12.50',
+                                                type='expense', category='Food', date=date(2026, 1, 5))
+        self.second = Transaction.objects.create(user=self.user, title='Pay', amount=1000, type='income',
+                                                 category='Salary', date=date(2026, 1, 1))
+        self.foreign = Transaction.objects.create(user=self.other, title='Taxi', amount=20, type='expense',
+                                                  category='Transport', date=date(2026, 1, 3))
+
+    def export(self, user, query=''):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/transactions/export/' + query)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response = self.export(self.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('transactions.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self.body(response).decode())))
+        self.assertEqual(rows, [
+            ['id', 'date', 'title', 'amount', 'type', 'category'],
+            [str(self.second.pk), '2026-01-01', 'Pay', '1000.00', 'income', 'Salary'],
+            [str(self.first.pk), '2026-01-05', 'Lunch, with "friends"', '12.50', 'expense', 'Food'],
+        ])
+
+    def test_ndjson(self):
+        response = self.export(self.user, '?output=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.body(response).splitlines()]
+        self.assertEqual([r['id'] for r in rows], [self.second.pk, self.first.pk])
+        self.assertEqual(rows[1], {'id': self.first.pk, 'date': '2026-01-05', 'title': 'Lunch, with "friends"',
+                                   'amount': '12.50', 'type': 'expense', 'category': 'Food'})
+
+    def test_gzip_round_trip(self):
+        plain = self.body(self.export(self.user, '?output=ndjson'))
+        response = self.export(self.user, '?output=ndjson&gzip=1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('transactions.ndjson.gz', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(self.body(response)), plain)
+
+    def test_admin_exports_everyone_with_user_id(self):
+        rows = list(csv.DictReader(io.StringIO(self.body(self.export(self.admin)).decode())))
+        self.assertEqual([(int(r['id']), int(r['user_id'])) for r in rows], [
+            (self.second.pk, self.user.pk), (self.foreign.pk, self.other.pk), (self.first.pk, self.user.pk),
+        ])
+
+    def test_user_export_is_scoped(self):
+        body = self.body(self.export(self.other)).decode()
+        self.assertNotIn('user_id', body)
+        self.assertEqual(len(body.splitlines()), 2)
+        self.assertIn('Taxi', body)
+
+    def test_rejects_unknown_output(self):
+        self.assertEqual(self.export(self.user, '?output=xml').status_code, 400)
+
+
+@mock.patch('ai_engine.ai_utils.transaction_categorizer.predict_batch', fake_predict_batch)
+class CategorizationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sorter', email='sorter@example.com')
+
+    def add(self, title, category='', amount=10):
+        return Transaction.objects.create(user=self.user, title=title, amount=amount, type='expense',
+                                          category=category, date=date(2026, 1, 10))
+
+    def rollup(self, category):
+        row = MonthlyRollup.objects.filter(user=self.user, category=category).values_list('total', 'count').first()
+        return row or (Decimal('0'), 0)
+
+    def test_moves_rollups_between_categories(self):
+        coffee = self.add('Coffee', amount=4)
+        gadget = self.add('Gadget', amount=60)
+        self.assertEqual(self.rollup(''), (Decimal('64.00'), 2))
+
+        self.assertEqual(categorize_transactions([coffee.pk, gadget.pk]), 2)
+        coffee.refresh_from_db()
+        gadget.refresh_from_db()
+        self.assertEqual(coffee.category, 'Food')
+        # Low confidence: filed as Uncategorized rather than guessed
+        self.assertEqual(gadget.category, 'Uncategorized')
+        self.assertEqual(self.rollup(''), (Decimal('0.00'), 0))
+        self.assertEqual(self.rollup('Food'), (Decimal('4.00'), 1))
+        self.assertEqual(self.rollup('Uncategorized'), (Decimal('60.00'), 1))
+
+    def test_skips_rows_the_user_categorized(self):
+        coffee = self.add('Coffee')
+        labelled = self.add('Coffee beans', category='Groceries')
+
+        def user_edits_meanwhile(descriptions, top_k=3):
+            coffee.category = 'Treats'
+            coffee.save()
+            return fake_predict_batch(descriptions, top_k)
+
+        with mock.patch('ai_engine.ai_utils.transaction_categorizer.predict_batch', user_edits_meanwhile):
+            self.assertEqual(categorize_transactions([coffee.pk, labelled.pk]), 0)
+        self.assertEqual(Transaction.objects.get(pk=coffee.pk).category, 'Treats')
+        self.assertEqual(Transaction.objects.get(pk=labelled.pk).category, 'Groceries')
+        self.assertEqual(self.rollup('Food'), (Decimal('0'), 0))
+
+    def test_save_queues_on_commit(self):
+        with mock.patch('transactions.categorization.categorization_queue') as queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                blank = self.add('Coffee')
+                self.add('Rent', category='Rent')
+                queue.enqueue.assert_not_called()
+        queue.enqueue.assert_called_once_with([blank.pk])
+
+    def test_sweep_command(self):
+        blank = self.add('Coffee')
+        unsure = self.add('Coffee shop', category='Uncategorized')
+        out = io.StringIO()
+        call_command('categorize_transactions', stdout=out)
+        self.assertIn('Categorized 1 of 1', out.getvalue())
+        self.assertEqual(Transaction.objects.get(pk=blank.pk).category, 'Food')
+        # Already tried once; only retried on request
+        self.assertEqual(Transaction.objects.get(pk=unsure.pk).category, 'Uncategorized')
+
+        self.add('Gadget')
+        call_command('categorize_transactions', stdout=out)
+        call_command('categorize_transactions', stdout=out)
+        # The unsure gadget becomes Uncategorized and isn't picked up again
+        self.assertIn('Categorized 0 of 0', out.getvalue())
+
+        call_command('categorize_transactions', '--retry-uncategorized', '--batch-size=1', stdout=out)
+        self.assertIn('Categorized 1 of 2', out.getvalue())
+        self.assertEqual(Transaction.objects.get(pk=unsure.pk).category, 'Food')
+
+
+class CategorizationQueueTests(TestCase):
+
+    def test_batches_every_id(self):
+        batches = []
+        queue = CategorizationQueue(batch_size=3, max_wait=0.05)
+        with mock.patch('transactions.categorization.categorize_transactions', batches.append):
+            queue.enqueue(range(7))
+            queue.join()
+        self.assertEqual(sorted(pk for batch in batches for pk in batch), list(range(7)))
+        self.assertTrue(all(len(batch) <= 3 for batch in batches))
+
+    def test_worker_survives_errors(self):
+        queue = CategorizationQueue(max_wait=0.01)
+        with mock.patch('transactions.categorization.categorize_transactions', side_effect=RuntimeError), \
+                self.assertLogs('transactions.categorization', 'ERROR'):
+            queue.enqueue([1])
+            queue.join()
+        batches = []
+        with mock.patch('transactions.categorization.categorize_transactions', batches.append):
+            queue.enqueue([2])
+            queue.join()
+        self.assertEqual(batches, [[2]])
+
+
+class TransactionDeleteTests(TestCase):
+
+    def test_deleting_user_with_transactions(self):
+        user = User.objects.create_user(username='leaving', email='leaving@example.com')
+        Budget.objects.create(user=user, category='Food', limit=100,
+                              start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        for day in (5, 6):
+            Transaction.objects.create(user=user, title='t', amount=day, type='expense',
+                                       category='Food', date=date(2026, 1, day))
+        # The cascade used to re-create the user's data version row mid-delete
+        user.delete()
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(MonthlyRollup.objects.exists())
+        self.assertFalse(UserDataVersion.objects.exists())
+
+    def test_deleting_transactions_updates_rollups(self):
+        user = User.objects.create_user(username='owner', email='owner@example.com')
+        first, *_ = [Transaction.objects.create(user=user, title='t', amount=amount, type='expense',
+                                                category='Food', date=date(2026, 1, 5)) for amount in (5, 7, 9)]
+        first.delete()
+        self.assertEqual(MonthlyRollup.objects.get().total, 16)
+        Transaction.objects.filter(user=user).delete()
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+
+class MonthlyRollupTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='roller', email='roller@example.com')
+        self.other = User.objects.create_user(username='bystander', email='bystander@example.com')
+
+    def rollups(self):
+        return set(MonthlyRollup.objects.filter(count__gt=0)
+                   .values_list('user_id', 'month', 'type', 'category', 'total', 'count'))
+
+    def assertRollupsExact(self):
+        # Nothing left behind for emptied months
+        self.assertFalse(MonthlyRollup.objects.filter(count__lte=0).exists())
+        maintained = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(maintained, self.rollups())
+
+    def add(self, amount, day=date(2026, 1, 10), category='Food', type_='expense', user=None):
+        return Transaction.objects.create(user=user or self.user, title='t', amount=amount, type=type_,
+                                          category=category, date=day)
+
+    def test_exact_after_writes(self):
+        rows = [self.add(amount) for amount in (10, 20, 30)]
+        self.add(99, user=self.other)
+        self.add(500, day=date(2026, 2, 1), category='Salary', type_='income')
+        self.assertRollupsExact()
+
+        rows[0].amount = Decimal('12.34')  # Edit the amount
+        rows[0].save()
+        rows[1].date = date(2026, 3, 31)  # Move to another month
+        rows[1].save()
+        rows[2].category = 'Travel'  # ...another category
+        rows[2].save()
+        self.assertRollupsExact()
+
+        rows[2].type = 'income'  # ...another type
+        rows[2].save()
+        rows[1].delete()  # Empties March
+        self.assertFalse(MonthlyRollup.objects.filter(month=date(2026, 3, 1)).exists())
+        self.assertRollupsExact()
+
+    def test_exact_after_api_writes(self):
+        self.client.force_authenticate(self.user)
+        url = '/api/transactions/'
+        created = self.client.post(url, {'title': 't', 'amount': '40', 'type': 'expense', 'category': 'Food',
+                                         'date': '2026-01-15'}, format='json').json()
+        self.client.patch(f"{url}{created['id']}/", {'amount': '45.50', 'date': '2026-02-02'}, format='json')
+        second = self.client.post(url, {'title': 't', 'amount': '8', 'type': 'expense', 'category': 'Fun',
+                                        'date': '2026-02-03'}, format='json').json()
+        self.client.delete(f"{url}{second['id']}/")
+        self.assertEqual(MonthlyRollup.objects.get().total, Decimal('45.50'))
+        self.assertRollupsExact()
+
+
+class DateRangeTotalsTests(QueryBudgetTestCase):
+    """ Range totals from rollups plus raw edge months must equal summing the raw rows. """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='ranger', email='ranger@example.com')
+        other = User.objects.create_user(username='bystander', email='bystander@example.com')
+        rng = random.Random(7)
+        # Month boundaries and leap day included
+        days = [date(2024, 2, 29), date(2024, 3, 1), date(2024, 12, 31), date(2025, 1, 1)]
+        days += [date(2023, 11, 1) + timedelta(days=rng.randrange(800)) for _ in range(150)]
+        for day in days:
+            type_ = rng.choice(['expense', 'expense', 'income'])
+            Transaction.objects.create(user=self.user, title='t', amount=Decimal(rng.randrange(100, 10000)) / 100,
+                                       type=type_, category=rng.choice(['Food', 'Rent', 'Fun']), date=day)
+            Transaction.objects.create(user=other, title='t', amount=1000, type=type_, category='Food', date=day)
+
+    def raw_totals(self, start, end, group_by):
+        txns = Transaction.objects.filter(user=self.user)
+        if start is not None:
+            txns = txns.filter(date__gte=start)
+        if end is not None:
+            txns = txns.filter(date__lte=end)
+        return {row[:-1]: row[-1] for row in txns.values_list(*group_by).annotate(sum=Sum('amount')).order_by()}
+
+    def test_split_date_range(self):
+        cases = [
+            # Inside one month
+            ((date(2025, 3, 5), date(2025, 3, 20)), (None, [(date(2025, 3, 5), date(2025, 3, 20))])),
+            # Exactly one whole month
+            ((date(2025, 3, 1), date(2025, 3, 31)), ((date(2025, 3, 1), date(2025, 4, 1)), [])),
+            # Across two partial months, none whole
+            ((date(2025, 3, 5), date(2025, 4, 10)), (None, [(date(2025, 3, 5), date(2025, 4, 10))])),
+            # Starts and ends mid-month
+            ((date(2025, 3, 5), date(2025, 6, 10)),
+             ((date(2025, 4, 1), date(2025, 6, 1)), [(date(2025, 3, 5), date(2025, 3, 31)),
+                                                     (date(2025, 6, 1), date(2025, 6, 10))])),
+            # Ends on a leap day, which is the end of February
+            ((date(2024, 1, 1), date(2024, 2, 29)), ((date(2024, 1, 1), date(2024, 3, 1)), [])),
+            ((date(2024, 1, 1), date(2024, 2, 28)),
+             ((date(2024, 1, 1), date(2024, 2, 1)), [(date(2024, 2, 1), date(2024, 2, 28))])),
+            # Open-ended
+            ((None, date(2025, 3, 20)), ((None, date(2025, 3, 1)), [(date(2025, 3, 1), date(2025, 3, 20))])),
+            ((date(2025, 3, 20), None), ((date(2025, 4, 1), None), [(date(2025, 3, 20), date(2025, 3, 31))])),
+            ((None, None), ((None, None), [])),
+        ]
+        for (start, end), expected in cases:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(split_date_range(start, end), expected)
+
+    def test_matches_raw_rows(self):
+        rng = random.Random(11)
+        ranges = [
+            (date(2025, 3, 5), date(2025, 3, 20)),
+            (date(2025, 3, 1), date(2025, 3, 31)),
+            (date(2025, 3, 31), date(2025, 4, 1)),
+            (date(2024, 2, 29), date(2024, 2, 29)),
+            (date(2023, 11, 15), date(2025, 12, 15)),
+            (None, date(2024, 12, 31)),
+            (date(2025, 1, 1), None),
+            (None, None),
+        ]
+        for _ in range(30):
+            start = date(2023, 10, 1) + timedelta(days=rng.randrange(850))
+            ranges.append((start, start + timedelta(days=rng.randrange(400))))
+
+        txns = Transaction.objects.filter(user=self.user)
+        rollups = MonthlyRollup.objects.filter(user=self.user)
+        for start, end in ranges:
+            for group_by in (['category'], ['type'], ['type', 'category']):
+                with self.subTest(start=start, end=end, group_by=group_by):
+                    self.assertEqual(range_totals(txns, rollups, start, end, group_by=group_by),
+                                     self.raw_totals(start, end, group_by))
+
+    def test_endpoints_match_raw_rows(self):
+        self.client.force_authenticate(self.user)
+        for start, end in [(date(2024, 1, 17), date(2025, 2, 3)), (date(2025, 6, 2), date(2025, 6, 29))]:
+            query = f'?start={start.isoformat()}&end={end.isoformat()}'
+            with self.subTest(start=start, end=end):
+                expense = {c: t for (t_, c), t in self.raw_totals(start, end, ['type', 'category']).items()
+                           if t_ == 'expense'}
+                categories = self.client.get(f'/api/analytics/category-spending/{query}').json()['categories']
+                self.assertEqual({row['category']: Decimal(row['total']) for row in categories}, expense)
+
+                by_type = self.raw_totals(start, end, ['type'])
+                savings = self.client.get(f'/api/analytics/savings-vs-expense/{query}').json()
+                self.assertEqual(Decimal(savings['total_income']), by_type.get(('income',), 0))
+                self.assertEqual(Decimal(savings['total_expense']), by_type.get(('expense',), 0))
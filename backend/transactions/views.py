@@ -1,17 +1,113 @@
-from rest_framework import viewsets, permissions
+import json
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
 from .models import Transaction
 from .serializers import TransactionSerializer
+from .bulk import BULK_MAX_ROWS, bulk_create_transactions
+from .importers import PARSERS, import_statement
+from .exports import ADMIN_EXPORT_FIELDS, CONTENT_TYPES, EXPORT_FIELDS, export_stream
+from finwise_backend.pagination import KeysetPagination
 
 class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Newest first; pages are fetched by (date, id) cursor, not OFFSET
+    pagination_class = KeysetPagination
+    ordering = ('-date', '-id')
 
     def get_queryset(self):
         user = self.request.user
         # Admins can see all transactions; normal users see only their own
         if getattr(user, 'role', None) == 'admin':
-            return Transaction.objects.all().order_by('-date')
-        return Transaction.objects.filter(user=user).order_by('-date')
+            return Transaction.objects.select_related('user').order_by(*self.ordering)
+        return Transaction.objects.filter(user=user).select_related('user').order_by(*self.ordering)
 
+    # Each write commits together with the rollup and budget total updates its signals make
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        POST a JSON array of transactions. Valid rows are written in batches
+        in one database transaction; invalid ones are reported by index:
+        { "created": 2, "ids": [...], "errors": [{"index": 1, "errors": {...}}] }
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'detail': 'Expected a JSON array of transactions.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > BULK_MAX_ROWS:
+            return Response({'detail': f'At most {BULK_MAX_ROWS} transactions per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        created, errors = bulk_create_transactions(request.user, rows)
+        code = status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({
+            'created': len(created),
+            'ids': [t.pk for t in created],
+            'errors': errors,
+        }, status=code)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_statement(self, request):
+        """
+        Upload a bank statement as multipart `file` (.csv, .ofx or .qfx; or
+        set `file_type`). Rows without a category are auto-categorized.
+        The response streams one JSON line per imported chunk:
+        {"rows": 2000, "created": 1998, "failed": 2, "seconds": 0.4}
+        and ends with a summary line carrying "done": true and the errors.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+        file_type = (request.data.get('file_type') or upload.name.rsplit('.', 1)[-1]).lower()
+        if file_type not in PARSERS:
+            return Response({'detail': f'Unsupported file type {file_type!r}; use csv, ofx or qfx.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        upload.seek(0)
+        progress = import_statement(request.user, upload.file, file_type)
+        response = StreamingHttpResponse(
+            (json.dumps(line, default=str) + '\n' for line in progress),
+            content_type='application/x-ndjson',
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Streams the whole transaction history (all users' for admins) as a
+        download. ?output=csv (default) or ndjson; ?gzip=1 compresses it.
+        """
+        output = request.query_params.get('output', 'csv').lower()
+        if output not in CONTENT_TYPES:
+            return Response({'detail': 'output must be csv or ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+        gzip = request.query_params.get('gzip') in ('1', 'true')
+        is_admin = getattr(request.user, 'role', None) == 'admin'
+        fields = ADMIN_EXPORT_FIELDS if is_admin else EXPORT_FIELDS
+
+        # Plain queryset, without the list view's select_related and ordering
+        queryset = Transaction.objects.all() if is_admin else Transaction.objects.filter(user=request.user)
+        filename = f"transactions.{output}" + ('.gz' if gzip else '')
+        response = StreamingHttpResponse(
+            export_stream(queryset, output, fields, gzip=gzip),
+            content_type='application/gzip' if gzip else CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
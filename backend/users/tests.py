@@ -1,3 +1,24 @@
 from django.test import TestCase
 
+from finwise_backend.testing import QueryBudgetTestCase
+from .models import User
+
 # Create your tests here.
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='boss', email='boss@example.com', password='x',
+                                              role='admin', is_staff=True)
+        self.n_users = 0
+
+    def seed(self, n):
+        for _ in range(n):
+            self.n_users += 1
+            User.objects.create_user(username=f'u{self.n_users}', email=f'u{self.n_users}@example.com')
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(1, '/api/users/', self.seed)
@@ -4,6 +4,10 @@ export const categorizeTransaction = (description) => {
   return api.post('ai/categorize-transaction/', { description });
 };
 
+export const categorizeTransactions = (descriptions) => {
+  return api.post('ai/categorize-batch/', { descriptions });
+};
+
 export const predictSpending = () =>
   api.get('ai/predict-spending/');
 
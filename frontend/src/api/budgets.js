@@ -1,7 +1,8 @@
 import api from './axios'; // Your configured axios instance
 
-// Function to get all budgets for the logged-in user
-export const getBudgets = () => api.get('budgets/');
+// Function to get a page of budgets for the logged-in user.
+// Pass the previous response's `next` URL to get the following page.
+export const getBudgets = (next = null) => api.get(next || 'budgets/');
 
 // Function to create a new budget
 export const createBudget = (payload) => api.post('budgets/', payload);
@@ -10,4 +11,10 @@ export const createBudget = (payload) => api.post('budgets/', payload);
 export const updateBudget = (id, payload) => api.put(`budgets/${id}/`, payload);
 
 // Function to delete a budget by its ID
-export const deleteBudget = (id) => api.delete(`budgets/${id}/`);
\ No newline at end of file
+export const deleteBudget = (id) => api.delete(`budgets/${id}/`);
+
+// Function to get spent/remaining/projection for each active budget
+export const getBudgetStatus = () => api.get('budgets/status/');
+
+// Function to get the latest budget alerts (80%, 100% and 120% of a limit reached)
+export const getBudgetAlerts = () => api.get('budgets/alerts/');
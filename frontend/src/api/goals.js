@@ -1,6 +1,9 @@
 import api from './axios';
 
-export const getGoals = () => api.get('goals/');
+// Pass the previous response's `next` URL to get the following page
+export const getGoals = (next = null) => api.get(next || 'goals/');
 export const createGoal = (payload) => api.post('goals/', payload);
 export const updateGoal = (id, payload) => api.put(`goals/${id}/`, payload);
-export const deleteGoal = (id) => api.delete(`goals/${id}/`);
\ No newline at end of file
+export const deleteGoal = (id) => api.delete(`goals/${id}/`);
+// Probability of reaching each open goal by its deadline, and the expected completion date
+export const getGoalForecast = () => api.get('goals/forecast/');
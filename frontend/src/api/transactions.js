@@ -1,7 +1,8 @@
 import api from './axios'; // Your configured axios instance
 
-// Get all transactions for logged-in user (or admin sees all)
-export const getTransactions = () => api.get('transactions/');
+// Get a page of transactions for logged-in user (or admin sees all).
+// Pass the previous response's `next` URL to get the following page.
+export const getTransactions = (next = null) => api.get(next || 'transactions/');
 
 // Create a new transaction
 export const createTransaction = (payload) => api.post('transactions/', payload);
@@ -11,3 +12,17 @@ export const updateTransaction = (id, payload) => api.put(`transactions/${id}/`,
 
 // Delete transaction by ID
 export const deleteTransaction = (id) => api.delete(`transactions/${id}/`);
+
+// Create many transactions at once; returns { created, ids, errors } with per-row errors by index
+export const bulkCreateTransactions = (rows) => api.post('transactions/bulk/', rows);
+
+// Import a CSV/OFX bank statement; the response is one JSON progress line per chunk
+export const importStatement = (file) => {
+  const form = new FormData();
+  form.append('file', file);
+  return api.post('transactions/import/', form, { responseType: 'text' });
+};
+
+// Download the transaction history as a file; output is 'csv' or 'ndjson'
+export const exportTransactions = (output = 'csv', gzip = false) =>
+  api.get('transactions/export/', { params: { output, gzip: gzip ? 1 : 0 }, responseType: 'blob' });
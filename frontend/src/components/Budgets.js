@@ -8,6 +8,7 @@ import {
 
 function Budgets() {
   const [budgets, setBudgets] = useState([]); // State for the list of budgets
+  const [nextPage, setNextPage] = useState(null); // Cursor URL of the next page, if any
   // State for the form inputs
   const [form, setForm] = useState({
     category: "",
@@ -25,7 +26,8 @@ function Budgets() {
     setError("");
     try {
       const res = await getBudgets();
-      setBudgets(res.data);
+      setBudgets(res.data.results);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error(err);
       setError("Failed to load budgets. Please try again.");
@@ -34,6 +36,18 @@ function Budgets() {
     }
   };
 
+  // Fetch the next page and append it to the list
+  const loadMore = async () => {
+    try {
+      const res = await getBudgets(nextPage);
+      setBudgets((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error(err);
+      setError("Failed to load more budgets.");
+    }
+  };
+
   // Fetch budgets when the component mounts
   useEffect(() => {
     fetchBudgets();
@@ -193,6 +207,9 @@ function Budgets() {
           </tbody>
         </table>
       )}
+      {!isLoading && nextPage && (
+        <button type="button" className="load-more" onClick={loadMore}>Load more</button>
+      )}
     </div>
   );
 }
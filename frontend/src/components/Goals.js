@@ -3,6 +3,7 @@ import { getGoals, createGoal, updateGoal, deleteGoal } from "../api/goals"; //
 
 function Goals() {
   const [goals, setGoals] = useState([]); // State for the list of goals
+  const [nextPage, setNextPage] = useState(null); // Cursor URL of the next page, if any
   // State for the form inputs
   const [form, setForm] = useState({
     name: "",
@@ -20,7 +21,8 @@ function Goals() {
     setError("");
     try {
       const res = await getGoals();
-      setGoals(res.data);
+      setGoals(res.data.results);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error(err);
       setError("Failed to load goals. Please try again.");
@@ -29,6 +31,18 @@ function Goals() {
     }
   };
 
+  // Fetch the next page and append it to the list
+  const loadMore = async () => {
+    try {
+      const res = await getGoals(nextPage);
+      setGoals((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error(err);
+      setError("Failed to load more goals.");
+    }
+  };
+
   // Fetch goals on component mount
   useEffect(() => {
     fetchGoals();
@@ -193,6 +207,9 @@ function Goals() {
           </tbody>
         </table>
       )}
+      {!isLoading && nextPage && (
+        <button type="button" className="load-more" onClick={loadMore}>Load more</button>
+      )}
     </div>
   );
 }
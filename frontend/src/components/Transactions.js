@@ -7,6 +7,7 @@ const getTodayDate = () => new Date().toISOString().split('T')[0];
 
 function Transactions() {
   const [transactions, setTransactions] = useState([]);
+  const [nextPage, setNextPage] = useState(null); // Cursor URL of the next page, if any
   const [form, setForm] = useState({ 
     title: '', 
     amount: '', 
@@ -28,7 +29,8 @@ function Transactions() {
     setError('');
     try {
       const res = await getTransactions();
-      setTransactions(res.data);
+      setTransactions(res.data.results);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error(err);
       setError('Failed to load transactions.');
@@ -37,6 +39,18 @@ function Transactions() {
     }
   };
 
+  // Fetch the next page and append it to the list
+  const loadMore = async () => {
+    try {
+      const res = await getTransactions(nextPage);
+      setTransactions((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error(err);
+      setError('Failed to load more transactions.');
+    }
+  };
+
   useEffect(() => { fetchTransactions(); }, []);
 
   const handleChange = (e) => setForm({ ...form, [e.target.name]: e.target.value });
@@ -179,6 +193,9 @@ function Transactions() {
           </tbody>
         </table>
       )}
+      {!isLoading && nextPage && (
+        <button type="button" className="load-more" onClick={loadMore}>Load more</button>
+      )}
     </div>
   );
 }
@@ -15,22 +15,15 @@ export function DashboardDataProvider({ children }) {
       setLoading(true);
       setError(null);
       try {
-        // Run all analytics API calls at the same time
-        const [summaryRes, trendRes, categoryRes, goalsRes, predictionRes] = await Promise.all([
-          api.get('analytics/savings-vs-expense/'),
-          api.get('analytics/monthly-spending/?months=6'),
-          api.get('analytics/category-spending/'),
-          api.get('goals/'), // For the Goal Progress chart
-          api.get('insights/predict-monthly/') // For the Prediction chart
-        ]);
-
-        // Combine all results into one state object
+        // One request returns every dashboard payload
+        const res = await api.get('dashboard/?months=6');
+
         setAnalytics({
-          summary: summaryRes.data,
-          trend: trendRes.data.months,
-          categories: categoryRes.data.categories,
-          goals: goalsRes.data,
-          prediction: predictionRes.data,
+          summary: res.data.summary,
+          trend: res.data.trend,
+          categories: res.data.categories,
+          goals: res.data.goals, // For the Goal Progress chart
+          prediction: res.data.prediction, // For the Prediction chart
         });
 
       } catch (err) {